@@ -1,15 +1,38 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-import json
-import urllib.parse
-import base64
-import re
+import os
 import threading
 import queue
-
-# --- Constants ---
-V2RAY_PROTOCOLS = ['vless://', 'vmess://', 'ss://', 'trojan://']
-TELEGRAM_PROTOCOLS = ['https://t.me/proxy?', 'tg://proxy?']
+import time
+import sqlite3
+from array import array
+from collections import deque
+from itertools import compress
+
+from vpn_cache import ParseCache
+from vpn_core import V2RAY_TYPES, NameTemplate, fingerprint, iter_clean_lines
+from vpn_dedup import Deduplicator, FingerprintSet
+from vpn_engine import ResultBatcher, default_workers, iter_results
+from vpn_export import EXPORT_EXTENSIONS, open_writer
+from vpn_geo import GeoDatabase, GeoLookup, Namer
+from vpn_metrics import Metrics
+from vpn_probe import endpoint_key, probe_endpoints
+from vpn_sources import InputReader, expand_subscriptions
+from vpn_store import TableModel, is_alive
+from vpn_table import VirtualTable
+
+QUEUE_MAX_BATCHES = 64
+MAX_PENDING_RESULTS = 5000
+QUEUE_TICK_BUDGET = 0.012 # ثانیه؛ کمتر از زمان یک فریم تا حلقه اصلی Tk روان بماند
+PASTE_INLINE_LIMIT = 100_000 # متن‌های بزرگ‌تر به جای جعبه متن مستقیماً به صورت جریانی پردازش می‌شوند
+PROBE_POLL_INTERVAL = 200 # میلی‌ثانیه بین اعمال نتایج بررسی دسترسی روی جداول
+SEARCH_DEBOUNCE = 120 # میلی‌ثانیه مکث در تایپ پیش از اعمال جستجو
+EXPORT_LABELS = {
+    "متن ساده (هر لینک در یک خط)": 'plain',
+    "اشتراک Base64": 'base64',
+    "Clash / Mihomo (YAML)": 'clash',
+    "sing-box (JSON)": 'singbox',
+}
 
 # --- Color Palette ---
 COLORS = {
@@ -36,11 +59,33 @@ class VpnConfigEditorApp(tk.Tk):
         self.geometry("1400x850")
         self.configure(bg=COLORS["background"])
 
-        self.processing_queue = queue.Queue()
-        self.tree_data_map = {} # {tree_iid: data_dict}
+        self.processing_queue = queue.Queue(maxsize=QUEUE_MAX_BATCHES)
+        self._pending_results = deque()
+        self._processing_done = 0
+        self._producer_finished = False
+        self._collapsed = 0
+        self._retired_rows = 0
+        self._processing_error = None
+        self._running_cache = None
+        self._metrics = None
+        self.cancel_event = threading.Event() # لغو پردازش (دکمه لغو یا بستن پنجره)
+        self.resume_event = threading.Event() # پاک بودن آن یعنی توقف موقت پردازش
+        self.resume_event.set()
+        self.closing_event = threading.Event() # فقط هنگام بستن پنجره؛ نتایج در صف دور ریخته می‌شوند
+        # وضعیت پردازش تدریجی: خطوط پردازش‌شده، ایندکس حذف تکراری و نام اعمال‌شده در اجراهای قبلی
+        self._reset_incremental_state()
+        self._tag = None
+        self.input_reader = InputReader() # فایل‌ها و متن‌های بزرگ که خارج از جعبه متن نگهداری می‌شوند
+        self._running_reader = None
+        self._export = None # وضعیت ذخیره در حال اجرا: {'done', 'total', 'writer', 'error', 'finished'}
+        self._probe = None # وضعیت بررسی دسترسی در حال اجرا: {'targets', 'results', 'cancel', 'done', 'alive', 'finished'}
+        self._search_job = None
+        self._geo = None # GeoLookup پایگاه داده GeoIP انتخاب‌شده
+        self._geo_resolve = None # resolve نام سرورها در حال اجرا: {'cancel', 'result', 'finished', 'close'}
         
         self._configure_styles()
         self._create_widgets()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def _configure_styles(self):
         """پیکربندی استایل‌های ttk برای ظاهر برنامه."""
@@ -84,10 +129,15 @@ class VpnConfigEditorApp(tk.Tk):
         frame = ttk.LabelFrame(parent, text="ورودی و تنظیمات", padding=15)
         frame.pack(fill=tk.X, pady=(0, 10))
         
-        ttk.Label(frame, text="🔗 نام جدید کانفیگ:").pack(fill=tk.X, pady=(0, 5), anchor='e')
+        ttk.Label(frame, text="🔗 نام جدید کانفیگ (یا قالب، مثل {flag}{country}-{protocol}-{index}):").pack(fill=tk.X, pady=(0, 5), anchor='e')
         self.custom_tag_entry = ttk.Entry(frame, justify='right', font=("Vazirmatn", 10))
         self.custom_tag_entry.insert(0, "@vOXsafe")
-        self.custom_tag_entry.pack(fill=tk.X, pady=(0, 15))
+        self.custom_tag_entry.pack(fill=tk.X, pady=(0, 5))
+        geo_frame = ttk.Frame(frame)
+        geo_frame.pack(fill=tk.X, pady=(0, 15))
+        self.geo_label = ttk.Label(geo_frame, text="پایگاه GeoIP انتخاب نشده", anchor='e', foreground=COLORS["secondary"])
+        self.geo_label.pack(side=tk.RIGHT, fill=tk.X, expand=True)
+        ttk.Button(geo_frame, text="🌍 پایگاه GeoIP", command=self.load_geo_database, style="Link.TButton").pack(side=tk.LEFT)
 
         input_label_frame = ttk.Frame(frame)
         input_label_frame.pack(fill=tk.X, pady=(0, 5))
@@ -97,8 +147,29 @@ class VpnConfigEditorApp(tk.Tk):
         self.input_text = scrolledtext.ScrolledText(frame, height=15, wrap=tk.WORD, font=("Consolas", 10), relief="solid", borderwidth=1)
         self.input_text.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
 
+        self.sources_frame = ttk.Frame(frame)
+        self.sources_label = ttk.Label(self.sources_frame, anchor='e')
+        self.sources_label.pack(side=tk.RIGHT, fill=tk.X, expand=True)
+        ttk.Button(self.sources_frame, text="✖", command=self.clear_input_sources, style="Link.TButton").pack(side=tk.LEFT)
+        # Initially hidden
+
         self.remove_duplicates_var = tk.BooleanVar(value=True)
         ttk.Checkbutton(frame, text="حذف لینک‌های تکراری", variable=self.remove_duplicates_var).pack(pady=(0, 10), anchor='e')
+        ttk.Label(frame, text="💾 قالب فایل خروجی:").pack(fill=tk.X, pady=(0, 5), anchor='e')
+        self.export_format_var = tk.StringVar(value=next(iter(EXPORT_LABELS)))
+        ttk.Combobox(frame, textvariable=self.export_format_var, values=tuple(EXPORT_LABELS), state='readonly', justify='right').pack(fill=tk.X, pady=(0, 10))
+        self.use_cache_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(frame, text="کش نتایج پارس (اجرای دوباره فقط لینک‌های جدید را پارس می‌کند)", variable=self.use_cache_var).pack(pady=(0, 10), anchor='e')
+        self.metrics_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frame, text="پنل کارایی (اندازه‌گیری زمان پارس، صف و رندر)", variable=self.metrics_var).pack(pady=(0, 10), anchor='e')
+
+        parallel_frame = ttk.Frame(frame)
+        parallel_frame.pack(fill=tk.X, pady=(0, 10))
+        self.parallel_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(parallel_frame, text="پردازش چند هسته‌ای", variable=self.parallel_var).pack(side=tk.RIGHT)
+        self.workers_var = tk.IntVar(value=default_workers())
+        ttk.Spinbox(parallel_frame, from_=1, to=max(64, default_workers()), textvariable=self.workers_var, width=5, justify='center').pack(side=tk.LEFT)
+        ttk.Label(parallel_frame, text="تعداد پروسه:").pack(side=tk.LEFT, padx=(5, 0))
 
     def _create_action_panel(self, parent):
         frame = ttk.LabelFrame(parent, text="عملیات", padding=15)
@@ -109,6 +180,15 @@ class VpnConfigEditorApp(tk.Tk):
         self.load_button.pack(fill=tk.X, pady=5)
         self.clear_button = ttk.Button(frame, text="🗑️ پاک‌سازی همه", command=self.clear_all, style="Secondary.TButton")
         self.clear_button.pack(fill=tk.X, pady=5)
+        self.run_controls = ttk.Frame(frame)
+        self.pause_button = ttk.Button(self.run_controls, text="⏸ توقف موقت", command=self.toggle_pause, style="Secondary.TButton")
+        self.pause_button.pack(side=tk.RIGHT, fill=tk.X, expand=True, padx=(5, 0))
+        ttk.Button(self.run_controls, text="⏹ لغو", command=self.cancel_processing, style="Secondary.TButton").pack(side=tk.LEFT, fill=tk.X, expand=True)
+        # Initially hidden; فقط در حین پردازش نمایش داده می‌شود
+        self.probe_button = ttk.Button(frame, text="📡 بررسی دسترسی سرورها", command=self.start_probe, style="Secondary.TButton")
+        self.probe_button.pack(fill=tk.X, pady=5)
+        self.alive_only_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frame, text="فقط سرورهای در دسترس", variable=self.alive_only_var, command=self.apply_alive_filter).pack(pady=(5, 0), anchor='e')
 
     def _create_status_bar(self, parent):
         status_frame = ttk.Frame(parent, padding=(10, 5), relief="groove", borderwidth=1)
@@ -119,83 +199,134 @@ class VpnConfigEditorApp(tk.Tk):
 
         self.progress_bar = ttk.Progressbar(status_frame, orient='horizontal', mode='determinate')
         # Initially hidden
+
+        self.metrics_frame = ttk.Frame(status_frame)
+        self.metrics_label = ttk.Label(self.metrics_frame, anchor='w', font=("Consolas", 9))
+        self.metrics_label.pack(side=tk.LEFT)
+        ttk.Button(self.metrics_frame, text="💾 پروفایل", command=self.save_profile, style="Link.TButton").pack(side=tk.LEFT, padx=(5, 0))
+        # Initially hidden
     
     def _create_output_panel(self, parent):
+        search_frame = ttk.Frame(parent)
+        search_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(search_frame, text="🔍 جستجو:").pack(side=tk.RIGHT)
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add('write', lambda *args: self._schedule_search())
+        ttk.Entry(search_frame, textvariable=self.search_var, font=("Consolas", 10)).pack(side=tk.RIGHT, fill=tk.X, expand=True, padx=5)
+        ttk.Label(search_frame, text="مثال: vless port=443 sni:cdn -net:grpc", foreground=COLORS["secondary"]).pack(side=tk.LEFT)
+
         notebook = ttk.Notebook(parent)
         notebook.pack(fill=tk.BOTH, expand=True)
 
-        v2ray_cols = {"پروتکل": 80, "آدرس": 200, "پورت": 60, "نام": 150, "جزئیات": 220}
-        telegram_cols = {"سرور": 220, "پورت": 80, "سیکرت": 350}
+        v2ray_cols = {"پروتکل": 80, "آدرس": 200, "پورت": 60, "تأخیر": 70, "نام": 150, "جزئیات": 220, "نام اصلی": 150}
+        telegram_cols = {"سرور": 220, "پورت": 80, "تأخیر": 70, "سیکرت": 350, "نام اصلی": 150}
         names_cols = {"نام اصلی کانفیگ": 500}
         failed_cols = {"لینک ناموفق": 400, "دلیل خطا": 350}
 
-        self.v2ray_tree = self._create_treeview_tab(notebook, "کانفیگ‌های V2Ray/SS/Trojan", v2ray_cols)
-        self.telegram_tree = self._create_treeview_tab(notebook, "پراکسی تلگرام", telegram_cols)
-        self.original_names_tree = self._create_treeview_tab(notebook, "نام‌های اصلی کانفیگ", names_cols)
-        self.failed_links_tree = self._create_treeview_tab(notebook, "لینک‌های ناموفق", failed_cols)
+        self.v2ray_table = self._create_treeview_tab(notebook, "کانفیگ‌های V2Ray/SS/Trojan", v2ray_cols, ("protocol", "host", "port", "latency", "tag", "details", "original_name"))
+        self.telegram_table = self._create_treeview_tab(notebook, "پراکسی تلگرام", telegram_cols, ("server", "port", "latency", "secret", "original_name"))
+        self.original_names_table = self._create_treeview_tab(notebook, "نام‌های اصلی کانفیگ", names_cols, ("name",))
+        self.failed_links_table = self._create_treeview_tab(notebook, "لینک‌های ناموفق", failed_cols, ("link", "error"))
 
-    def _create_treeview_tab(self, notebook, title, columns):
+    def _create_treeview_tab(self, notebook, title, columns, keys):
+        """یک تب با جدول مجازی می‌سازد؛ keys نام فیلدهای داده متناظر با ستون‌هاست."""
         frame = ttk.Frame(notebook, padding=10)
         notebook.add(frame, text=f" {title} ")
 
         top_bar = ttk.Frame(frame)
         top_bar.pack(fill=tk.X, pady=(0, 10))
-        
-        tree = ttk.Treeview(frame, columns=list(columns.keys()), show='headings')
-        
-        for col, width in columns.items():
-            tree.heading(col, text=col, anchor='center', command=lambda c=col, t=tree: self.sort_treeview_column(t, c, False))
-            tree.column(col, anchor='w', width=width, minwidth=width)
-        
-        vsb = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
-        hsb = ttk.Scrollbar(frame, orient="horizontal", command=tree.xview)
-        tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
-        
-        vsb.pack(side='left', fill='y')
-        tree.pack(side='left', fill='both', expand=True)
-        hsb.pack(side='bottom', fill='x')
 
-        ttk.Button(top_bar, text="📄 کپی همه", command=lambda t=tree: self.copy_all(t), style="Secondary.TButton").pack(side=tk.LEFT, padx=(0, 5))
-        ttk.Button(top_bar, text="💾 دانلود همه", command=lambda t=tree: self.save_to_file(t), style="Secondary.TButton").pack(side=tk.LEFT)
+        table = VirtualTable(frame, TableModel(keys), columns)
+        table.pack(fill='both', expand=True)
+        table.column_keys = dict(zip(columns, keys))
+
+        for col in columns:
+            table.heading(col, command=lambda c=col, t=table: self.sort_table_column(t, c, False))
+
+        ttk.Button(top_bar, text="📄 کپی همه", command=lambda t=table: self.copy_all(t), style="Secondary.TButton").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(top_bar, text="💾 دانلود همه", command=lambda t=table: self.save_to_file(t), style="Secondary.TButton").pack(side=tk.LEFT)
 
         popup_menu = tk.Menu(self, tearoff=0)
-        popup_menu.add_command(label="📄 کپی لینک انتخاب شده", command=lambda t=tree: self.copy_selected(t))
-        tree.bind("<Button-3>", lambda event, t=tree, m=popup_menu: self.show_popup(event, t, m))
-        
-        tree.sort_column = None
-        tree.sort_direction = False
-        return tree
+        popup_menu.add_command(label="📄 کپی لینک انتخاب شده", command=lambda t=table: self.copy_selected(t))
+        table.tree.bind("<Button-3>", lambda event, t=table, m=popup_menu: self.show_popup(event, t, m))
+
+        table.sort_column = None
+        table.sort_direction = False
+        return table
 
     # --- UI Interaction Methods ---
 
-    def show_popup(self, event, tree, menu):
-        if iid := tree.identify_row(event.y):
-            tree.selection_set(iid)
+    def show_popup(self, event, table, menu):
+        if (index := table.index_at(event.y)) is not None:
+            table.select(index)
             menu.post(event.x_root, event.y_root)
 
     def paste_from_clipboard(self):
+        """متن‌های کوچک در جعبه متن درج می‌شوند؛ متن‌های بزرگ مستقیماً به ورودی جریانی اضافه می‌شوند."""
         try:
-            self.input_text.insert(tk.END, self.clipboard_get())
-            self.update_status("محتوا از کلیپ‌بورد جای‌گذاری شد.")
+            content = self.clipboard_get()
         except tk.TclError:
             self.update_status("خطا: کلیپ‌بورد خالی است.", error=True)
+            return
 
-    def sort_treeview_column(self, tree, col, reverse):
-        if tree.sort_column == col: reverse = not tree.sort_direction
-        
-        data_list = [(tree.set(k, col), k) for k in tree.get_children('')]
-        
-        try: data_list.sort(key=lambda t: float(t[0]), reverse=reverse)
-        except (ValueError, TypeError): data_list.sort(key=lambda t: str(t[0]), reverse=reverse)
-
-        for index, (val, k) in enumerate(data_list): tree.move(k, '', index)
+        if len(content) > PASTE_INLINE_LIMIT:
+            self.input_reader.add_text(content)
+            self._update_sources_summary()
+        else:
+            self.input_text.insert(tk.END, content)
+        self.update_status("محتوا از کلیپ‌بورد جای‌گذاری شد.")
 
-        tree.heading(col, command=lambda c=col, t=tree: self.sort_treeview_column(t, c, not reverse))
-        tree.sort_column = col
-        tree.sort_direction = reverse
-        
-        for i, k in enumerate(tree.get_children('')):
-            tree.item(k, tags=('evenrow' if i % 2 == 0 else 'oddrow',))
+    def _update_sources_summary(self):
+        if summary := self.input_reader.summary():
+            self.sources_label.config(text=summary)
+            self.sources_frame.pack(fill=tk.X, pady=(0, 10), after=self.input_text.frame)
+        else:
+            self.sources_frame.pack_forget()
+
+    def clear_input_sources(self):
+        self.input_reader = InputReader()
+        self._update_sources_summary()
+
+    def sort_table_column(self, table, col, reverse):
+        """مرتب‌سازی در سمت مدل انجام می‌شود و فقط سطرهای قابل مشاهده دوباره رسم می‌شوند."""
+        if table.sort_column == col: reverse = not table.sort_direction
+
+        table.model.sort(table.column_keys[col], reverse)
+        table.heading(col, command=lambda c=col, t=table: self.sort_table_column(t, c, not reverse))
+        table.sort_column = col
+        table.sort_direction = reverse
+        table.reset()
+
+    def _schedule_search(self):
+        """جستجو با هر تغییر متن، ولی فقط پس از یک مکث کوتاه در تایپ اعمال می‌شود."""
+        if self._search_job: self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DEBOUNCE, self.apply_search)
+
+    def apply_search(self):
+        self._search_job = None
+        query = self.search_var.get()
+        start = time.perf_counter()
+        for table in self._tables():
+            table.model.set_search(query)
+            table.reset()
+        if query.strip():
+            found = sum(len(table.model) for table in self._tables())
+            self.update_status(f"🔍 {found} سطر یافت شد ({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+    def apply_alive_filter(self):
+        predicate = is_alive if self.alive_only_var.get() else None
+        for table in (self.v2ray_table, self.telegram_table):
+            table.model.set_filter('latency', predicate)
+            table.reset()
+
+    def on_close(self):
+        """پیش از بستن پنجره، پردازش در جریان (و پروسه‌های موتور موازی) و بررسی دسترسی لغو می‌شوند."""
+        self.closing_event.set()
+        self.cancel_event.set()
+        self.resume_event.set()
+        if self._probe: self._probe['cancel'].set()
+        if self._geo_resolve: self._geo_resolve['cancel'].set()
+        self.destroy()
 
     def update_status(self, message, error=False):
         self.status_label.config(text=message, foreground=COLORS["danger"] if error else COLORS["text"])
@@ -203,295 +334,527 @@ class VpnConfigEditorApp(tk.Tk):
     # --- Core Logic & Threading ---
 
     def start_processing(self):
+        """
+        [بهینه‌شده] پردازش تدریجی: نتایج قبلی حفظ و فقط خطوطی که در اجراهای قبلی پردازش نشده‌اند
+        (اضافه یا تغییرکرده) پارس می‌شوند و سطرهای خطوطی که دیگر در ورودی نیستند (حذف یا ویرایش‌شده)
+        کنار گذاشته می‌شوند. جداول الگوی لینک‌ها را نگه می‌دارند، پس تغییر نام جدید فقط نام
+        نمایش/خروجی همه سطرها را عوض می‌کند و هیچ لینکی دوباره پارس نمی‌شود.
+        """
         new_name = self.custom_tag_entry.get()
         if not new_name:
             messagebox.showwarning("ورودی ناقص", "لطفاً یک نام جدید برای کانفیگ‌ها وارد کنید.")
             return
+        try:
+            template = NameTemplate(new_name)
+        except ValueError as e:
+            messagebox.showwarning("قالب نام نامعتبر", str(e))
+            return
 
-        lines = [line.strip() for line in self.input_text.get("1.0", tk.END).splitlines() if line.strip()]
-        if self.remove_duplicates_var.get(): lines = list(dict.fromkeys(lines))
-
-        if not lines:
+        # ورودی به صورت جریانی خوانده می‌شود؛ محتوای فایل‌ها هیچ‌وقت وارد جعبه متن نمی‌شود
+        reader = InputReader()
+        reader.add_text(self.input_text.get("1.0", "end-1c"))
+        reader.merge(self.input_reader)
+        if not reader:
             self.update_status("هیچ لینکی برای پردازش وجود ندارد.", error=True)
             return
-        
-        self.clear_results()
+
+        if new_name != self._tag:
+            self._tag = new_name
+            self._apply_name(template)
         self.progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
-        self.progress_bar['maximum'] = len(lines)
+        self.progress_bar['maximum'] = max(1, reader.total_size)
         self.process_button.config(state=tk.DISABLED)
         self.load_button.config(state=tk.DISABLED)
         self.clear_button.config(state=tk.DISABLED)
-        self.update_status(f"در حال آماده‌سازی برای پردازش {len(lines)} لینک...")
-
-        thread = threading.Thread(target=self._run_processing_logic, args=(lines, new_name), daemon=True)
+        self.update_status("در حال آماده‌سازی برای پردازش...")
+        self._running_reader = reader
+
+        try: workers = max(1, self.workers_var.get()) if self.parallel_var.get() else 1
+        except tk.TclError: workers = 1
+
+        self.cancel_event.clear()
+        self.resume_event.set()
+        self.pause_button.config(text="⏸ توقف موقت")
+        self.run_controls.pack(fill=tk.X, pady=5, after=self.clear_button)
+        self._pending_results.clear()
+        self._processing_done = 0
+        self._producer_finished = False
+        self._collapsed = 0
+        self._retired_rows = 0
+        self._processing_error = None
+        self._running_cache = None
+        self._metrics = Metrics() if self.metrics_var.get() else None
+        if self._metrics: self.metrics_frame.pack(side=tk.LEFT, before=self.status_label)
+        else: self.metrics_frame.pack_forget()
+        args = (reader, workers, self.remove_duplicates_var.get(), self.use_cache_var.get())
+        thread = threading.Thread(target=self._run_processing_logic, args=args, daemon=True)
         thread.start()
         self.after(100, self._check_queue)
 
-    def _run_processing_logic(self, lines, new_name):
-        """این متد در یک ترد جداگانه اجرا می‌شود تا از فریز شدن UI جلوگیری کند."""
-        for i, line in enumerate(lines):
-            try:
-                if parsed := self._parse_link(line, new_name):
-                    self.processing_queue.put(parsed)
+    def _apply_name(self, template):
+        """نام ثابت یا قالب نام (با پایگاه GeoIP فعلی) را روی سطرهای جدول V2Ray اعمال می‌کند."""
+        self.v2ray_table.model.set_tag(template.fixed if template.fixed is not None else Namer(template, self._geo))
+        self.v2ray_table.refresh()
+
+    def _run_processing_logic(self, reader, workers=1, use_dedup=False, use_cache=False):
+        """
+        این متد در یک ترد جداگانه اجرا می‌شود تا از فریز شدن UI جلوگیری کند.
+        خطی که قبلاً پردازش شده رد می‌شود؛ هر خط فقط وقتی پردازش‌شده ثبت می‌شود که نتیجه‌اش تحویل شده باشد،
+        پس خطوط باقی‌مانده از یک اجرای لغوشده در اجرای بعدی پردازش می‌شوند.
+        """
+        keys = deque() # اثر انگشت خطوط ارسال‌شده برای پارس، به ترتیب (نتایج هم به همین ترتیب می‌رسند)
+
+        def fresh(lines, seen):
+            for line in lines:
+                if (key := fingerprint(line)) not in seen:
+                    keys.append(key)
+                    yield line
+
+        batcher = ResultBatcher(self.processing_queue, cancel_event=self.closing_event)
+        cache = results = error = dedup = None
+        collapsed = 0
+        try:
+            if (prepared := self._prepare_incremental_run(reader, use_dedup, batcher)) is None: return # لغو
+            seen, dedup = prepared
+            collapsed = dedup.collapsed if dedup else 0
+            # اتصال SQLite باید در همین ترد ساخته شود؛ اگر کش در دسترس نباشد پردازش بدون آن ادامه می‌یابد
+            if use_cache:
+                try: cache = ParseCache()
+                except (OSError, sqlite3.Error): cache = None
+            self._running_cache = cache
+            lines = fresh(expand_subscriptions(iter_clean_lines(reader)), seen)
+            results = iter_results(lines, None, workers=workers, cancel_event=self.cancel_event, cache=cache,
+                                   metrics=self._metrics, resume_event=self.resume_event)
+            for result in results:
+                seen.add(key := keys.popleft())
+                if dedup is None or dedup.is_new(result):
+                    self._row_sources.append(key)
+                    self._row_identities.append(result.identity)
+                    batcher.put((key, result))
                 else:
-                    raise ValueError("پروتکل لینک شناسایی نشد.")
-            except Exception as e:
-                self.processing_queue.put({'type': 'failed', 'link': line, 'error': str(e)})
-            
-            self.processing_queue.put({'type': 'progress', 'value': i + 1})
-        
-        self.processing_queue.put({'type': 'finished'})
+                    self._collapsed_lines.append(key)
+        except Exception as e: # مثلاً BrokenProcessPool؛ بدون پیام پایان، پنجره در حالت پردازش می‌ماند
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            if results is not None: results.close()
+            if cache: cache.close()
+            # پیام پایان همیشه ارسال می‌شود، حتی اگر پردازش با خطا متوقف شده باشد
+            batcher.close(collapsed=dedup.collapsed - collapsed if dedup else 0, error=error)
+
+    def _prepare_incremental_run(self, reader, use_dedup, batcher):
+        """
+        (در ترد پردازش) خطوط اجراهای قبلی که دیگر در ورودی نیستند (حذف یا ویرایش‌شده) با یک پیمایش سبک
+        (فقط اثر انگشت خطوط) پیدا و سطرهایشان با پیام retire کنار گذاشته می‌شوند. خطوطی که قبلاً تکراری
+        شمرده شده بودند، اگر سطری کنار رفته یا حذف تکراری خاموش باشد، دوباره پردازش می‌شوند؛ ایندکس حذف
+        تکراری از هویت سطرهای باقی‌مانده ساخته می‌شود تا لینک‌های جدید با نتایج قبلی هم مقایسه شوند.
+        خروجی: (خطوط پردازش‌شده، Deduplicator یا None)، یا None اگر پردازش در حین بررسی لغو شود.
+        """
+        seen = self._seen_lines
+        stale = set()
+        if len(seen):
+            present = FingerprintSet(len(seen))
+            errors = len(reader.errors)
+            for line in expand_subscriptions(iter_clean_lines(reader)):
+                if self.cancel_event.is_set(): return None
+                present.add(fingerprint(line))
+            # پیشرفت و خطاهای خواندن فقط در پیمایش اصلی شمرده می‌شوند
+            reader.done_size = 0
+            del reader.errors[errors:]
+            stale = {key for key in seen if key not in present}
+
+        reprocess = set(self._collapsed_lines) if stale or not use_dedup else set()
+        if drop := stale | reprocess:
+            kept = FingerprintSet(len(seen))
+            for key in seen:
+                if key not in drop: kept.add(key)
+            seen = self._seen_lines = kept
+            self._collapsed_lines = array('Q')
+        if stale:
+            keep = [key not in stale for key in self._row_sources]
+            self._row_sources = array('Q', compress(self._row_sources, keep))
+            self._row_identities = array('Q', compress(self._row_identities, keep))
+            self._dedup = None
+            batcher.send('retire', sources=stale)
+
+        if not use_dedup:
+            self._dedup = None
+        elif self._dedup is None:
+            index = FingerprintSet(len(self._row_identities))
+            for identity in self._row_identities: index.add(identity)
+            self._dedup = Deduplicator(index)
+        return seen, self._dedup
+
+    def _retire_rows(self, sources):
+        """سطرهای خطوط حذف یا ویرایش‌شده را در همه جداول کنار می‌گذارد."""
+        for table in self._tables():
+            retired = table.model.retire(sources)
+            if table is not self.original_names_table: self._retired_rows += retired
+            table.refresh()
 
     def _check_queue(self):
-        """به صورت دوره‌ای صف را برای دریافت آپدیت از ترد پردازش چک می‌کند."""
+        """
+        [بهینه‌شده] پیام‌های دسته‌ای را از صف دریافت کرده و در هر تیک فقط به اندازه
+        QUEUE_TICK_BUDGET نتیجه رندر می‌کند؛ باقی‌مانده در تیک بعدی ادامه می‌یابد.
+        """
+        tick_start = time.perf_counter()
+        deadline = tick_start + QUEUE_TICK_BUDGET
+        pending = self._pending_results
+        if metrics := self._metrics: metrics.sample_queue(self.processing_queue.qsize())
         try:
-            while not self.processing_queue.empty():
+            # تا وقتی کار معوق زیاد است از صف برداشته نمی‌شود تا صف محدود، تولیدکننده را متوقف کند
+            while len(pending) < MAX_PENDING_RESULTS:
                 msg = self.processing_queue.get_nowait()
-                
-                if msg['type'] == 'progress':
-                    self.progress_bar['value'] = msg['value']
-                    self.update_status(f"در حال پردازش... ({msg['value']}/{self.progress_bar['maximum']})")
-                
+                if msg['type'] == 'batch':
+                    pending.extend(msg['items'])
+                elif msg['type'] == 'retire':
+                    self._retire_rows(msg['sources'])
                 elif msg['type'] == 'finished':
-                    self.progress_bar.pack_forget()
-                    self.process_button.config(state=tk.NORMAL)
-                    self.load_button.config(state=tk.NORMAL)
-                    self.clear_button.config(state=tk.NORMAL)
-                    total_success = len(self.v2ray_tree.get_children()) + len(self.telegram_tree.get_children())
-                    total_failed = len(self.failed_links_tree.get_children())
-                    self.update_status(f"پردازش کامل شد: {total_success} موفق، {total_failed} ناموفق.")
-                    return
-                
-                elif msg['type'] == 'failed':
-                    self._add_item_to_tree(self.failed_links_tree, msg, ('link', 'error'))
-                
-                elif msg['type'] in ['v2ray', 'trojan', 'vless', 'vmess', 'ss']:
-                    self._add_item_to_tree(self.v2ray_tree, msg, ("protocol", "host", "port", "name", "details"))
-                    if msg.get('original_name'):
-                        self._add_item_to_tree(self.original_names_tree, {'name': msg['original_name']}, ('name',))
-
-                elif msg['type'] == 'telegram':
-                    self._add_item_to_tree(self.telegram_tree, msg, ("server", "port", "secret"))
-                    if msg.get('original_name'):
-                        self._add_item_to_tree(self.original_names_tree, {'name': msg['original_name']}, ('name',))
-
+                    self._producer_finished = True
+                    self._collapsed = msg['collapsed']
+                    self._processing_error = msg['error']
+                self._processing_done = msg['done']
         except queue.Empty:
             pass
-        finally:
-            if self.process_button['state'] == tk.DISABLED:
-                self.after(100, self._check_queue)
-
-    # --- Parsing Logic ---
-    def _parse_link(self, line, new_name):
-        """[اصلاح شده] تشخیص پروتکل با اولویت تلگرام."""
-        # ابتدا لینک‌های تلگرام بررسی می‌شوند چون از پروتکل استاندارد https استفاده می‌کنند
-        if any(line.lower().startswith(p) for p in TELEGRAM_PROTOCOLS):
-            return self._parse_telegram(line, new_name)
-
-        # سپس سایر پروتکل‌های خاص بررسی می‌شوند
-        protocol_match = re.match(r"(\w+)://", line)
-        if not protocol_match:
-            return None # فرمت لینک شناخته شده نیست
-
-        protocol = protocol_match.group(1).lower()
-        if f"{protocol}://" in V2RAY_PROTOCOLS:
-            parser_func = getattr(self, f"_parse_{protocol}", None)
-            if parser_func:
-                return parser_func(line, new_name)
-        
-        return None
 
-    def _parse_vmess(self, line, new_name):
-        content = line.replace("vmess://", "", 1)
-        try:
-            vmess_data = json.loads(base64.b64decode(content + '=' * (-len(content) % 4)).decode('utf-8'))
-        except (json.JSONDecodeError, UnicodeDecodeError):
-            raise ValueError("رشته VMess دارای فرمت Base64 یا JSON نامعتبر است.")
-
-        data = {
-            'type': 'vmess', 'protocol': 'VMESS', 'name': new_name,
-            'host': vmess_data.get('add', 'N/A'), 'port': vmess_data.get('port', 'N/A'),
-            'details': f"SNI:{vmess_data.get('sni', vmess_data.get('host', 'N/A'))} | Net:{vmess_data.get('net', 'N/A')}",
-            'original_name': urllib.parse.unquote(vmess_data.get('ps', '(بدون نام)'))
-        }
-        vmess_data['ps'] = new_name
-        new_b64 = base64.b64encode(json.dumps(vmess_data, separators=(',', ':')).encode('utf-8')).decode('utf-8').rstrip("=")
-        data['modified_link'] = f"vmess://{new_b64}"
-        return data
-    
-    def _parse_ss(self, line, new_name):
-        """[اصلاح شده] پردازشگر مقاوم برای لینک‌های Shadowsocks."""
-        data = {'type': 'ss', 'protocol': 'SS', 'name': new_name}
-        
-        match = re.match(r"ss://(?P<user_info>[^@#?]+)@(?P<host>[^:@#?]+):(?P<port>\d+)(?:\?(?P<query>[^#]*))?(?:#(?P<tag>.*))?$", line)
-        
-        if not match:
-            raise ValueError("ساختار لینک SS نامعتبر است یا پشتیبانی نمی‌شود.")
-        
-        parts = match.groupdict()
-        # [اصلاح] بخش اطلاعات کاربر قبل از رمزگشایی، URL-Decode می‌شود
-        user_info = urllib.parse.unquote(parts['user_info'])
-        tag = parts.get('tag')
-        
-        data['original_name'] = urllib.parse.unquote(tag) if tag else '(بدون نام)'
-        
-        try:
-            decoded_part = base64.urlsafe_b64decode(user_info + '=' * (-len(user_info) % 4)).decode('utf-8')
-            method, password = decoded_part.split(':', 1)
-        except Exception:
-            raise ValueError("بخش اطلاعات کاربری (Base64) لینک SS نامعتبر است.")
-        
-        data.update({'host': parts['host'], 'port': parts['port'], 'details': f"Method: {method}"})
-        if parts.get('query'):
-            data['details'] += f" | Plugin: {parts['query'][:30]}"
+        while pending and time.perf_counter() < deadline:
+            for _ in range(min(len(pending), 100)):
+                self._render_result(*pending.popleft())
+        for table in self._tables():
+            table.notify_changed()
 
-        base_link = line.split('#')[0]
-        data['modified_link'] = f"{base_link}#{urllib.parse.quote(new_name)}"
-        return data
+        if metrics:
+            metrics.ticks.add(time.perf_counter() - tick_start)
+            self.metrics_label.config(text=metrics.summary())
 
-    def _parse_vless_or_trojan(self, line, new_name, protocol_type):
-        """پردازشگر عمومی و مقاوم برای لینک‌های VLESS و Trojan."""
-        data = {'type': protocol_type, 'protocol': protocol_type.upper(), 'name': new_name}
-        
-        pattern = re.compile(
-            r"^(?P<protocol>vless|trojan)://"
-            r"(?P<user_info>[^@]+)@"
-            r"(?P<host>[^:?#]+):(?P<port>\d+)"
-            r"\??(?P<query>[^#]*)"
-            r"#?(?P<fragment>.*)$"
-        )
-        match = pattern.match(line)
-        if not match:
-            raise ValueError(f"ساختار لینک {protocol_type.upper()} نامعتبر است.")
-        
-        parts = match.groupdict()
-        data['host'] = parts['host']
-        data['port'] = parts['port']
-        data['original_name'] = urllib.parse.unquote(parts['fragment']) if parts['fragment'] else '(بدون نام)'
-        
-        query_params = dict(urllib.parse.parse_qsl(parts['query']))
-        sni = query_params.get('sni', query_params.get('peer', parts['host']))
-        path = query_params.get('path', 'N/A')
-        net_type = query_params.get('type', 'N/A')
-        data['details'] = f"SNI: {sni} | Net: {net_type} | Path: {path[:20]}"
-        
-        base_link = f"{parts['protocol']}://{parts['user_info']}@{parts['host']}:{parts['port']}"
-        if parts['query']:
-            base_link += f"?{parts['query']}"
-        data['modified_link'] = f"{base_link}#{urllib.parse.quote(new_name)}"
-        return data
+        if self._producer_finished and not pending:
+            self._finish_processing()
+            return
+
+        reader = self._running_reader
+        self.progress_bar['value'] = reader.done_size
+        cache = f" | {self._running_cache.stats()}" if self._running_cache else ""
+        state = "در حال پردازش..." if self.resume_event.is_set() else "⏸ متوقف شده"
+        self.update_status(f"{state} ({self._processing_done} لینک جدید، {100 * reader.done_size // max(1, reader.total_size)}٪){cache}")
+        self.after(1 if pending else 50, self._check_queue)
+
+    # --- Reachability Probe ---
+
+    def start_probe(self):
+        """
+        نقاط پایانی یکتای جداول V2Ray و تلگرام در یک ترد جداگانه با asyncio بررسی می‌شوند؛
+        کلیک دوباره روی همین دکمه بررسی را متوقف می‌کند.
+        """
+        if self._probe:
+            self._probe['cancel'].set()
+            return
+        if str(self.process_button['state']) == tk.DISABLED:
+            self.update_status("تا پایان پردازش صبر کنید.", error=True)
+            return
 
-    def _parse_vless(self, line, new_name):
-        return self._parse_vless_or_trojan(line, new_name, 'vless')
+        # نقطه پایانی -> سطرهای متناظر (اندیس ذخیره‌سازی) در هر جدول
+        targets = {}
+        for table, host_column in ((self.v2ray_table, 'host'), (self.telegram_table, 'server')):
+            model = table.model
+            for i, (host, port) in enumerate(zip(model.column_values(host_column), model.column_values('port'))):
+                if model.is_retired(i): continue
+                if (key := endpoint_key(host, port)) is not None: targets.setdefault(key, []).append((model, i))
+        if not targets:
+            self.update_status("سروری برای بررسی وجود ندارد.", error=True)
+            return
 
-    def _parse_trojan(self, line, new_name):
-        return self._parse_vless_or_trojan(line, new_name, 'trojan')
+        self.process_button.config(state=tk.DISABLED)
+        self.clear_button.config(state=tk.DISABLED)
+        self.probe_button.config(text="⏹ توقف بررسی")
+        self._probe = probe = {'targets': targets, 'results': deque(), 'cancel': threading.Event(), 'done': 0, 'alive': 0, 'finished': False}
+        thread = threading.Thread(target=self._run_probe, args=(probe,), daemon=True)
+        thread.start()
+        self.after(PROBE_POLL_INTERVAL, self._check_probe)
 
-    def _parse_telegram(self, line, new_name):
-        """پردازشگر پراکسی تلگرام با قابلیت استخراج نام از فرگمنت (#)."""
+    def _run_probe(self, probe):
+        """این متد در یک ترد جداگانه اجرا می‌شود؛ نتایج در یک deque (امن برای ترد) قرار می‌گیرند."""
         try:
-            parsed_url = urllib.parse.urlsplit(line)
-            params = dict(urllib.parse.parse_qsl(parsed_url.query))
-        except Exception:
-            raise ValueError("ساختار URL لینک تلگرام نامعتبر است.")
-
-        if not all(k in params for k in ["server", "port", "secret"]):
-            raise ValueError("لینک تلگرام ناقص است (فاقد سرور، پورت یا سکرت).")
-
-        data = {
-            'type': 'telegram',
-            'server': params.get("server"),
-            'port': params.get("port"),
-            'secret': params.get("secret"),
-            'modified_link': line,
-            'original_link': line,
-            'original_name': urllib.parse.unquote(parsed_url.fragment) if parsed_url.fragment else params.get("server")
-        }
-        return data
-        
+            probe_endpoints(list(probe['targets']), cancel_event=probe['cancel'], on_result=lambda key, latency: probe['results'].append((key, latency)))
+        finally:
+            probe['finished'] = True
+
+    def _check_probe(self):
+        probe = self._probe
+        finished = probe['finished'] # پیش از خالی کردن صف خوانده می‌شود تا نتیجه‌ای جا نماند
+        updates = {} # model -> [(row, latency)]
+        results, targets = probe['results'], probe['targets']
+        while results:
+            key, latency = results.popleft()
+            probe['done'] += 1
+            probe['alive'] += latency is not None
+            for model, i in targets[key]: updates.setdefault(model, []).append((i, latency))
+        for model, items in updates.items(): model.set_values('latency', items)
+        if updates and self.alive_only_var.get():
+            for table in (self.v2ray_table, self.telegram_table): table.model.refresh_view()
+        for table in (self.v2ray_table, self.telegram_table): table.refresh()
+
+        summary = f"{probe['done']} از {len(targets)} سرور، {probe['alive']} در دسترس"
+        if not finished:
+            self.update_status(f"در حال بررسی دسترسی... ({summary})")
+            self.after(PROBE_POLL_INTERVAL, self._check_probe)
+            return
+        self._probe = None
+        self.process_button.config(state=tk.NORMAL)
+        self.clear_button.config(state=tk.NORMAL)
+        self.probe_button.config(text="📡 بررسی دسترسی سرورها")
+        for table in (self.v2ray_table, self.telegram_table):
+            table.model.refresh_view() # مرتب‌سازی فعلی (مثلاً بر اساس تأخیر) با مقادیر جدید
+            table.refresh()
+        self.update_status(f"بررسی دسترسی {'متوقف' if probe['cancel'].is_set() else 'کامل'} شد: {summary}.")
+
+    # --- GeoIP ---
+
+    def load_geo_database(self):
+        """پایگاه داده GeoIP/ASN ساخته‌شده با vpn_geo.py؛ فایل با mmap باز می‌شود و در حافظه خوانده نمی‌شود."""
+        if not (path := filedialog.askopenfilename(title="انتخاب پایگاه داده GeoIP")): return
+        try:
+            database = GeoDatabase(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("خطا", f"خطا در بارگذاری پایگاه داده GeoIP:\n{e}")
+            return
+        previous, self._geo = self._geo, GeoLookup(database)
+        self.geo_label.config(text=f"🌍 {os.path.basename(path)} ({database.ranges} بازه)")
+        if self._tag is not None: self._apply_name(NameTemplate(self._tag))
+        self.update_status("پایگاه داده GeoIP بارگذاری شد.")
+        if previous is not None:
+            # پایگاه داده قبلی تا پایان resolve در حال اجرا (که از آن می‌خواند) باز می‌ماند
+            if job := self._geo_resolve:
+                job['cancel'].set()
+                job['close'] = previous.database
+            else:
+                previous.database.close()
+        if str(self.process_button['state']) != tk.DISABLED: self._start_geo_resolve()
+
+    def _start_geo_resolve(self):
+        """
+        اگر قالب نام به کشور یا ASN نیاز دارد، نام دامنه سرورهای جدول V2Ray در یک ترد جداگانه resolve
+        می‌شوند؛ تا پایان آن، کشور این سرورها ناشناخته نمایش داده می‌شود.
+        """
+        namer = self.v2ray_table.model.tag
+        if self._geo_resolve or not isinstance(namer, Namer) or namer.geo is None: return
+        hosts = list(self.v2ray_table.model.column_values('host'))
+        self._geo_resolve = job = {'cancel': threading.Event(), 'result': None, 'finished': False, 'close': None}
+        thread = threading.Thread(target=self._run_geo_resolve, args=(namer.geo, hosts, job), daemon=True)
+        thread.start()
+        self.after(PROBE_POLL_INTERVAL, self._check_geo_resolve)
+
+    def _run_geo_resolve(self, geo, hosts, job):
+        """این متد در یک ترد جداگانه اجرا می‌شود."""
+        try:
+            job['result'] = geo.resolve(hosts, cancel_event=job['cancel'])
+        finally:
+            job['finished'] = True
+
+    def _check_geo_resolve(self):
+        job = self._geo_resolve
+        if not job['finished']:
+            self.after(PROBE_POLL_INTERVAL, self._check_geo_resolve)
+            return
+        self._geo_resolve = None
+        if job['close'] is not None:
+            # پایگاه داده در حین resolve عوض شده بود: نسخه قبلی بسته و resolve با پایگاه داده جدید تکرار می‌شود
+            job['close'].close()
+            if str(self.process_button['state']) != tk.DISABLED: self._start_geo_resolve()
+            return
+        if not job['result'] or not job['result'][0]: return
+        model = self.v2ray_table.model
+        model.set_tag(model.tag) # نام‌های محاسبه‌شده برای مرتب‌سازی باطل می‌شوند
+        self.v2ray_table.refresh()
+        names, failed = job['result']
+        self.update_status(f"کشور سرورها مشخص شد: {names} نام دامنه resolve شد ({failed} ناموفق).")
+
+    def _render_result(self, source, record):
+        """یک نتیجه پردازش را در جدول مربوط به نوع آن قرار می‌دهد؛ source اثر انگشت خط ورودی آن است."""
+        if record.type == 'failed':
+            self.failed_links_table.model.append(record, source)
+
+        elif record.type in V2RAY_TYPES:
+            self.v2ray_table.model.append(record, source)
+            if record.original_name:
+                self.original_names_table.model.add_row((record.original_name,), source=source)
+
+        elif record.type == 'telegram':
+            self.telegram_table.model.append(record, source)
+            if record.original_name:
+                self.original_names_table.model.add_row((record.original_name,), source=source)
+
+    def toggle_pause(self):
+        if self.resume_event.is_set():
+            self.resume_event.clear()
+            self.pause_button.config(text="▶ ادامه")
+            self.update_status("پردازش متوقف شد.")
+        else:
+            self.resume_event.set()
+            self.pause_button.config(text="⏸ توقف موقت")
+
+    def cancel_processing(self):
+        """نتایج تا این لحظه حفظ می‌شوند؛ خطوط باقی‌مانده در پردازش بعدی ادامه می‌یابند."""
+        self.cancel_event.set()
+        self.resume_event.set()
+
+    def _finish_processing(self):
+        self.progress_bar.pack_forget()
+        self.run_controls.pack_forget()
+        if metrics := self._metrics:
+            metrics.finish()
+            self.metrics_label.config(text=metrics.summary())
+        self.process_button.config(state=tk.NORMAL)
+        self.load_button.config(state=tk.NORMAL)
+        self.clear_button.config(state=tk.NORMAL)
+        for table in self._tables(): # سطرهای جدید در حین پردازش بدون مرتب‌سازی و فیلتر به انتها اضافه شده بودند
+            if table.model.view_active:
+                table.model.refresh_view()
+                table.refresh()
+        total_success = self.v2ray_table.model.total + self.telegram_table.model.total
+        total_failed = self.failed_links_table.model.total
+        memory = sum(table.model.memory_usage() for table in self._tables())
+        per_link = memory // max(1, total_success + total_failed)
+        collapsed = f"، {self._collapsed} تکراری حذف شد" if self._collapsed else ""
+        collapsed += f"، {self._retired_rows} سطر خط حذف/ویرایش‌شده کنار رفت" if self._retired_rows else ""
+        cache = f" | {self._running_cache.stats()}" if self._running_cache else ""
+        state = "با خطا متوقف شد" if self._processing_error else "لغو شد" if self.cancel_event.is_set() else "کامل شد"
+        self.update_status(f"پردازش {state}: {self._processing_done} لینک جدید | کل: {total_success} موفق، {total_failed} ناموفق{collapsed}. (حافظه: ~{per_link} بایت برای هر لینک){cache}", error=bool(self._processing_error))
+        if self._processing_error:
+            messagebox.showerror("خطا", f"پردازش با خطا متوقف شد؛ نتایج تا این لحظه حفظ شده‌اند:\n{self._processing_error}")
+        if errors := self._running_reader.errors:
+            messagebox.showerror("خطا", "\n".join(f"خطا در خواندن فایل {path}:\n{e}" for path, e in errors))
+        self._start_geo_resolve()
+
     # --- Rendering and Data Management ---
-    
-    def _add_item_to_tree(self, tree, data, columns):
-        """یک آیتم به جدول (Treeview) اضافه کرده و آن را در مپ داده‌ها ذخیره می‌کند."""
-        values = tuple(data.get(k, 'N/A') for k in columns)
-        tag = 'evenrow' if len(tree.get_children()) % 2 == 0 else 'oddrow'
-        iid = tree.insert("", "end", values=values, tags=(tag,))
-        self.tree_data_map[iid] = data
+
+    def _tables(self):
+        return (self.v2ray_table, self.telegram_table, self.original_names_table, self.failed_links_table)
 
     def clear_results(self):
-        """تمام جداول خروجی و داده‌های ذخیره شده را پاک می‌کند."""
-        self.tree_data_map.clear()
-        for tree in [self.v2ray_tree, self.telegram_tree, self.original_names_tree, self.failed_links_tree]:
-            tree.delete(*tree.get_children())
-            
+        """تمام جداول خروجی و داده‌های ذخیره شده (و وضعیت پردازش تدریجی) را پاک می‌کند."""
+        self.alive_only_var.set(False)
+        self._reset_incremental_state()
+        for table in self._tables():
+            table.model.clear()
+            table.sort_column = None
+            table.reset()
+
+    def _reset_incremental_state(self):
+        self._seen_lines = FingerprintSet()
+        self._dedup = None
+        # به ازای هر سطر نتیجه: اثر انگشت خط ورودی و هویت لینک؛ و خطوطی که به عنوان تکراری حذف شدند
+        self._row_sources = array('Q')
+        self._row_identities = array('Q')
+        self._collapsed_lines = array('Q')
+
     def clear_all(self):
         if messagebox.askyesno("تایید", "تمام ورودی و خروجی‌ها پاک شوند؟"):
             self.input_text.delete("1.0", tk.END)
+            self.clear_input_sources()
             self.clear_results()
             self.update_status("آماده")
 
-    def get_full_links_from_tree(self, tree):
-        """لینک‌های کامل را از آیتم‌های موجود در یک جدول استخراج می‌کند."""
-        links = []
-        for iid in tree.get_children():
-            if data := self.tree_data_map.get(iid):
-                links.append(data.get('modified_link', data.get('link', '')))
-        return links
-        
-    def copy_selected(self, tree):
-        """لینک مربوط به آیتم انتخاب شده را با استفاده از iid کپی می‌کند (بدون باگ)."""
-        if not (selected_iid := tree.focus()): return
-        
-        if data := self.tree_data_map.get(selected_iid):
-            link_to_copy = data.get('modified_link', data.get('link', ''))
-            self.clipboard_clear()
-            self.clipboard_append(link_to_copy)
-            self.update_status("لینک انتخاب شده کپی شد.")
-        else:
-            self.update_status("خطا در بازیابی لینک.", error=True)
+    def copy_selected(self, table):
+        """لینک مربوط به سطر انتخاب شده را مستقیماً از مدل جدول کپی می‌کند."""
+        if table.selected is None or table.selected >= len(table.model): return
+
+        self.clipboard_clear()
+        self.clipboard_append(table.model.link(table.selected))
+        self.update_status("لینک انتخاب شده کپی شد.")
 
-    def copy_all(self, tree):
-        if links := self.get_full_links_from_tree(tree):
+    def copy_all(self, table):
+        if links := list(filter(None, table.model.iter_links())):
             self.clipboard_clear()
-            self.clipboard_append("\n".join(filter(None, links)))
+            self.clipboard_append("\n".join(links))
             self.update_status(f"{len(links)} لینک در کلیپ‌بورد کپی شد.")
         else:
             self.update_status("محتوایی برای کپی کردن وجود ندارد.", error=True)
     
-    def save_to_file(self, tree):
-        if not (links := self.get_full_links_from_tree(tree)):
+    def save_to_file(self, table):
+        """
+        [بهینه‌شده] لینک‌ها مستقیماً از مدل جدول و در یک ترد جداگانه به صورت جریانی در فایل نوشته
+        می‌شوند؛ هیچ لیست یا رشته کاملی ساخته نمی‌شود و رابط کاربری در حین ذخیره فریز نمی‌شود.
+        """
+        if self._export:
+            self.update_status("ذخیره فایل دیگری در حال انجام است.", error=True)
+            return
+        if str(self.process_button['state']) == tk.DISABLED:
+            self.update_status("تا پایان پردازش صبر کنید.", error=True)
+            return
+        if not (total := len(table.model)):
             self.update_status("محتوایی برای ذخیره کردن وجود ندارد.", error=True)
             return
-        if not (filepath := filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text Documents", "*.txt")], title="ذخیره فایل")): return
+        label = self.export_format_var.get()
+        fmt = EXPORT_LABELS[label]
+        ext = EXPORT_EXTENSIONS[fmt]
+        filetypes = [(label, "*" + ext), ("All Files", "*.*")]
+        if not (filepath := filedialog.asksaveasfilename(defaultextension=ext, filetypes=filetypes, title="ذخیره فایل")): return
+
+        # تا پایان ذخیره، جدول نباید پاک یا با پردازش جدید جایگزین شود
+        self.process_button.config(state=tk.DISABLED)
+        self.clear_button.config(state=tk.DISABLED)
+        self._export = export = {'done': 0, 'total': total, 'writer': None, 'error': None, 'finished': False}
+        thread = threading.Thread(target=self._run_export, args=(table.model, filepath, fmt, export), daemon=True)
+        thread.start()
+        self.after(50, self._check_export, filepath)
+
+    def _run_export(self, model, filepath, fmt, export):
+        """این متد در یک ترد جداگانه اجرا می‌شود."""
         try:
             with open(filepath, 'w', encoding='utf-8') as f:
-                f.write("\n".join(filter(None, links)))
-            self.update_status(f"فایل با موفقیت در {filepath} ذخیره شد.")
+                export['writer'] = writer = open_writer(f, fmt)
+                for link in model.iter_links():
+                    if link: writer.write_link(link)
+                    export['done'] += 1
+                writer.close()
         except Exception as e:
-            self.update_status(f"خطا در ذخیره فایل: {e}", error=True)
+            export['error'] = e
+        export['finished'] = True
+
+    def _check_export(self, filepath):
+        export = self._export
+        if not export['finished']:
+            self.update_status(f"در حال ذخیره فایل... ({export['done']} از {export['total']} لینک)")
+            self.after(50, self._check_export, filepath)
+            return
+        self._export = None
+        self.process_button.config(state=tk.NORMAL)
+        self.clear_button.config(state=tk.NORMAL)
+        if export['error']:
+            self.update_status(f"خطا در ذخیره فایل: {export['error']}", error=True)
+            return
+        skipped = getattr(export['writer'], 'skipped', 0)
+        skipped = f" ({skipped} لینک بدون معادل در این قالب نادیده گرفته شد)" if skipped else ""
+        self.update_status(f"فایل با موفقیت در {filepath} ذخیره شد.{skipped}")
+
+    def save_profile(self):
+        if not self._metrics:
+            self.update_status("پروفایلی برای ذخیره وجود ندارد.", error=True)
+            return
+        filetypes = [("JSON", "*.json"), ("CSV", "*.csv")]
+        if not (filepath := filedialog.asksaveasfilename(defaultextension=".json", filetypes=filetypes, title="ذخیره پروفایل")): return
+        try:
+            self._metrics.dump(filepath)
+            self.update_status(f"پروفایل در {filepath} ذخیره شد.")
+        except OSError as e:
+            self.update_status(f"خطا در ذخیره پروفایل: {e}", error=True)
 
     # --- File Operations ---
     def load_from_file(self):
+        """
+        [بهینه‌شده] فایل‌ها خوانده نمی‌شوند، فقط به ورودی جریانی اضافه می‌شوند و هنگام پردازش
+        خط به خط (و در صورت بزرگ بودن با mmap) مستقیماً به پردازشگر داده می‌شوند.
+        """
         if not (filepaths := filedialog.askopenfilenames(title="انتخاب فایل(ها)")): return
-        all_links = []
+        added = 0
         for path in filepaths:
             try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    if path.lower().endswith('.json'): all_links.extend(self._extract_links_from_json(json.loads(content)))
-                    else: all_links.extend(content.splitlines())
-            except Exception as e: messagebox.showerror("خطا", f"خطا در خواندن فایل {path}:\n{e}")
-        
-        if all_links:
-            self.input_text.insert(tk.END, "\n".join(all_links) + "\n")
-            self.update_status(f"{len(filepaths)} فایل با موفقیت بارگذاری شد.")
-
-    def _extract_links_from_json(self, data):
-        links = []
-        if isinstance(data, str) and any(data.lower().startswith(p) for p in V2RAY_PROTOCOLS + TELEGRAM_PROTOCOLS): links.append(data)
-        elif isinstance(data, list): [links.extend(self._extract_links_from_json(item)) for item in data]
-        elif isinstance(data, dict): [links.extend(self._extract_links_from_json(value)) for value in data.values()]
-        return links
+                self.input_reader.add_file(path)
+                added += 1
+            except OSError as e: messagebox.showerror("خطا", f"خطا در خواندن فایل {path}:\n{e}")
+
+        if added:
+            self._update_sources_summary()
+            self.update_status(f"{added} فایل با موفقیت بارگذاری شد.")
 
 if __name__ == "__main__":
     app = VpnConfigEditorApp()
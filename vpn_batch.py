@@ -0,0 +1,162 @@
+"""
+نسخه خط فرمان (بدون رابط گرافیکی) ویرایشگر کانفیگ.
+لینک‌ها خط به خط از stdin یا فایل‌ها خوانده شده و به صورت جریانی پردازش می‌شوند،
+بنابراین مصرف حافظه به اندازه ورودی وابسته نیست.
+
+مثال:
+    python vpn_batch.py -n @vOXsafe subs.txt --failed failed.txt --names names.txt > renamed.txt
+    cat subs.txt | python vpn_batch.py -n @vOXsafe
+    python vpn_batch.py -n @vOXsafe -f base64 -o sub.txt subscription_base64.txt
+    python vpn_batch.py -n @vOXsafe --dedup --probe subs.txt > alive.txt
+    python vpn_batch.py -n "{flag}{country}-{protocol}-{index}" --geoip geo.bin --resolve subs.txt > named.txt
+"""
+import argparse
+import io
+import sqlite3
+import sys
+
+from vpn_cache import DEFAULT_CACHE_SIZE, ParseCache, default_cache_path
+from vpn_core import NameTemplate, iter_clean_lines, render_link
+from vpn_dedup import make_deduplicator
+from vpn_engine import DEFAULT_CHUNK_SIZE, default_workers, iter_results
+from vpn_export import EXPORT_FORMATS, open_writer
+from vpn_geo import GeoDatabase, GeoLookup, Namer
+from vpn_metrics import Metrics
+from vpn_probe import DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT, endpoint_key, probe_endpoints
+from vpn_sources import InputReader, expand_subscriptions
+
+
+def build_reader(paths):
+    """فایل‌های ورودی (یا stdin برای '-') را به ترتیب به یک InputReader اضافه می‌کند."""
+    reader = InputReader()
+    for path in paths or ['-']:
+        if path == '-': reader.add_stream(sys.stdin.buffer)
+        else: reader.add_file(path)
+    return reader
+
+
+def run(args, stdout):
+    template = NameTemplate(args.name)
+    database = GeoDatabase(args.geoip) if args.geoip else None
+    geo = GeoLookup(database) if database else None
+    # قالب نام: نتایج به صورت الگو تحویل و نام هر لینک هنگام نوشتن ساخته می‌شود
+    namer = None if template.fixed is not None else Namer(template, geo)
+    resolve = bool(namer and namer.geo and args.resolve)
+    reader = build_reader(args.inputs)
+    lines = expand_subscriptions(iter_clean_lines(reader))
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else stdout
+    writer = open_writer(out, args.format)
+    failed_out = open(args.failed, 'w', encoding='utf-8') if args.failed else None
+    names_out = open(args.names, 'w', encoding='utf-8') if args.names else None
+
+    workers = args.workers or default_workers()
+    cache = ParseCache(args.cache, args.cache_size * 1024 * 1024) if args.cache else None
+    metrics = Metrics() if args.profile else None
+    results = iter_results(lines, template.fixed, workers=workers, chunk_size=args.chunk_size, ordered=not args.unordered, cache=cache, metrics=metrics)
+    dedup = make_deduplicator(args.bloom) if args.dedup or args.bloom else None
+    # با بررسی دسترسی یا resolve نام سرورها، نتایج تا پایان آن مرحله نگه داشته می‌شوند
+    buffered = [] if args.probe or resolve else None
+
+    total_success = total_failed = 0
+    alive = servers = written = 0
+    resolved = None
+
+    def write(record):
+        nonlocal written
+        if namer is None or record.type == 'telegram':
+            writer.write_link(record.link)
+            return
+        written += 1
+        writer.write_link(render_link(record, namer.name(record.protocol, record.host, record.port, record.original_name, written)))
+
+    try:
+        for result in (dedup.filter(results) if dedup else results):
+            if result.type == 'failed':
+                total_failed += 1
+                if failed_out: failed_out.write(f"{result.link}\t{result.error}\n")
+                continue
+
+            total_success += 1
+            if buffered is None: write(result)
+            else: buffered.append(result)
+            if names_out and result.original_name:
+                names_out.write(result.original_name + "\n")
+        if resolve:
+            resolved = geo.resolve((record.host for record in buffered), args.probe_concurrency, args.probe_timeout)
+        if args.probe and buffered:
+            keys = [endpoint_key(record.host, record.port) for record in buffered]
+            endpoints = list(dict.fromkeys(key for key in keys if key is not None))
+            servers = len(endpoints)
+            latencies = probe_endpoints(endpoints, args.probe_concurrency, args.probe_timeout)
+            buffered = [record for record, key in zip(buffered, keys) if latencies.get(key) is not None]
+            alive = len(buffered)
+        for record in buffered or (): write(record)
+        writer.close()
+    finally:
+        results.close()
+        if cache: cache.close()
+        if database: database.close()
+        for f in (out, failed_out, names_out):
+            if f is not None and f is not stdout: f.close()
+        stdout.flush()
+
+    for path, error in reader.errors:
+        print(f"خطا در خواندن فایل {path}: {error}", file=sys.stderr)
+    if not args.quiet:
+        collapsed = f"، {dedup.collapsed} تکراری حذف شد" if dedup else ""
+        print(f"پردازش کامل شد: {total_success} موفق، {total_failed} ناموفق{collapsed}.", file=sys.stderr)
+        if resolved: print(f"resolve نام سرورها: {resolved[0]} نام، {resolved[1]} ناموفق.", file=sys.stderr)
+        if args.probe: print(f"بررسی دسترسی: {alive} لینک در دسترس، {total_success - alive} حذف شد ({servers} سرور یکتا).", file=sys.stderr)
+        if skipped := getattr(writer, 'skipped', 0): print(f"{skipped} لینک در قالب {args.format} معادلی نداشت و نوشته نشد.", file=sys.stderr)
+        if cache: print(cache.stats(), file=sys.stderr)
+    if metrics:
+        metrics.finish()
+        metrics.dump(args.profile)
+        if not args.quiet: print(metrics.summary(), file=sys.stderr)
+    return not reader.errors
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="تغییر نام دسته‌ای لینک‌های V2Ray/SS/Trojan و پراکسی تلگرام بدون رابط گرافیکی.")
+    parser.add_argument('inputs', nargs='*', help="فایل‌های ورودی ('-' یا خالی برای stdin). فایل‌های .json به صورت ساختاری و اشتراک‌های Base64 به صورت خودکار رمزگشایی می‌شوند.")
+    parser.add_argument('-n', '--name', required=True, help="نام جدید کانفیگ‌ها یا قالب نام، مثل {flag}{country}-{protocol}-{index} (فیلدها: protocol, host, port, name, index, country, flag, asn)")
+    parser.add_argument('-o', '--output', help="فایل خروجی لینک‌های تغییرنام‌یافته (پیش‌فرض: stdout)")
+    parser.add_argument('-f', '--format', choices=tuple(EXPORT_FORMATS), default='plain', help="قالب خروجی: هر لینک در یک خط، اشتراک Base64، proxies کلش (YAML) یا outbounds سینگ‌باکس (JSON) (پیش‌فرض: plain)")
+    parser.add_argument('--failed', help="فایل خروجی لینک‌های ناموفق (لینک و دلیل خطا با Tab جدا می‌شوند)")
+    parser.add_argument('--names', help="فایل خروجی نام‌های اصلی کانفیگ‌ها")
+    parser.add_argument('--dedup', action='store_true', help="حذف لینک‌های تکراری (بر اساس سرور، پورت، شناسه و پارامترهای انتقال؛ نه متن خام)")
+    parser.add_argument('--bloom', type=int, metavar='N', help="حذف تکراری با Bloom filter با حافظه ثابت برای حدود N لینک (برای ورودی‌های بسیار بزرگ)")
+    parser.add_argument('-j', '--workers', type=int, default=1, help="تعداد پروسه‌های پردازش موازی (0 = تمام هسته‌ها، پیش‌فرض: 1)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="تعداد خطوط هر دسته ارسالی به پروسه‌ها")
+    parser.add_argument('--cache', nargs='?', const=default_cache_path(), metavar='PATH', help=f"استفاده از کش دائمی نتایج پارس (پیش‌فرض: {default_cache_path()})")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024), metavar='MB', help="حداکثر حجم کش؛ سطرهای کم‌استفاده حذف می‌شوند")
+    parser.add_argument('--unordered', action='store_true', help="تحویل نتایج به ترتیب آماده شدن به جای ترتیب ورودی")
+    parser.add_argument('--probe', action='store_true', help="فقط لینک‌هایی که سرورشان به اتصال TCP پاسخ می‌دهد نوشته می‌شوند (لینک‌ها تا پایان بررسی در حافظه می‌مانند)")
+    parser.add_argument('--probe-timeout', type=float, default=DEFAULT_TIMEOUT, metavar='SEC', help=f"مهلت resolve و اتصال هر سرور (پیش‌فرض: {DEFAULT_TIMEOUT})")
+    parser.add_argument('--probe-concurrency', type=int, default=DEFAULT_CONCURRENCY, metavar='N', help=f"حداکثر اتصال‌های هم‌زمان (پیش‌فرض: {DEFAULT_CONCURRENCY})")
+    parser.add_argument('--geoip', metavar='PATH', help="پایگاه داده GeoIP/ASN ساخته‌شده با vpn_geo.py برای فیلدهای country، flag و asn قالب نام")
+    parser.add_argument('--resolve', action='store_true', help="resolve نام دامنه سرورها برای یافتن کشور آن‌ها (لینک‌ها تا پایان resolve در حافظه می‌مانند؛ هم‌زمانی و مهلت همان مقادیر probe است)")
+    parser.add_argument('--profile', metavar='PATH', help="اندازه‌گیری زمان پارس هر پروتکل و توان عملیاتی و ذخیره آن در PATH (.json یا .csv)")
+    parser.add_argument('-q', '--quiet', action='store_true', help="عدم چاپ خلاصه در stderr")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', newline='\n', write_through=False)
+    try:
+        if not run(args, stdout): return 1
+    except KeyboardInterrupt:
+        print("پردازش لغو شد.", file=sys.stderr)
+        return 130
+    except (OSError, sqlite3.Error, ValueError) as e:
+        print(f"خطا: {e}", file=sys.stderr)
+        return 1
+    finally:
+        stdout.detach()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,430 @@
+"""
+بنچمارک مراحل پردازش روی یک مجموعه لینک مصنوعی.
+هر مرحله (پارس، حذف تکراری، خواندن فایل، خروجی، بررسی دسترسی، GeoIP و کل مسیر موتور و رابط گرافیکی) جداگانه
+زمان‌گیری و نتیجه به صورت JSON چاپ یا ذخیره می‌شود تا اجراهای مختلف قابل مقایسه باشند.
+
+مثال:
+    python vpn_bench.py -n 100000 --errors 0.05 --duplicates 0.2 -o before.json
+    python vpn_bench.py -n 100000 --compare before.json
+"""
+import argparse
+import asyncio
+import base64
+import importlib.util
+import ipaddress
+import json
+import os
+import platform
+import random
+import sys
+import socket
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from vpn_core import NameTemplate, iter_clean_lines, process_line
+from vpn_dedup import Deduplicator
+from vpn_engine import default_workers, iter_results
+from vpn_export import EXPORT_EXTENSIONS, write_links
+from vpn_geo import GeoDatabase, GeoLookup, Namer, build_database, read_ranges
+from vpn_probe import DEFAULT_CONCURRENCY, probe_endpoints
+from vpn_sources import InputReader
+
+GUI_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Vpn renamer .py")
+PROTOCOL_WEIGHTS = {'vmess': 30, 'vless': 35, 'ss': 15, 'trojan': 12, 'telegram': 8}
+NAMES = ('🇩🇪 Germany', '🇳🇱 NL-Fast', 'US West', 'ایران سل', '@channel | free', 'Test Server')
+GEO_COUNTRIES = ('DE', 'NL', 'US', 'FR', 'GB', 'IR', 'TR', 'FI', 'SG', 'JP', 'CA', 'RU')
+GEO_RANGES = 300_000 # تعداد بازه‌های پایگاه داده GeoIP مصنوعی (هم‌اندازه پایگاه‌های واقعی کشور/ASN)
+
+
+# --- Corpus ---
+
+class CorpusGenerator:
+    """
+    تولید لینک‌های مصنوعی ولی واقع‌گرایانه (نام‌های یونیکد، پارامترهای انتقال، پورت‌های متنوع).
+    error_rate نسبت خطوط خراب و duplicate_ratio نسبت لینک‌هایی است که تکرار یک لینک قبلی
+    (عیناً یا فقط با نام متفاوت) هستند. با seed یکسان خروجی یکسان است.
+    """
+    def __init__(self, error_rate=0.05, duplicate_ratio=0.1, seed=1):
+        self.error_rate = error_rate
+        self.duplicate_ratio = duplicate_ratio
+        self.random = random.Random(seed)
+        self._recent = []
+        self._protocols = list(PROTOCOL_WEIGHTS)
+        self._weights = list(PROTOCOL_WEIGHTS.values())
+
+    def lines(self, count):
+        for _ in range(count): yield self.line()
+
+    def line(self):
+        rnd = self.random
+        roll = rnd.random()
+        if roll < self.error_rate: return self._broken()
+        if roll < self.error_rate + self.duplicate_ratio and self._recent: return self._duplicate(rnd.choice(self._recent))
+        link = getattr(self, f"_{rnd.choices(self._protocols, self._weights)[0]}")()
+        if len(self._recent) < 1000: self._recent.append(link)
+        else: self._recent[rnd.randrange(1000)] = link
+        return link
+
+    def _host(self):
+        rnd = self.random
+        if rnd.random() < 0.5: return f"{rnd.randint(1, 223)}.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}"
+        return f"{rnd.choice(('cdn', 'node', 'srv', 'edge'))}{rnd.randint(1, 9999)}.{rnd.choice(('example.com', 'proxy.net', 'fast.ir'))}"
+
+    def _port(self):
+        return self.random.choice((443, 443, 443, 80, 8080, 8443, 2053, 2087, self.random.randint(1024, 65535)))
+
+    def _uuid(self):
+        return '%08x-%04x-%04x-%04x-%012x' % tuple(self.random.getrandbits(b) for b in (32, 16, 16, 16, 48))
+
+    def _name(self):
+        return f"{self.random.choice(NAMES)} {self.random.randint(1, 999)}"
+
+    def _vmess(self):
+        rnd = self.random
+        host = self._host()
+        data = {'v': '2', 'ps': self._name(), 'add': host, 'port': str(self._port()), 'id': self._uuid(), 'aid': '0',
+                'scy': 'auto', 'net': rnd.choice(('ws', 'tcp', 'grpc')), 'type': 'none', 'host': host,
+                'path': rnd.choice(('/', '/ws', '/vmess?ed=2048')), 'tls': rnd.choice(('tls', '')), 'sni': host}
+        return "vmess://" + base64.b64encode(json.dumps(data, ensure_ascii=False).encode('utf-8')).decode('ascii')
+
+    def _vless(self):
+        rnd = self.random
+        host = self._host()
+        params = {'type': rnd.choice(('ws', 'tcp', 'grpc')), 'security': rnd.choice(('tls', 'reality', 'none')),
+                  'sni': host, 'fp': 'chrome', 'path': '/ws', 'encryption': 'none'}
+        return f"vless://{self._uuid()}@{host}:{self._port()}?{urllib.parse.urlencode(params)}#{urllib.parse.quote(self._name())}"
+
+    def _trojan(self):
+        host = self._host()
+        return f"trojan://{self._uuid()[:12]}@{host}:{self._port()}?sni={host}&type=tcp#{urllib.parse.quote(self._name())}"
+
+    def _ss(self):
+        rnd = self.random
+        user = f"{rnd.choice(('aes-256-gcm', 'chacha20-ietf-poly1305', 'aes-128-gcm'))}:{self._uuid()[:16]}"
+        user_info = base64.urlsafe_b64encode(user.encode()).decode().rstrip('=')
+        return f"ss://{user_info}@{self._host()}:{self._port()}#{urllib.parse.quote(self._name())}"
+
+    def _telegram(self):
+        secret = '%032x' % self.random.getrandbits(128)
+        return f"https://t.me/proxy?server={self._host()}&port={self._port()}&secret={secret}"
+
+    def _broken(self):
+        rnd = self.random
+        return rnd.choice((
+            lambda: "vless://" + self._uuid(),
+            lambda: "vmess://" + base64.b64encode(b'{"add": broken').decode(),
+            lambda: "ss://not-base64@" + self._host(),
+            lambda: "just some text " + str(rnd.randint(0, 10 ** 6)),
+        ))()
+
+    def _duplicate(self, link):
+        # نیمی عیناً تکرار می‌شوند و نیمی فقط با نام (fragment) متفاوت
+        if self.random.random() < 0.5 or '#' not in link: return link
+        return link.partition('#')[0] + '#' + urllib.parse.quote(self._name())
+
+
+def write_corpus(path, lines, encoding='plain'):
+    """مجموعه را به صورت خط به خط یا یک اشتراک Base64 در فایل می‌نویسد."""
+    with open(path, 'w', encoding='utf-8') as f:
+        write_links(lines, f, encoding)
+
+
+def write_base64_documents(path, lines, documents=8):
+    """
+    مجموعه را به صورت چند اشتراک Base64 پشت سر هم (هر کدام در یک خط) می‌نویسد؛ نیمی از اشتراک‌ها
+    بدون padding هستند (طول متنشان مضرب ۳ است) تا تشخیص مرز اشتراک‌ها بدون padding هم بررسی شود.
+    """
+    size = -(-len(lines) // documents)
+    with open(path, 'wb') as f:
+        for i in range(0, len(lines), size):
+            text = "\n".join(lines[i:i + size]).encode('utf-8')
+            if i // size % 2 == 0: text += b' ' * (-len(text) % 3)
+            f.write(base64.b64encode(text) + b"\n")
+
+
+# --- Stages ---
+
+def _result(seconds, items, **extra):
+    return {'seconds': round(seconds, 4), 'items': items, 'per_item_us': round(seconds / max(1, items) * 1e6, 3),
+            'per_second': round(items / seconds) if seconds else None, **extra}
+
+
+def _check(result, ok, message):
+    """نتیجه نادرست یک مرحله (نه فقط کند) در error ثبت می‌شود و خروجی برنامه را ناموفق می‌کند."""
+    if not ok: result['error'] = message
+
+
+def _timed(func, repeat=1):
+    """بهترین زمان از repeat اجرا و خروجی آخرین اجرا."""
+    best, value = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, value
+
+
+def bench_parse(lines, repeat):
+    seconds, records = _timed(lambda: [process_line(line, 'bench') for line in lines], repeat)
+    by_type = {}
+    for record in records: by_type[record.type] = by_type.get(record.type, 0) + 1
+    return _result(seconds, len(lines), types=by_type), records
+
+
+def bench_dedup(records, repeat):
+    def run():
+        dedup = Deduplicator()
+        kept = sum(1 for _ in dedup.filter(records))
+        return kept, dedup.collapsed
+    seconds, (kept, collapsed) = _timed(run, repeat)
+    return _result(seconds, len(records), kept=kept, collapsed=collapsed)
+
+
+def bench_load(path, repeat):
+    def run():
+        reader = InputReader()
+        reader.add_file(path)
+        return sum(1 for _ in iter_clean_lines(reader))
+    seconds, count = _timed(run, repeat)
+    return _result(seconds, count, bytes=os.path.getsize(path))
+
+
+def bench_export(links, path, fmt, repeat):
+    def run():
+        with open(path, 'w', encoding='utf-8') as f:
+            return write_links(links, f, fmt)
+    seconds, count = _timed(run, repeat)
+    return _result(seconds, count, bytes=os.path.getsize(path))
+
+
+def write_geo_csv(path, count, seed=1):
+    """CSV بازه‌های مصنوعی (ابتدا، انتها، کشور، ASN) که کل فضای IPv4 عمومی را پوشش می‌دهند، به همراه count/10 بازه IPv6."""
+    rnd = random.Random(seed)
+    starts = sorted(set(rnd.randrange(1 << 24, 224 << 24) for _ in range(count)))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("ip_start,ip_end,country,asn\n")
+        for start, end in zip(starts, starts[1:] + [224 << 24]):
+            f.write(f"{ipaddress.IPv4Address(start)},{ipaddress.IPv4Address(end - 1)},{rnd.choice(GEO_COUNTRIES)},{rnd.randint(1, 400000)}\n")
+        for _ in range(count // 10):
+            start = (0x2000 << 112) | rnd.getrandbits(44) << 64
+            f.write(f"{ipaddress.IPv6Address(start)},{ipaddress.IPv6Address(start | (1 << 64) - 1)},{rnd.choice(GEO_COUNTRIES)},{rnd.randint(1, 400000)}\n")
+
+
+def bench_geo(records, tmp, repeat, ranges=GEO_RANGES, seed=1):
+    """ساخت پایگاه داده GeoIP از CSV، باز کردن آن (mmap)، جستجوی آدرس‌های تصادفی و نام‌گذاری با قالب کشوردار."""
+    csv_path, db_path = os.path.join(tmp, 'geo.csv'), os.path.join(tmp, 'geo.bin')
+    write_geo_csv(csv_path, ranges, seed)
+    start = time.perf_counter()
+    v4_count, v6_count = build_database(read_ranges(csv_path), db_path)
+    results = {'geo_build': _result(time.perf_counter() - start, v4_count + v6_count, bytes=os.path.getsize(db_path))}
+
+    seconds, _ = _timed(lambda: GeoDatabase(db_path).close(), max(repeat, 10))
+    results['geo_load'] = _result(seconds, 1, ranges=v4_count + v6_count)
+
+    rnd = random.Random(seed)
+    addresses = [str(ipaddress.IPv4Address(rnd.randrange(1 << 32))) for _ in range(max(1, len(records)))]
+    with GeoDatabase(db_path) as database:
+        seconds, found = _timed(lambda: sum(1 for address in addresses if database.lookup(address)[0]), repeat)
+        results['geo_lookup'] = _result(seconds, len(addresses), found=found)
+
+        template = NameTemplate('{flag}{country}-{protocol}-{index}')
+        named = [r for r in records if r.type != 'failed']
+        def run():
+            namer = Namer(template, GeoLookup(database)) # کش میزبان‌ها در هر تکرار خالی است
+            return [namer.name(r.protocol, r.host, r.port, r.original_name, i) for i, r in enumerate(named, 1)]
+        seconds, _ = _timed(run, repeat)
+        results['geo_name'] = _result(seconds, len(named))
+    return results
+
+
+def _closed_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def bench_probe(count, listeners=50, concurrency=DEFAULT_CONCURRENCY, timeout=1.0):
+    """
+    بررسی دسترسی روی سرورهای جایگزین محلی: نیمی از نقاط پایانی به listeners سرور در حال گوش دادن
+    (در یک event loop جداگانه) و نیم دیگر به پورت‌های بسته اشاره می‌کنند. تعداد سرورهای در دسترس
+    با مقدار مورد انتظار مقایسه می‌شود.
+    """
+    async def handle(reader, writer):
+        writer.close()
+
+    loop = asyncio.new_event_loop()
+    servers = [loop.run_until_complete(asyncio.start_server(handle, '127.0.0.1', 0, backlog=1024)) for _ in range(listeners)]
+    live = [server.sockets[0].getsockname()[1] for server in servers]
+    dead = [_closed_port() for _ in range(listeners)]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        # نقاط پایانی تکراری عمداً حذف نمی‌شوند تا تعداد اتصال‌ها برابر count باشد
+        endpoints = [('127.0.0.1', (live if i % 2 == 0 else dead)[i // 2 % listeners]) for i in range(count)]
+        alive = []
+        start = time.perf_counter()
+        probe_endpoints(endpoints, concurrency, timeout, on_result=lambda key, latency: alive.append(latency is not None))
+        seconds = time.perf_counter() - start
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        for server in servers: server.close()
+        loop.close()
+    result = _result(seconds, count, alive=sum(alive), expected_alive=(count + 1) // 2, concurrency=concurrency)
+    _check(result, result['alive'] == result['expected_alive'], f"{result['expected_alive']} سرور در دسترس انتظار می‌رفت")
+    return result
+
+
+def bench_engine(path, workers):
+    """کل مسیر بدون رابط گرافیکی: خواندن فایل، پارس (با workers پروسه) و تحویل نتایج."""
+    reader = InputReader()
+    reader.add_file(path)
+    start = time.perf_counter()
+    count = sum(1 for _ in iter_results(iter_clean_lines(reader), 'bench', workers=workers))
+    return _result(time.perf_counter() - start, count, workers=workers)
+
+
+def bench_gui(path, workers, timeout=600):
+    """
+    کل مسیر رابط گرافیکی: load_from_file، پردازش و رندر جداول و save_to_file روی یک پنجره واقعی Tk.
+    دیالوگ‌های فایل جایگزین می‌شوند. بدون نمایشگر (مثلاً بدون Xvfb) این مرحله رد می‌شود.
+    """
+    import tkinter as tk
+    spec = importlib.util.spec_from_file_location('vpn_renamer_gui', GUI_SCRIPT)
+    gui = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(gui)
+    try:
+        app = gui.VpnConfigEditorApp()
+    except tk.TclError as e:
+        return {'skipped': str(e)}
+
+    out_path = path + '.gui-out'
+    gui.filedialog.askopenfilenames = lambda **kw: (path,)
+    gui.filedialog.asksaveasfilename = lambda **kw: out_path
+    gui.messagebox.showerror = lambda *a, **kw: None
+    finished = []
+    finish = app._finish_processing
+    app._finish_processing = lambda: (finish(), finished.append(time.perf_counter()))
+    try:
+        app.update()
+        app.use_cache_var.set(False)
+        app.parallel_var.set(workers > 1)
+        app.workers_var.set(workers)
+
+        start = time.perf_counter()
+        app.load_from_file()
+        app.start_processing()
+        while not finished and time.perf_counter() - start < timeout:
+            app.update()
+        if not finished: return {'skipped': 'timeout'}
+        rendered = sum(len(table.model) for table in app._tables())
+
+        save_start = time.perf_counter()
+        app.save_to_file(app.v2ray_table)
+        while app._export: app.update() # ذخیره در ترد جداگانه انجام می‌شود
+        save_seconds = time.perf_counter() - save_start
+        return _result(finished[0] - start, rendered, workers=workers, save_seconds=round(save_seconds, 4))
+    finally:
+        app.destroy()
+        if os.path.exists(out_path): os.remove(out_path)
+
+
+# --- Main ---
+
+def run(args):
+    lines = list(CorpusGenerator(args.errors, args.duplicates, args.seed).lines(args.size))
+    report = {
+        'meta': {
+            'size': args.size, 'error_rate': args.errors, 'duplicate_ratio': args.duplicates, 'seed': args.seed,
+            'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': {},
+    }
+    results = report['results']
+    stages = set(args.stages)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plain_path = os.path.join(tmp, 'corpus.txt')
+        base64_path = os.path.join(tmp, 'corpus_b64.txt')
+        multi_path = os.path.join(tmp, 'corpus_b64_multi.txt')
+        write_corpus(plain_path, lines)
+        write_corpus(base64_path, lines, 'base64')
+        write_base64_documents(multi_path, lines)
+
+        if stages & {'parse', 'dedup', 'export', 'geo'}:
+            results['parse'], records = bench_parse(lines, args.repeat)
+            if 'dedup' in stages: results['dedup'] = bench_dedup(records, args.repeat)
+            if 'export' in stages:
+                links = [r.link for r in records if r.type != 'failed']
+                for fmt, ext in EXPORT_EXTENSIONS.items():
+                    results[f'export_{fmt}'] = bench_export(links, os.path.join(tmp, f'out_{fmt}{ext}'), fmt, args.repeat)
+            if 'geo' in stages: results.update(bench_geo(records, tmp, args.repeat, seed=args.seed))
+        if 'load' in stages:
+            results['load_plain'] = bench_load(plain_path, args.repeat)
+            results['load_base64'] = bench_load(base64_path, args.repeat)
+            results['load_base64_multi'] = result = bench_load(multi_path, args.repeat)
+            _check(result, result['items'] == results['load_plain']['items'], f"{results['load_plain']['items']} خط انتظار می‌رفت")
+        if 'probe' in stages:
+            results['probe'] = bench_probe(args.size)
+        if 'engine' in stages:
+            results['engine_1'] = bench_engine(plain_path, 1)
+            if args.workers > 1: results[f'engine_{args.workers}'] = bench_engine(plain_path, args.workers)
+        if 'gui' in stages:
+            results['gui'] = bench_gui(plain_path, args.workers)
+    return report
+
+
+def compare(report, baseline):
+    """نسبت زمان هر مرحله به اجرای پایه (کمتر از ۱ یعنی سریع‌تر)."""
+    ratios = {}
+    for stage, result in report['results'].items():
+        old = baseline.get('results', {}).get(stage, {})
+        if result.get('per_item_us') and old.get('per_item_us'):
+            ratios[stage] = round(result['per_item_us'] / old['per_item_us'], 3)
+    return ratios
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="بنچمارک مراحل پردازش لینک‌ها با خروجی JSON.")
+    parser.add_argument('-n', '--size', type=int, default=50_000, help="تعداد لینک‌های مجموعه مصنوعی")
+    parser.add_argument('--errors', type=float, default=0.05, help="نسبت خطوط خراب (پیش‌فرض: 0.05)")
+    parser.add_argument('--duplicates', type=float, default=0.1, help="نسبت لینک‌های تکراری (پیش‌فرض: 0.1)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3, help="تعداد تکرار هر مرحله؛ بهترین زمان گزارش می‌شود")
+    parser.add_argument('-j', '--workers', type=int, default=default_workers(), help="تعداد پروسه‌ها برای مراحل engine و gui")
+    parser.add_argument('--stages', nargs='+', default=['parse', 'dedup', 'load', 'export', 'probe', 'geo', 'engine', 'gui'],
+                        choices=['parse', 'dedup', 'load', 'export', 'probe', 'geo', 'engine', 'gui'])
+    parser.add_argument('--corpus', metavar='PATH', help="فقط مجموعه مصنوعی را در PATH بنویس و خارج شو")
+    parser.add_argument('-o', '--output', help="فایل JSON نتایج (پیش‌فرض: stdout)")
+    parser.add_argument('--compare', metavar='JSON', help="مقایسه با نتایج یک اجرای قبلی")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.corpus:
+        write_corpus(args.corpus, CorpusGenerator(args.errors, args.duplicates, args.seed).lines(args.size))
+        return 0
+
+    report = run(args)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            report['compare'] = compare(report, json.load(f))
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f: f.write(text + "\n")
+    else:
+        print(text)
+    if failed := [stage for stage, result in report['results'].items() if result.get('error')]:
+        print(f"نتیجه نادرست در مراحل: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
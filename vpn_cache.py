@@ -0,0 +1,143 @@
+"""
+کش دائمی نتایج پارس روی دیسک (SQLite).
+کلید هر سطر هش ۱۶ بایتی خط ورودی و مقدار آن فیلدهای رکورد الگو (مستقل از نام جدید) است؛
+بنابراین اجرای دوباره همان اشتراک با نام دیگر فقط لینک‌های جدید را پارس می‌کند و برای
+بقیه فقط نام جدید روی الگو اعمال می‌شود. خطوطی که پارس نشده‌اند ذخیره نمی‌شوند تا پشتیبانی از
+پروتکل یا قالب تازه بدون پاک کردن کش به آن‌ها برسد. با بزرگ‌تر شدن فایل از max_bytes، کم‌استفاده‌ترین
+سطرها حذف می‌شوند.
+"""
+import hashlib
+import marshal
+import os
+import sqlite3
+import time
+
+from vpn_core import LinkRecord
+
+CACHE_VERSION = 2 # با تغییر خروجی پارسرها (از جمله افزودن پروتکل جدید) افزایش می‌یابد تا کش قدیمی دور ریخته شود
+DEFAULT_CACHE_SIZE = 128 * 1024 * 1024
+LOOKUP_BATCH = 500 # تعداد پارامترهای هر پرس‌وجوی IN (کمتر از محدودیت SQLite)
+EVICT_TARGET = 0.8 # پس از پاک‌سازی، حجم کش به این نسبت از حداکثر می‌رسد
+
+
+def default_cache_path():
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'vpn_renamer', 'parse_cache.sqlite3')
+
+
+def line_key(line):
+    return hashlib.blake2b(line.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+class ParseCache:
+    """
+    کش نتایج پارس. اتصال SQLite فقط در تردی که آن را ساخته قابل استفاده است.
+    hits و misses تعداد لینک‌های یافته‌شده و پارس‌شده در این اجرا هستند.
+    [بهینه‌شده] نوشتن‌های هر دسته در یک تراکنش ثبت می‌شوند (نه هر سطر، و نه کل اجرا تا کاربر دیگر
+    همان فایل قفل نشود)، و زمان آخرین استفاده با دقت روز نگهداری می‌شود تا اجراهای مکرر در یک روز
+    هیچ UPDATE ای نداشته باشند. اگر پایگاه داده در حین اجرا خطا دهد (مثلاً قفل باشد)، کش غیرفعال و
+    خطا در error نگهداری می‌شود و پردازش بدون کش ادامه می‌یابد.
+    """
+    def __init__(self, path=None, max_bytes=DEFAULT_CACHE_SIZE):
+        self.path = path or default_cache_path()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.error = None
+        if os.path.dirname(self.path): os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL") # فقط روی پایگاه داده تازه اثر دارد
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS links (key BLOB PRIMARY KEY, record BLOB, used INTEGER) WITHOUT ROWID")
+        if self._meta('version') != CACHE_VERSION:
+            self._conn.execute("DELETE FROM links")
+            self._set_meta('version', CACHE_VERSION)
+        self.today = int(time.time() // 86400)
+
+    def _meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def _disable(self, error):
+        self.error = error
+        try: self._conn.rollback()
+        except sqlite3.Error: pass
+
+    def get_many(self, lines):
+        """برای هر خط، رکورد الگوی ذخیره‌شده یا None (لیستی هم‌طول با lines)."""
+        keys = [line_key(line) for line in lines]
+        found = {}
+        stale = [] # سطرهایی که امروز هنوز استفاده نشده بودند
+        try:
+            if self.error is None:
+                for start in range(0, len(keys), LOOKUP_BATCH):
+                    batch = keys[start:start + LOOKUP_BATCH]
+                    query = f"SELECT key, record, used FROM links WHERE key IN ({','.join('?' * len(batch))})"
+                    for key, record, used in self._conn.execute(query, batch):
+                        found[key] = record
+                        if used != self.today: stale.append((self.today, key))
+                if stale:
+                    self._conn.executemany("UPDATE links SET used = ? WHERE key = ?", stale)
+                    self._conn.commit()
+        except sqlite3.Error as e:
+            self._disable(e)
+        records = [LinkRecord(*marshal.loads(found[k])) if k in found else None for k in keys]
+        misses = records.count(None)
+        self.hits += len(records) - misses
+        self.misses += misses
+        return records
+
+    def put_many(self, lines, records):
+        """رکوردهای الگو (پیش از اعمال نام) را، به جز خطوط ناموفق، ذخیره و ثبت (commit) می‌کند."""
+        if self.error is not None: return
+        rows = [
+            (line_key(line), marshal.dumps(record.__reduce__()[1]), self.today)
+            for line, record in zip(lines, records) if record.type != 'failed'
+        ]
+        try:
+            self._conn.executemany("INSERT OR REPLACE INTO links VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+        except sqlite3.Error as e:
+            self._disable(e)
+
+    def size(self):
+        page_count, = self._conn.execute("PRAGMA page_count").fetchone()
+        free_count, = self._conn.execute("PRAGMA freelist_count").fetchone()
+        page_size, = self._conn.execute("PRAGMA page_size").fetchone()
+        return (page_count - free_count) * page_size
+
+    def evict(self):
+        """اگر حجم کش از max_bytes بیشتر باشد، قدیمی‌ترین سطرها (بر اساس آخرین استفاده) حذف می‌شوند."""
+        size = self.size()
+        if size <= self.max_bytes: return 0
+        count, = self._conn.execute("SELECT COUNT(*) FROM links").fetchone()
+        remove = count - int(count * self.max_bytes * EVICT_TARGET / size)
+        self._conn.execute("DELETE FROM links WHERE key IN (SELECT key FROM links ORDER BY used LIMIT ?)", (remove,))
+        self._conn.commit()
+        self._conn.executescript("PRAGMA incremental_vacuum;") # execute فقط یک صفحه آزاد می‌کند
+        return remove
+
+    def stats(self):
+        if self.error is not None: return f"کش: {self.hits} موجود، {self.misses} جدید (⚠ کش غیرفعال شد: {self.error})"
+        return f"کش: {self.hits} موجود، {self.misses} جدید"
+
+    def close(self):
+        try:
+            if self.error is None:
+                self._conn.commit()
+                self.evict()
+        except sqlite3.Error as e:
+            self.error = e
+        finally:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
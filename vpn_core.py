@@ -0,0 +1,377 @@
+"""
+هسته پردازش لینک‌ها، مستقل از رابط گرافیکی.
+این ماژول tkinter را import نمی‌کند تا در سرورها و حالت دسته‌ای (batch) هم قابل استفاده باشد.
+"""
+import json
+import urllib.parse
+import base64
+import hashlib
+import re
+import string
+
+# --- Constants ---
+V2RAY_PROTOCOLS = ['vless://', 'vmess://', 'ss://', 'trojan://', 'hysteria2://', 'hy2://', 'tuic://', 'wireguard://', 'wg://']
+TELEGRAM_PROTOCOLS = ['https://t.me/proxy?', 'tg://proxy?']
+V2RAY_TYPES = ('v2ray', 'trojan', 'vless', 'vmess', 'ss', 'hysteria2', 'tuic', 'wireguard')
+
+NO_NAME = '(بدون نام)'
+VMESS_NAME_SLOT = '"ps":"\\u0000"' # جای نام در متن JSON الگوی vmess
+TEMPLATE_FIELDS = ('protocol', 'host', 'port', 'name', 'index', 'country', 'flag', 'asn') # فیلدهای قالب نام (NameTemplate)
+TEMPLATE_SAMPLE = { # نمونه مقادیر فیلدهای قالب با نوع واقعی هر کدام (index عدد و بقیه رشته)
+    'protocol': 'VLESS', 'host': 'example.com', 'port': '443', 'name': 'server', 'index': 1,
+    'country': 'DE', 'flag': '\U0001F1E9\U0001F1EA', 'asn': 'AS3320',
+}
+
+
+class LinkRecord:
+    """
+    نتیجه پردازش یک لینک. به جای dict از __slots__ استفاده می‌شود تا هر رکورد حافظه کمتری
+    بگیرد و هنگام ارسال بین پروسه‌ها فقط یک tuple فشرده pickle شود.
+    برای پراکسی تلگرام host همان سرور و details همان سیکرت است؛ برای لینک ناموفق
+    link همان خط ورودی و details دلیل خطاست. identity اثر انگشت ۶۴ بیتی هویت سرور
+    (مستقل از نام، ترتیب پارامترها و padding) برای حذف تکراری‌هاست.
+    خروجی پارسرها مستقل از نام جدید است: link یک الگو است و apply_name نام را روی آن اعمال می‌کند.
+    """
+    __slots__ = ('type', 'protocol', 'name', 'host', 'port', 'details', 'original_name', 'link', 'identity')
+
+    def __init__(self, type, protocol='', name='', host='N/A', port='N/A', details='', original_name='', link='', identity=0):
+        self.type = type
+        self.protocol = protocol
+        self.name = name
+        self.host = host
+        self.port = port
+        self.details = details
+        self.original_name = original_name
+        self.link = link
+        self.identity = identity
+
+    def __reduce__(self):
+        return (LinkRecord, (self.type, self.protocol, self.name, self.host, self.port, self.details, self.original_name, self.link, self.identity))
+
+    def __repr__(self):
+        return f"LinkRecord({self.type!r}, host={self.host!r}, port={self.port!r}, link={self.link!r})"
+
+    # نام‌های مستعار برای ستون‌های جداول تلگرام و لینک‌های ناموفق
+    server = property(lambda self: self.host)
+    secret = property(lambda self: self.details)
+    error = property(lambda self: self.details)
+
+
+# --- Identity ---
+def fingerprint(*parts):
+    """اثر انگشت ۶۴ بیتی (غیر صفر) از اجزای هویت یک لینک."""
+    data = '\x1f'.join(map(str, parts)).encode('utf-8', 'surrogatepass')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little') or 1
+
+
+def normalize_host(host):
+    return str(host).strip('[]').rstrip('.').lower()
+
+
+def normalize_query(query):
+    """پارامترهای query به ترتیب مرتب‌شده و بدون مقادیر خالی، تا ترتیب پارامترها در هویت اثری نداشته باشد."""
+    return '&'.join(sorted(f"{k.lower()}={v}" for k, v in urllib.parse.parse_qsl(query) if v))
+
+
+# --- Parsing Logic ---
+# جدول توزیع scheme -> پارسر؛ پروتکل‌های جدید با register_parser اضافه می‌شوند
+PARSERS = {}
+
+_SS_PATTERN = re.compile(r"ss://(?P<user_info>[^@#?]+)@(?P<host>[^:@#?]+):(?P<port>\d+)(?:\?(?P<query>[^#]*))?(?:#(?P<tag>.*))?$")
+_VLESS_TROJAN_PATTERN = re.compile(
+    r"^(?P<protocol>vless|trojan)://"
+    r"(?P<user_info>[^@]+)@"
+    r"(?P<host>[^:?#]+):(?P<port>\d+)"
+    r"\??(?P<query>[^#]*)"
+    r"#?(?P<fragment>.*)$"
+)
+
+
+def register_parser(*schemes):
+    """دکوراتور ثبت پارسر برای یک یا چند scheme (بدون ://)."""
+    def decorator(func):
+        for scheme in schemes: PARSERS[scheme] = func
+        return func
+    return decorator
+
+
+def parse_link(line):
+    """[بهینه‌شده] تشخیص پروتکل با یک partition و یک جستجو در جدول توزیع (بدون regex)."""
+    scheme, sep, _ = line.partition('://')
+    if not sep: return None # فرمت لینک شناخته شده نیست
+    parser_func = PARSERS.get(scheme) or PARSERS.get(scheme.lower())
+    return parser_func(line) if parser_func else None
+
+
+def _is_port(text):
+    return text.isascii() and text.isdigit()
+
+
+def split_authority(line):
+    """
+    مسیر سریع (بدون regex) برای لینک‌های خوش‌فرم scheme://user@host:port[/][?query][#fragment].
+    برای هر حالت غیرعادی (IPv6، چند @، پورت نامعتبر) None برمی‌گرداند تا regex تصمیم بگیرد.
+    """
+    rest, _, fragment = line.partition('#')
+    rest = rest[rest.find('://') + 3:]
+    rest, _, query = rest.partition('?')
+    user_info, at, host_port = rest.partition('@')
+    if not at or not user_info or '@' in host_port: return None
+    host, colon, port = host_port.partition(':')
+    if not colon or not host or not _is_port(port): return None
+    return user_info, host, port, query, fragment
+
+
+def _query_details(pairs):
+    """پارامترهای query به ترتیب مرتب‌شده و بدون مقادیر خالی (همان normalize_query، بدون پارس دوباره)."""
+    return '&'.join(sorted(f"{k.lower()}={v}" for k, v in pairs if v))
+
+
+@register_parser('vmess')
+def parse_vmess(line):
+    content = line[line.find('://') + 3:]
+    try:
+        vmess_data = json.loads(base64.b64decode(content + '=' * (-len(content) % 4)).decode('utf-8'))
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise ValueError("رشته VMess دارای فرمت Base64 یا JSON نامعتبر است.")
+
+    record = LinkRecord(
+        'vmess', 'VMESS',
+        host=vmess_data.get('add', 'N/A'), port=vmess_data.get('port', 'N/A'),
+        details=f"SNI:{vmess_data.get('sni', vmess_data.get('host', 'N/A'))} | Net:{vmess_data.get('net', 'N/A')}",
+        original_name=urllib.parse.unquote(vmess_data.get('ps', NO_NAME)),
+        identity=fingerprint(
+            'vmess', normalize_host(vmess_data.get('add', '')), vmess_data.get('port', ''), vmess_data.get('id', ''),
+            *(vmess_data.get(k) or '' for k in ('net', 'type', 'host', 'path', 'tls', 'sni'))
+        )
+    )
+    # الگو متن JSON (بدون Base64) است؛ نام جدید بعداً فقط با یک جایگزینی و یک Base64 اعمال می‌شود
+    vmess_data['ps'] = '\0'
+    record.link = "vmess://" + json.dumps(vmess_data, separators=(',', ':'))
+    return record
+
+
+@register_parser('ss')
+def parse_ss(line):
+    """[اصلاح شده] پردازشگر مقاوم برای لینک‌های Shadowsocks."""
+    record = LinkRecord('ss', 'SS')
+
+    if line.startswith('ss://') and (parts := split_authority(line)) and ':' not in parts[0] and '#' not in parts[0]:
+        user_info, host, port, query, tag = parts
+    elif match := _SS_PATTERN.match(line):
+        user_info, host, port, query, tag = match.group('user_info', 'host', 'port', 'query', 'tag')
+    else:
+        raise ValueError("ساختار لینک SS نامعتبر است یا پشتیبانی نمی‌شود.")
+
+    # [اصلاح] بخش اطلاعات کاربر قبل از رمزگشایی، URL-Decode می‌شود
+    user_info = urllib.parse.unquote(user_info)
+    record.original_name = urllib.parse.unquote(tag) if tag else NO_NAME
+
+    try:
+        decoded_part = base64.urlsafe_b64decode(user_info + '=' * (-len(user_info) % 4)).decode('utf-8')
+        method, password = decoded_part.split(':', 1)
+    except Exception:
+        raise ValueError("بخش اطلاعات کاربری (Base64) لینک SS نامعتبر است.")
+
+    record.host, record.port, record.details = host, port, f"Method: {method}"
+    record.identity = fingerprint('ss', normalize_host(host), int(port), method.lower(), password, normalize_query(query or ''))
+    if query:
+        record.details += f" | Plugin: {query[:30]}"
+
+    record.link = line.partition('#')[0] + '#'
+    return record
+
+
+def parse_vless_or_trojan(line, protocol_type):
+    """پردازشگر عمومی و مقاوم برای لینک‌های VLESS و Trojan؛ regex فقط برای لینک‌های غیرعادی اجرا می‌شود."""
+    record = LinkRecord(protocol_type, protocol_type.upper())
+
+    if line.startswith(protocol_type) and (parts := split_authority(line)) and '/' not in parts[2]:
+        user_info, host, port, query, fragment = parts
+    elif match := _VLESS_TROJAN_PATTERN.match(line):
+        user_info, host, port, query, fragment = match.group('user_info', 'host', 'port', 'query', 'fragment')
+    else:
+        raise ValueError(f"ساختار لینک {protocol_type.upper()} نامعتبر است.")
+
+    record.host = host
+    record.port = port
+    record.original_name = urllib.parse.unquote(fragment) if fragment else NO_NAME
+
+    pairs = urllib.parse.parse_qsl(query)
+    query_params = dict(pairs)
+    sni = query_params.get('sni', query_params.get('peer', host))
+    path = query_params.get('path', 'N/A')
+    net_type = query_params.get('type', 'N/A')
+    record.details = f"SNI: {sni} | Net: {net_type} | Path: {path[:20]}"
+    record.identity = fingerprint(protocol_type, normalize_host(host), int(port), urllib.parse.unquote(user_info), _query_details(pairs))
+
+    base_link = f"{protocol_type}://{user_info}@{host}:{port}"
+    if query:
+        base_link += f"?{query}"
+    record.link = f"{base_link}#"
+    return record
+
+
+@register_parser('vless')
+def parse_vless(line):
+    return parse_vless_or_trojan(line, 'vless')
+
+
+@register_parser('trojan')
+def parse_trojan(line):
+    return parse_vless_or_trojan(line, 'trojan')
+
+
+def parse_authority_link(line, protocol_type, scheme_label):
+    """
+    پارسر عمومی لینک‌های scheme://credential@host:port[/]?params#name (Hysteria2، TUIC، WireGuard).
+    لینک تا قبل از # بدون تغییر حفظ و فقط نام جایگزین می‌شود.
+    """
+    head, _, fragment = line.partition('#')
+    rest = head[head.find('://') + 3:]
+    authority, _, query = rest.partition('?')
+    user_info, at, host_port = authority.rpartition('@')
+    host_port = host_port.rstrip('/')
+    host, colon, port = host_port.rpartition(':')
+    if not at or not user_info or not colon or not host or not _is_port(port):
+        raise ValueError(f"ساختار لینک {scheme_label} نامعتبر است.")
+
+    pairs = urllib.parse.parse_qsl(query)
+    params = dict(pairs)
+    sni = params.get('sni', params.get('peer', host))
+    details = {
+        'hysteria2': f"SNI: {sni} | Obfs: {params.get('obfs', 'none')}",
+        'tuic': f"SNI: {sni} | CC: {params.get('congestion_control', 'N/A')}",
+        'wireguard': f"Address: {params.get('address', 'N/A')} | MTU: {params.get('mtu', 'N/A')}",
+    }[protocol_type]
+
+    return LinkRecord(
+        protocol_type, scheme_label, host=host, port=port, details=details,
+        original_name=urllib.parse.unquote(fragment) if fragment else NO_NAME, link=head + '#',
+        identity=fingerprint(protocol_type, normalize_host(host), int(port), urllib.parse.unquote(user_info), _query_details(pairs))
+    )
+
+
+@register_parser('hysteria2', 'hy2')
+def parse_hysteria2(line):
+    return parse_authority_link(line, 'hysteria2', 'HYSTERIA2')
+
+
+@register_parser('tuic')
+def parse_tuic(line):
+    return parse_authority_link(line, 'tuic', 'TUIC')
+
+
+@register_parser('wireguard', 'wg')
+def parse_wireguard(line):
+    return parse_authority_link(line, 'wireguard', 'WIREGUARD')
+
+
+@register_parser('tg', 'https')
+def parse_telegram(line):
+    """پردازشگر پراکسی تلگرام با قابلیت استخراج نام از فرگمنت (#)."""
+    if not line.lower().startswith(tuple(TELEGRAM_PROTOCOLS)):
+        return None # لینک https معمولی، پراکسی تلگرام نیست
+
+    try:
+        parsed_url = urllib.parse.urlsplit(line)
+        params = dict(urllib.parse.parse_qsl(parsed_url.query))
+    except Exception:
+        raise ValueError("ساختار URL لینک تلگرام نامعتبر است.")
+
+    if not all(k in params for k in ["server", "port", "secret"]):
+        raise ValueError("لینک تلگرام ناقص است (فاقد سرور، پورت یا سکرت).")
+
+    return LinkRecord(
+        'telegram', 'TELEGRAM',
+        host=params.get("server"),
+        port=params.get("port"),
+        details=params.get("secret"),
+        link=line,
+        original_name=urllib.parse.unquote(parsed_url.fragment) if parsed_url.fragment else params.get("server"),
+        identity=fingerprint('telegram', normalize_host(params["server"]), params["port"], params["secret"])
+    )
+
+
+# --- Pipeline ---
+def iter_clean_lines(lines):
+    """خطوط خالی را حذف و فاصله‌های اضافه را پاک می‌کند (به صورت جریانی)."""
+    for line in lines:
+        if line := line.strip():
+            yield line
+
+
+def render_template(link, new_name):
+    """لینک الگو (vmess با جای خالی ps، بقیه تا '#') را با نام جدید کامل می‌کند."""
+    if link.startswith('vmess://'):
+        text = link[8:].replace(VMESS_NAME_SLOT, '"ps":' + json.dumps(new_name), 1)
+        return "vmess://" + base64.b64encode(text.encode('utf-8')).decode('ascii').rstrip("=")
+    return link + urllib.parse.quote(new_name)
+
+
+class NameTemplate:
+    """
+    قالب نام جدید با نحو str.format، مثل {flag}{country}-{protocol}-{index:03d} (فیلدها: TEMPLATE_FIELDS).
+    name نام اصلی کانفیگ و index شماره لینک است؛ آکولاد واقعی با {{ و }} نوشته می‌شود.
+    متن بدون فیلد یک نام ثابت است (fixed) و مثل قبل یک بار برای همه لینک‌ها اعمال می‌شود.
+    """
+    def __init__(self, text):
+        self.text = text
+        try:
+            self.fields = {field for _, field, _, _ in string.Formatter().parse(text) if field is not None}
+            self.fixed = None if self.fields else text.format()
+        except ValueError as e:
+            raise ValueError(f"قالب نام نامعتبر است: {e}") from None
+        if unknown := self.fields - set(TEMPLATE_FIELDS):
+            raise ValueError(f"فیلد ناشناخته در قالب نام: {', '.join(sorted(unknown))} (فیلدهای مجاز: {', '.join(TEMPLATE_FIELDS)})")
+        # قالب یک بار با مقادیری از همان نوع‌های واقعی ساخته می‌شود تا فرمت نامعتبر (مثل {port:05d}، پورت
+        # رشته است) همین‌جا رد شود، نه در میانه خروجی یا به‌روزرسانی جدول
+        try:
+            self.render(**TEMPLATE_SAMPLE)
+        except (ValueError, TypeError, KeyError, IndexError, AttributeError) as e:
+            raise ValueError(f"قالب نام نامعتبر است: {e}") from None
+
+    def render(self, **values):
+        return self.text.format(**values)
+
+
+def render_link(record, new_name):
+    """لینک نهایی را از الگوی مستقل از نام رکورد و نام جدید می‌سازد."""
+    if record.type in ('telegram', 'failed'):
+        return record.link
+    return render_template(record.link, new_name)
+
+
+def apply_name(record, new_name):
+    """نام جدید را روی رکورد الگو اعمال می‌کند (پراکسی تلگرام و لینک ناموفق تغییری نمی‌کنند)."""
+    if record.type not in ('telegram', 'failed'):
+        record.link = render_link(record, new_name)
+        record.name = new_name
+    return record
+
+
+def parse_record(line):
+    """پارس مستقل از نام جدید؛ نتیجه (موفق یا ناموفق) قابل ذخیره در کش و اعمال هر نامی است."""
+    try:
+        if parsed := parse_link(line):
+            return parsed
+        raise ValueError("پروتکل لینک شناسایی نشد.")
+    except Exception as e:
+        return LinkRecord('failed', link=line, details=str(e), identity=fingerprint('failed', line))
+
+
+def process_line(line, new_name):
+    """یک خط را پردازش کرده و نتیجه موفق یا پیام خطا را برمی‌گرداند؛ با new_name=None خود الگو برمی‌گردد."""
+    record = parse_record(line)
+    return record if new_name is None else apply_name(record, new_name)
+
+
+def process_lines(lines, new_name):
+    """نسخه جریانی (generator) پردازش؛ هر نتیجه به محض آماده شدن تحویل داده می‌شود."""
+    for line in lines:
+        yield process_line(line, new_name)
+
+
+def process_chunk(lines, new_name):
+    """پردازش یک دسته از خطوط؛ واحد کاری ارسال‌شده به پروسه‌های موتور موازی."""
+    return [process_line(line, new_name) for line in lines]
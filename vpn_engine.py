@@ -0,0 +1,188 @@
+"""
+موتور پردازش چندهسته‌ای.
+خطوط ورودی به صورت دسته‌ای (chunk) به یک Process Pool ارسال می‌شوند تا پردازش
+لینک‌ها (به‌ویژه رمزگشایی Base64 در vmess/ss) از محدودیت GIL عبور کند.
+"""
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import islice
+
+from vpn_core import apply_name, process_chunk, process_lines
+from vpn_metrics import timed_process_chunk
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_BATCH_INTERVAL = 0.05 # ثانیه
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def iter_chunks(lines, size):
+    """یک جریان خطوط را به لیست‌هایی با حداکثر size عضو تقسیم می‌کند."""
+    it = iter(lines)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def _mp_context():
+    # forkserver از fork کردن پروسه‌ای که ترد Tk در آن اجراست جلوگیری می‌کند
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def _init_worker():
+    # Ctrl+C فقط توسط پروسه اصلی مدیریت می‌شود
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _split_cached(chunk, cache):
+    """خطوطی از دسته که در کش نیستند و نتایج یافته‌شده در کش (None برای موارد ناموجود)."""
+    cached = cache.get_many(chunk)
+    return [line for line, record in zip(chunk, cached) if record is None], cached
+
+
+def _merge_cached(misses, parsed, cached, new_name, cache):
+    """نتایج تازه پارس‌شده را در کش ذخیره و با نتایج کش به ترتیب ورودی ادغام کرده و نام را اعمال می‌کند."""
+    if misses: cache.put_many(misses, parsed)
+    parsed = iter(parsed)
+    records = [record if record is not None else next(parsed) for record in cached]
+    return records if new_name is None else [apply_name(record, new_name) for record in records]
+
+
+def _stopped(cancel_event, resume_event):
+    """در حالت توقف موقت (resume_event پاک) منتظر ادامه می‌ماند؛ True اگر پردازش لغو شده باشد."""
+    if resume_event is not None and not resume_event.is_set():
+        while not resume_event.wait(0.1):
+            if cancel_event is not None and cancel_event.is_set(): return True
+    return cancel_event is not None and cancel_event.is_set()
+
+
+def iter_results(lines, new_name, workers=1, chunk_size=DEFAULT_CHUNK_SIZE, ordered=True, cancel_event=None, cache=None, metrics=None, resume_event=None):
+    """
+    نتایج پردازش را به صورت جریانی تحویل می‌دهد.
+    با workers=1 پردازش در همان پروسه انجام می‌شود؛ در غیر این صورت دسته‌ها بین پروسه‌ها
+    پخش شده و نتایج به ترتیب ورودی (یا در صورت ordered=False به ترتیب آماده شدن) برمی‌گردند.
+    با set شدن cancel_event تحویل نتایج متوقف و کارهای در صف لغو می‌شوند. با پاک (clear) شدن
+    resume_event پردازش بین دو نتیجه متوقف می‌شود و هیچ دسته جدیدی ارسال نمی‌شود تا دوباره set شود.
+    با new_name=None رکوردهای الگو (مستقل از نام) تحویل داده می‌شوند.
+    با cache (vpn_cache.ParseCache) هر دسته ابتدا در کش جستجو و فقط خطوط جدید پارس می‌شوند؛
+    پارس بدون نام (الگو) انجام و نام جدید در پروسه اصلی اعمال می‌شود.
+    با metrics (vpn_metrics.Metrics) زمان پارس هر خط در پروسه‌های کارگر اندازه‌گیری و جمع می‌شود.
+    """
+    if workers <= 1 and cache is None and metrics is None:
+        for result in process_lines(lines, new_name):
+            if _stopped(cancel_event, resume_event): return
+            yield result
+        return
+
+    parse_chunk = process_chunk if metrics is None else timed_process_chunk
+
+    def collect(result):
+        if metrics is None: return result
+        records, timings = result
+        metrics.add_parse(timings)
+        return records
+
+    def deliver(chunk, result, cached):
+        records = collect(result)
+        if cache is not None: records = _merge_cached(chunk, records, cached, new_name, cache)
+        if metrics is not None: metrics.results += len(records)
+        return records
+
+    if workers <= 1:
+        for chunk in iter_chunks(lines, chunk_size):
+            if _stopped(cancel_event, resume_event): return
+            if cache is None:
+                yield from deliver(chunk, parse_chunk(chunk, new_name), None)
+            else:
+                misses, cached = _split_cached(chunk, cache)
+                yield from deliver(misses, parse_chunk(misses, None), cached)
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context(), initializer=_init_worker)
+    chunks = iter_chunks(lines, chunk_size)
+    max_in_flight = workers * 2
+    pending = deque() if ordered else set()
+    submitted = {} # future -> (lines, cached) برای ادغام با نتایج کش
+    try:
+        while True:
+            while len(pending) < max_in_flight and (chunk := next(chunks, None)) is not None:
+                if cache is None:
+                    future = pool.submit(parse_chunk, chunk, new_name)
+                    submitted[future] = (None, None)
+                else:
+                    misses, cached = _split_cached(chunk, cache)
+                    # دسته‌ای که کاملاً در کش بوده به پروسه‌ها ارسال نمی‌شود
+                    future = pool.submit(parse_chunk, misses, None) if misses else Future()
+                    if not misses: future.set_result(parse_chunk(misses, None))
+                    submitted[future] = (misses, cached)
+                pending.append(future) if ordered else pending.add(future)
+            if not pending: return
+
+            if ordered:
+                done = (pending.popleft(),)
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                pending -= done
+
+            for future in done:
+                if _stopped(cancel_event, resume_event): return
+                chunk, cached = submitted.pop(future)
+                yield from deliver(chunk, future.result(), cached)
+    finally:
+        for future in pending: future.cancel()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+class ResultBatcher:
+    """
+    نتایج را جمع کرده و به جای یک پیام برای هر خط، هر max_items مورد یا هر interval ثانیه
+    یک پیام {'type': 'batch', 'items': [...], 'done': n} در صف می‌گذارد.
+    شمارنده پیشرفت (done) همراه همان پیام ارسال می‌شود و پیام جداگانه‌ای ندارد.
+    """
+    def __init__(self, out_queue, max_items=DEFAULT_BATCH_SIZE, interval=DEFAULT_BATCH_INTERVAL, cancel_event=None):
+        self.out_queue = out_queue
+        self.max_items = max_items
+        self.interval = interval
+        self.cancel_event = cancel_event
+        self.done = 0
+        self._items = []
+        self._last_flush = time.monotonic()
+
+    def put(self, item):
+        self._items.append(item)
+        self.done += 1
+        if len(self._items) >= self.max_items or time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if self._items:
+            self._send({'type': 'batch', 'items': self._items, 'done': self.done})
+            self._items = []
+        self._last_flush = time.monotonic()
+
+    def send(self, msg_type, **extra):
+        """دسته باقی‌مانده و سپس یک پیام دیگر (با همان شمارنده done) را به ترتیب در صف می‌گذارد."""
+        self.flush()
+        self._send({'type': msg_type, 'done': self.done, **extra})
+
+    def close(self, **extra):
+        """دسته باقی‌مانده را ارسال کرده و پیام پایان را در صف می‌گذارد."""
+        self.send('finished', **extra)
+
+    def _send(self, msg):
+        # صف محدود است تا اگر UI عقب بماند، تولیدکننده منتظر بماند (حافظه محدود)؛
+        # با لغو پردازش، انتظار برای جا باز شدن در صف رها می‌شود
+        while True:
+            try:
+                self.out_queue.put(msg, timeout=0.1)
+                return
+            except queue.Full:
+                if self.cancel_event is not None and self.cancel_event.is_set(): return
@@ -0,0 +1,129 @@
+"""
+خروجی گرفتن از لینک‌ها در قالب‌های مختلف اشتراک.
+هر نویسنده (writer) لینک‌ها را یکی‌یکی دریافت و به صورت جریانی در یک فایل متنی باز می‌نویسد؛
+فایل خروجی بسته نمی‌شود (بستن آن با فراخوانی‌کننده است).
+"""
+import binascii
+import json
+
+from vpn_formats import link_to_outbound, outbound_to_clash, outbound_to_singbox
+
+BASE64_BLOCK_SIZE = 48 * 1024 # مضرب ۳، تا تکه‌های کدشده بدون padding پشت سر هم قرار بگیرند
+_encode_json = json.JSONEncoder(ensure_ascii=False).encode # یک encoder مشترک به جای ساختن آن در هر json.dumps
+
+
+class PlainWriter:
+    """هر لینک در یک خط."""
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write_link(self, link):
+        self.stream.write(link + "\n")
+
+    def close(self):
+        pass
+
+
+class Base64Writer:
+    """
+    [بهینه‌شده] اشتراک Base64 (همه لینک‌ها با خط جدید جدا و کل متن یک‌جا کد می‌شود) به صورت جریانی:
+    لینک‌ها در یک bytearray جمع و هر بار یک بلوک هم‌تراز با ۳ بایت کد می‌شود، پس کل خروجی
+    هیچ‌وقت در حافظه نیست و نتیجه با کد کردن یک‌باره کل متن یکسان است.
+    """
+    def __init__(self, stream, block_size=BASE64_BLOCK_SIZE):
+        self.stream = stream
+        self.block_size = block_size - block_size % 3
+        self._buf = bytearray()
+
+    def write_link(self, link):
+        self._buf += link.encode('utf-8') + b'\n'
+        if len(self._buf) >= self.block_size: self._flush()
+
+    def _flush(self, final=False):
+        size = len(self._buf) if final else len(self._buf) - len(self._buf) % 3
+        if not size: return
+        self.stream.write(binascii.b2a_base64(self._buf[:size], newline=False).decode('ascii'))
+        del self._buf[:size]
+
+    def close(self):
+        self._flush(final=True)
+
+
+class StructuredWriter:
+    """
+    پایه خروجی‌های ساختاری: هر لینک به outbound نرمال‌شده و سپس به ساختار مقصد تبدیل می‌شود.
+    لینک‌های بدون معادل (مثل پراکسی تلگرام) در skipped شمرده می‌شوند. نام‌های تکراری (همه لینک‌ها
+    معمولاً یک نام جدید دارند) با شماره یکتا می‌شوند؛ فقط شمارنده هر نام در حافظه می‌ماند.
+    """
+    convert = None
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.written = 0
+        self.skipped = 0
+        self._names = {}
+
+    def _unique(self, name):
+        count = self._names[name] = self._names.get(name, 0) + 1
+        return name if count == 1 else f"{name} {count}"
+
+    def write_link(self, link):
+        if (item := type(self).convert(link_to_outbound(link))) is None:
+            self.skipped += 1
+            return
+        self.write_item(item)
+        self.written += 1
+
+
+class ClashWriter(StructuredWriter):
+    """
+    لیست proxies برای Clash/Mihomo. هر proxy در یک خط به صورت flow mapping نوشته می‌شود
+    (JSON زیرمجموعه YAML است)، پس نیازی به کتابخانه YAML و ساختن کل سند در حافظه نیست.
+    """
+    convert = outbound_to_clash
+
+    def __init__(self, stream):
+        super().__init__(stream)
+        self.stream.write("proxies:\n")
+
+    def write_item(self, proxy):
+        proxy['name'] = self._unique(proxy['name'])
+        self.stream.write("  - " + _encode_json(proxy) + "\n")
+
+    def close(self):
+        if not self.written: self.stream.write("  []\n")
+
+
+class SingBoxWriter(StructuredWriter):
+    """آرایه outbounds برای sing-box؛ هر outbound به محض دریافت نوشته می‌شود."""
+    convert = outbound_to_singbox
+
+    def __init__(self, stream):
+        super().__init__(stream)
+        self.stream.write('{\n  "outbounds": [')
+
+    def write_item(self, outbound):
+        outbound['tag'] = self._unique(outbound['tag'])
+        self.stream.write(("\n    " if not self.written else ",\n    ") + _encode_json(outbound))
+
+    def close(self):
+        self.stream.write("\n  ]\n}\n")
+
+
+EXPORT_FORMATS = {'plain': PlainWriter, 'base64': Base64Writer, 'clash': ClashWriter, 'singbox': SingBoxWriter}
+EXPORT_EXTENSIONS = {'plain': '.txt', 'base64': '.txt', 'clash': '.yaml', 'singbox': '.json'}
+
+
+def open_writer(stream, fmt='plain'):
+    return EXPORT_FORMATS[fmt](stream)
+
+
+def write_links(links, stream, fmt='plain'):
+    """لینک‌های یک iterable را با قالب fmt در stream می‌نویسد و تعداد آن‌ها را برمی‌گرداند."""
+    writer = open_writer(stream, fmt)
+    count = 0
+    for link in links:
+        writer.write_link(link)
+        count += 1
+    writer.close()
+    return count
@@ -0,0 +1,337 @@
+"""
+تبدیل بین فرمت‌های ساختاری کانفیگ (outbound های Xray، sing-box و proxy های Clash) و لینک‌های اشتراک.
+همه فرمت‌ها ابتدا به یک dict نرمال‌شده (normalized outbound) تبدیل می‌شوند و لینک از روی آن ساخته می‌شود.
+"""
+import base64
+import binascii
+import json
+import urllib.parse
+
+from vpn_core import split_authority
+
+# پروتکل‌های پشتیبانی‌شده با نام استاندارد لینک
+PROTOCOL_ALIASES = {'vless': 'vless', 'vmess': 'vmess', 'trojan': 'trojan', 'shadowsocks': 'ss', 'ss': 'ss'}
+
+
+def _first(items):
+    return items[0] if isinstance(items, list) and items and isinstance(items[0], dict) else {}
+
+
+def _join(value):
+    return ','.join(value) if isinstance(value, list) else value
+
+
+# --- Structured outbounds -> normalized ---
+
+def normalize_xray(obj):
+    """outbound با ساختار Xray/V2Ray (protocol + settings + streamSettings)."""
+    protocol = PROTOCOL_ALIASES.get(str(obj.get('protocol', '')).lower())
+    if not protocol: return None
+    settings = obj.get('settings') or {}
+    ob = {'protocol': protocol, 'name': obj.get('tag')}
+
+    if protocol in ('vless', 'vmess'):
+        server = _first(settings.get('vnext'))
+        user = _first(server.get('users'))
+        ob.update(host=server.get('address'), port=server.get('port'), id=user.get('id'), flow=user.get('flow'),
+                  encryption=user.get('encryption'), alter_id=user.get('alterId'), cipher=user.get('security'))
+    else:
+        server = _first(settings.get('servers'))
+        ob.update(host=server.get('address'), port=server.get('port'), id=server.get('password'), method=server.get('method'))
+
+    stream = obj.get('streamSettings') or {}
+    network = stream.get('network') or 'tcp'
+    security = stream.get('security') or 'none'
+    tls = stream.get('tlsSettings') or stream.get('realitySettings') or {}
+    transport = stream.get(f"{network}Settings") or {}
+    headers = transport.get('headers') or {}
+    host_header = headers.get('Host') or transport.get('host')
+    ob.update(network=network, security=security, sni=tls.get('serverName'), alpn=_join(tls.get('alpn')),
+              fp=tls.get('fingerprint'), pbk=tls.get('publicKey'), sid=tls.get('shortId'), spx=tls.get('spiderX'),
+              path=transport.get('path'), host_header=_join(host_header), service_name=transport.get('serviceName'),
+              header_type=(transport.get('header') or {}).get('type'))
+    return ob
+
+
+def normalize_singbox(obj):
+    """outbound با ساختار sing-box (type + server + server_port)."""
+    protocol = PROTOCOL_ALIASES.get(str(obj.get('type', '')).lower())
+    if not protocol: return None
+    tls = obj.get('tls') or {}
+    reality = tls.get('reality') or {}
+    transport = obj.get('transport') or {}
+    headers = transport.get('headers') or {}
+    security = 'reality' if reality.get('enabled') else 'tls' if tls.get('enabled') else 'none'
+    return {
+        'protocol': protocol, 'name': obj.get('tag'), 'host': obj.get('server'), 'port': obj.get('server_port'),
+        'id': obj.get('uuid') or obj.get('password'), 'method': obj.get('method'), 'flow': obj.get('flow'),
+        'alter_id': obj.get('alter_id'), 'cipher': obj.get('security'),
+        'network': transport.get('type') or 'tcp', 'security': security, 'sni': tls.get('server_name'),
+        'alpn': _join(tls.get('alpn')), 'fp': (tls.get('utls') or {}).get('fingerprint'),
+        'pbk': reality.get('public_key'), 'sid': reality.get('short_id'),
+        'path': transport.get('path'), 'host_header': _join(headers.get('Host') or transport.get('host')),
+        'service_name': transport.get('service_name'),
+    }
+
+
+def normalize_clash(obj):
+    """proxy با ساختار Clash/Mihomo (type + server + port)."""
+    protocol = PROTOCOL_ALIASES.get(str(obj.get('type', '')).lower())
+    if not protocol: return None
+    network = obj.get('network') or 'tcp'
+    opts = obj.get(f"{network}-opts") or {}
+    headers = opts.get('headers') or {}
+    reality = obj.get('reality-opts') or {}
+    security = 'reality' if reality else 'tls' if obj.get('tls') or protocol == 'trojan' else 'none'
+    return {
+        'protocol': protocol, 'name': obj.get('name'), 'host': obj.get('server'), 'port': obj.get('port'),
+        'id': obj.get('uuid') or obj.get('password'), 'method': obj.get('cipher') if protocol == 'ss' else None,
+        'flow': obj.get('flow'), 'alter_id': obj.get('alterId'), 'cipher': obj.get('cipher') if protocol == 'vmess' else None,
+        'network': network, 'security': security, 'sni': obj.get('servername') or obj.get('sni'),
+        'alpn': _join(obj.get('alpn')), 'fp': obj.get('client-fingerprint'),
+        'pbk': reality.get('public-key'), 'sid': reality.get('short-id'),
+        'path': _join(opts.get('path')), 'host_header': _join(headers.get('Host') or opts.get('host')),
+        'service_name': opts.get('grpc-service-name'),
+    }
+
+
+def normalize_outbound(obj):
+    """نوع ساختار را تشخیص داده و آن را نرمال می‌کند؛ برای ساختارهای ناشناخته None برمی‌گرداند."""
+    if not isinstance(obj, dict): return None
+    if 'protocol' in obj and 'settings' in obj: return normalize_xray(obj)
+    if 'type' in obj and 'server' in obj:
+        return normalize_singbox(obj) if 'server_port' in obj else normalize_clash(obj)
+    return None
+
+
+# --- Normalized -> link ---
+
+def _url_host(host):
+    return f"[{host}]" if ':' in host and not host.startswith('[') else host
+
+
+def outbound_to_link(ob):
+    """ساخت لینک اشتراک از یک outbound نرمال‌شده؛ اگر فیلدهای ضروری موجود نباشند None."""
+    if not ob or not ob.get('host') or not ob.get('port') or not ob.get('id'): return None
+    protocol, host, port = ob['protocol'], str(ob['host']), ob['port']
+    name = urllib.parse.quote(str(ob.get('name') or ''))
+    tls = ob.get('security') in ('tls', 'reality')
+
+    if protocol == 'vmess':
+        data = {
+            'v': '2', 'ps': str(ob.get('name') or ''), 'add': host, 'port': str(port), 'id': ob['id'],
+            'aid': str(ob.get('alter_id') or 0), 'scy': ob.get('cipher') or 'auto', 'net': ob.get('network') or 'tcp',
+            'type': ob.get('header_type') or 'none', 'host': ob.get('host_header') or '',
+            'path': ob.get('path') or ob.get('service_name') or '', 'tls': 'tls' if tls else '',
+            'sni': ob.get('sni') or '', 'alpn': ob.get('alpn') or '', 'fp': ob.get('fp') or '',
+        }
+        return "vmess://" + base64.b64encode(json.dumps(data, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+    if protocol == 'ss':
+        if not ob.get('method'): return None
+        user_info = base64.urlsafe_b64encode(f"{ob['method']}:{ob['id']}".encode('utf-8')).decode('ascii').rstrip('=')
+        return f"ss://{user_info}@{_url_host(host)}:{port}#{name}"
+
+    params = {
+        'type': ob.get('network') or 'tcp', 'security': ob.get('security') or 'none',
+        'encryption': (ob.get('encryption') or 'none') if protocol == 'vless' else None,
+        'flow': ob.get('flow'), 'sni': ob.get('sni'), 'alpn': ob.get('alpn'), 'fp': ob.get('fp'),
+        'pbk': ob.get('pbk'), 'sid': ob.get('sid'), 'spx': ob.get('spx'),
+        'path': ob.get('path'), 'host': ob.get('host_header'), 'serviceName': ob.get('service_name'),
+        'headerType': ob.get('header_type'),
+    }
+    query = urllib.parse.urlencode({k: v for k, v in params.items() if v not in (None, '')}, quote_via=urllib.parse.quote)
+    credential = urllib.parse.quote(str(ob['id']), safe='')
+    return f"{protocol}://{credential}@{_url_host(host)}:{port}?{query}#{name}"
+
+
+def structured_to_link(obj):
+    """یک outbound با هر یک از فرمت‌های Xray، sing-box یا Clash را به لینک تبدیل می‌کند."""
+    return outbound_to_link(normalize_outbound(obj))
+
+
+# --- Link -> normalized ---
+
+def _b64decode(text):
+    text = text.strip().replace('-', '+').replace('_', '/')
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def _port(value):
+    try: return int(value)
+    except (TypeError, ValueError): return None
+
+
+def _unquote(value):
+    return urllib.parse.unquote_plus(value) if '%' in value or '+' in value else value
+
+
+def _query_params(query):
+    """معادل dict(parse_qsl(query)) بدون unquote برای مقادیری که نیازی به آن ندارند."""
+    params = {}
+    for pair in query.split('&'):
+        key, _, value = pair.partition('=')
+        if value: params[_unquote(key)] = _unquote(value)
+    return params
+
+
+def _split_link(link):
+    """(user, password یا None, host, port, query, fragment)؛ لینک‌های خوش‌فرم بدون urlsplit."""
+    if parts := split_authority(link):
+        user_info, host, port, query, fragment = parts
+        user, colon, password = user_info.partition(':')
+        return user, password if colon else None, host.lower(), int(port), query, fragment
+    url = urllib.parse.urlsplit(link)
+    return url.username or '', url.password, url.hostname, url.port, url.query, url.fragment
+
+
+def _vmess_to_outbound(rest):
+    data = json.loads(_b64decode(rest).decode('utf-8'))
+    network = data.get('net') or 'tcp'
+    security = str(data.get('tls') or '').lower() # مقادیری مثل "none" یا "0" هم در لینک‌ها دیده می‌شوند
+    return {
+        'protocol': 'vmess', 'name': data.get('ps'), 'host': data.get('add'), 'port': _port(data.get('port')),
+        'id': data.get('id'), 'alter_id': _port(data.get('aid')) or 0, 'cipher': data.get('scy') or 'auto',
+        'network': network, 'security': security if security in ('tls', 'reality') else 'none', 'sni': data.get('sni'),
+        'alpn': data.get('alpn'), 'fp': data.get('fp'), 'host_header': data.get('host'),
+        'path': data.get('path') if network != 'grpc' else None,
+        'service_name': data.get('path') if network == 'grpc' else None, 'header_type': data.get('type'),
+    }
+
+
+def link_to_outbound(link):
+    """
+    عکس outbound_to_link: یک لینک اشتراک را به outbound نرمال‌شده تبدیل می‌کند.
+    برای پروتکل‌های بدون معادل ساختاری (مثل پراکسی تلگرام) یا لینک نامعتبر None برمی‌گرداند.
+    """
+    scheme, sep, rest = link.partition('://')
+    scheme = scheme.lower()
+    if not sep: return None
+    try:
+        if scheme == 'vmess': return _vmess_to_outbound(rest.partition('#')[0])
+
+        user, password, host, port, query, fragment = _split_link(link)
+        params = _query_params(query) if query else {}
+        ob = {'name': urllib.parse.unquote(fragment), 'host': host, 'port': port}
+        user = urllib.parse.unquote(user)
+        if scheme == 'ss':
+            method, _, password = (_b64decode(user).decode('utf-8') if password is None else f"{user}:{password}").partition(':')
+            ob.update(protocol='ss', id=password, method=method)
+            return ob if password else None
+
+        protocol = {'hy2': 'hysteria2'}.get(scheme, scheme)
+        if protocol not in ('vless', 'trojan', 'hysteria2', 'tuic'): return None
+        ob.update(
+            protocol=protocol, id=user, password=urllib.parse.unquote(password or ''), flow=params.get('flow'),
+            encryption=params.get('encryption'), network=params.get('type') or 'tcp',
+            security=params.get('security') or ('tls' if protocol != 'vless' else 'none'),
+            sni=params.get('sni') or params.get('peer'), alpn=params.get('alpn'), fp=params.get('fp'),
+            pbk=params.get('pbk'), sid=params.get('sid'), spx=params.get('spx'), path=params.get('path'),
+            host_header=params.get('host'), service_name=params.get('serviceName'), header_type=params.get('headerType'),
+            insecure=params.get('insecure') in ('1', 'true') or params.get('allowInsecure') in ('1', 'true'),
+            obfs=params.get('obfs'), obfs_password=params.get('obfs-password'),
+            congestion_control=params.get('congestion_control'),
+        )
+        return ob
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        return None
+
+
+# --- Normalized -> Clash / sing-box ---
+
+def _split_list(value):
+    return [item for item in value.split(',') if item] if value else None
+
+
+def _compact(obj):
+    """کلیدهای بدون مقدار حذف می‌شوند تا خروجی مثل کانفیگ‌های دست‌نویس تمیز باشد."""
+    return {k: v for k, v in obj.items() if v not in (None, '', [], {})}
+
+
+def outbound_to_clash(ob):
+    """یک outbound نرمال‌شده را به proxy با ساختار Clash/Mihomo تبدیل می‌کند (عکس normalize_clash)."""
+    if not ob or not ob.get('host') or not ob.get('port'): return None
+    protocol = ob['protocol']
+    proxy = {'name': ob.get('name') or '', 'type': protocol, 'server': ob['host'], 'port': ob['port']}
+
+    if protocol == 'ss':
+        proxy.update(cipher=ob.get('method'), password=ob.get('id'))
+        return _compact(proxy)
+    if protocol in ('hysteria2', 'tuic'):
+        proxy.update(password=ob.get('password') if protocol == 'tuic' else ob.get('id'), uuid=ob.get('id') if protocol == 'tuic' else None,
+                     sni=ob.get('sni'), alpn=_split_list(ob.get('alpn')), obfs=ob.get('obfs'),
+                     **{'obfs-password': ob.get('obfs_password'), 'congestion-controller': ob.get('congestion_control'),
+                        'skip-cert-verify': ob.get('insecure') or None})
+        return _compact(proxy)
+
+    if protocol == 'vmess': proxy.update(uuid=ob.get('id'), alterId=ob.get('alter_id') or 0, cipher=ob.get('cipher') or 'auto')
+    elif protocol == 'vless': proxy.update(uuid=ob.get('id'), flow=ob.get('flow'))
+    else: proxy.update(password=ob.get('id'))
+
+    security = ob.get('security')
+    if security in ('tls', 'reality'):
+        if protocol != 'trojan': proxy['tls'] = True
+        proxy['sni' if protocol == 'trojan' else 'servername'] = ob.get('sni')
+        proxy['alpn'] = _split_list(ob.get('alpn'))
+        proxy['client-fingerprint'] = ob.get('fp')
+        if security == 'reality': proxy['reality-opts'] = _compact({'public-key': ob.get('pbk'), 'short-id': ob.get('sid')})
+
+    network = ob.get('network') or 'tcp'
+    if network == 'http': network = 'h2' # در لینک‌ها و Xray، type=http همان HTTP/2 است
+    if network != 'tcp': proxy['network'] = network
+    if network == 'ws':
+        headers = {'Host': ob['host_header']} if ob.get('host_header') else None
+        proxy['ws-opts'] = _compact({'path': ob.get('path'), 'headers': headers})
+    elif network == 'h2':
+        proxy['h2-opts'] = _compact({'host': _split_list(ob.get('host_header')), 'path': ob.get('path')})
+    elif network == 'grpc':
+        proxy['grpc-opts'] = _compact({'grpc-service-name': ob.get('service_name')})
+    return _compact(proxy)
+
+
+def _singbox_transport(ob):
+    """transport معادل در sing-box، None برای tcp و False برای شبکه‌ای که معادلی ندارد (مثل xhttp یا kcp)."""
+    network = ob.get('network') or 'tcp'
+    if network == 'tcp': return None
+    if network in ('ws', 'httpupgrade'):
+        headers = {'Host': ob['host_header']} if ob.get('host_header') else None
+        return _compact({'type': network, 'path': ob.get('path'), 'headers': headers})
+    if network in ('http', 'h2'): # HTTP/2 در Xray؛ transport http در sing-box (با TLS همان h2 است)
+        return _compact({'type': 'http', 'host': _split_list(ob.get('host_header')), 'path': ob.get('path')})
+    if network == 'grpc':
+        return _compact({'type': 'grpc', 'service_name': ob.get('service_name')})
+    if network == 'quic':
+        return {'type': 'quic'}
+    return False
+
+
+def outbound_to_singbox(ob):
+    """
+    یک outbound نرمال‌شده را به outbound با ساختار sing-box تبدیل می‌کند (عکس normalize_singbox).
+    برای شبکه‌ای که sing-box معادلی برایش ندارد None برمی‌گرداند تا کانفیگ نادرست نوشته نشود.
+    """
+    if not ob or not ob.get('host') or not ob.get('port'): return None
+    protocol = ob['protocol']
+    transport = _singbox_transport(ob) if protocol not in ('ss', 'hysteria2', 'tuic') else None
+    if transport is False: return None
+    outbound = {'type': 'shadowsocks' if protocol == 'ss' else protocol, 'tag': ob.get('name') or '',
+                'server': ob['host'], 'server_port': ob['port']}
+
+    if protocol == 'ss':
+        outbound.update(method=ob.get('method'), password=ob.get('id'))
+        return _compact(outbound)
+    if protocol == 'vmess': outbound.update(uuid=ob.get('id'), alter_id=ob.get('alter_id') or 0, security=ob.get('cipher') or 'auto')
+    elif protocol == 'vless': outbound.update(uuid=ob.get('id'), flow=ob.get('flow'))
+    elif protocol == 'tuic': outbound.update(uuid=ob.get('id'), password=ob.get('password'), congestion_control=ob.get('congestion_control'))
+    else: outbound.update(password=ob.get('id'))
+    if protocol == 'hysteria2' and ob.get('obfs'):
+        outbound['obfs'] = _compact({'type': ob['obfs'], 'password': ob.get('obfs_password')})
+
+    security = ob.get('security')
+    if security in ('tls', 'reality') or protocol in ('hysteria2', 'tuic'):
+        tls = {'enabled': True, 'server_name': ob.get('sni'), 'alpn': _split_list(ob.get('alpn')), 'insecure': ob.get('insecure') or None}
+        if ob.get('fp'): tls['utls'] = {'enabled': True, 'fingerprint': ob['fp']}
+        if security == 'reality': tls['reality'] = _compact({'enabled': True, 'public_key': ob.get('pbk'), 'short_id': ob.get('sid')})
+        outbound['tls'] = _compact(tls)
+    if transport: outbound['transport'] = transport
+    return _compact(outbound)
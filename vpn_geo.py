@@ -0,0 +1,281 @@
+"""
+پایگاه داده آفلاین کشور و ASN آدرس‌های IP برای نام‌گذاری بر اساس موقعیت سرور.
+بازه‌های IP (از CSV/TSV رایج مثل DB-IP، IP2Location یا iptoasn) یک بار به یک فایل دودویی با
+آرایه‌های مرتب ابتدا/انتهای بازه‌ها تبدیل می‌شوند. این فایل با mmap باز می‌شود، پس بارگذاری
+مستقل از حجم آن است، و هر جستجو یک bisect در سطح C روی همان حافظه نگاشت‌شده است.
+IPv6 با ۶۴ بیت بالای آدرس (پیشوند شبکه) ایندکس می‌شود.
+
+ساخت پایگاه داده:
+    python vpn_geo.py dbip-country-lite.csv geo.bin
+    python vpn_geo.py ip2asn-combined.tsv geo.bin
+"""
+import argparse
+import bisect
+import ipaddress
+import mmap
+import re
+import socket
+import struct
+import sys
+from array import array
+
+from vpn_core import normalize_host
+from vpn_probe import DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT, resolve_hosts
+
+MAGIC = b'VPNGEO1\n'
+HEADER = struct.Struct('<8sIII4x') # شناسه، تعداد بازه‌های IPv4، IPv6 و تعداد کدهای کشور (۲۴ بایت، مضرب ۸)
+UNKNOWN = ('', 0) # (کشور، ASN) آدرس ناشناخته
+UNKNOWN_COUNTRY = 'XX' # مقدار {country} در قالب نام برای آدرس ناشناخته
+GEO_FIELDS = {'country', 'flag', 'asn'} # فیلدهای قالب نام که به پایگاه داده نیاز دارند
+V4_MAPPED_PREFIX = bytes(10) + b'\xff\xff' # ::ffff:a.b.c.d
+_ASN_PATTERN = re.compile(r'(?:AS)?(\d+)$', re.IGNORECASE)
+
+
+def flag(country):
+    """پرچم (دو نماد منطقه‌ای یونیکد) کد دوحرفی کشور، یا رشته خالی."""
+    if len(country) != 2 or not country.isalpha() or country == UNKNOWN_COUNTRY: return ''
+    return ''.join(chr(0x1F1E6 + ord(c) - ord('A')) for c in country.upper())
+
+
+def ip_key(address):
+    """(is_v6, کلید عددی) یک آدرس IP متنی، یا None اگر address آدرس IP نباشد (مثلاً نام دامنه)."""
+    try: return False, int.from_bytes(socket.inet_pton(socket.AF_INET, address), 'big')
+    except (OSError, ValueError): pass
+    try: packed = socket.inet_pton(socket.AF_INET6, address)
+    except (OSError, ValueError): return None
+    if packed[:12] == V4_MAPPED_PREFIX: return False, int.from_bytes(packed[12:], 'big')
+    return True, int.from_bytes(packed[:8], 'big')
+
+
+# --- Build ---
+
+def _address(text):
+    return ipaddress.ip_address(int(text) if text.isdigit() else text)
+
+
+def read_ranges(path):
+    """
+    بازه‌های یک فایل CSV یا TSV به شکل (is_v6, ابتدا، انتها، کشور، ASN).
+    هر سطر با «ابتدا، انتها» یا یک CIDR شروع می‌شود (آدرس متنی یا عدد صحیح)؛ از بقیه ستون‌ها اولین
+    کد دوحرفی کشور و اولین عدد (با یا بدون پیشوند AS) برداشته می‌شود. سرتیترها و سطرهای نامعتبر رد می‌شوند.
+    """
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            fields = [field.strip().strip('"') for field in line.split('\t' if '\t' in line else ',')]
+            try:
+                if '/' in fields[0]:
+                    network = ipaddress.ip_network(fields[0], strict=False)
+                    start, end, rest = network.network_address, network.broadcast_address, fields[1:]
+                else:
+                    start, end, rest = _address(fields[0]), _address(fields[1]), fields[2:]
+            except (ValueError, IndexError):
+                continue
+            if start.version != end.version or start > end: continue
+            country = next((f.upper() for f in rest if len(f) == 2 and f.isalpha() and f.upper() != 'ZZ'), '')
+            asn = next((int(m.group(1)) for f in rest if (m := _ASN_PATTERN.match(f))), 0)
+            if not country and not asn: continue
+            if start.version == 4: yield False, int(start), int(end), country, asn
+            else: yield True, int(start) >> 64, int(end) >> 64, country, asn
+
+
+def _flatten(rows):
+    """
+    بازه‌های (ابتدا، انتها، کشور، ASN) را به بازه‌های مرتب و بدون هم‌پوشانی تبدیل می‌کند. پیمایش با یک پشته
+    از بازه‌های باز انجام می‌شود: بازه درونی (مثل 10.1.0.0/16 درون 10.0.0.0/8) بازه بیرونی را دو تکه می‌کند
+    و باقی‌مانده بیرونی پس از پایان آن دوباره تحویل داده می‌شود. تکه‌های مجاور با مقدار یکسان ادغام می‌شوند.
+    """
+    segments = []
+
+    def emit(start, end, value):
+        if segments and segments[-1][1] == start - 1 and segments[-1][2] == value:
+            segments[-1][1] = end
+        else:
+            segments.append([start, end, value])
+
+    stack = [] # [(انتها، (کشور، ASN))]؛ بالای پشته بازه‌ای است که اولویت دارد
+    cursor = 0 # اولین آدرسی که هنوز تحویل داده نشده
+    # در ابتدای یکسان، بازه بزرگ‌تر زودتر باز می‌شود تا بازه کوچک‌تر (دقیق‌تر) روی آن قرار گیرد
+    for start, end, country, asn in sorted(rows, key=lambda row: (row[0], -row[1])):
+        while stack and stack[-1][0] < start:
+            top_end, value = stack.pop()
+            if cursor <= top_end:
+                emit(cursor, top_end, value)
+                cursor = top_end + 1
+        if stack and cursor < start: emit(cursor, start - 1, stack[-1][1])
+        cursor = start
+        stack.append((end, (country, asn)))
+    while stack:
+        top_end, value = stack.pop()
+        if cursor <= top_end:
+            emit(cursor, top_end, value)
+            cursor = top_end + 1
+    return segments
+
+
+def build_database(ranges, path):
+    """
+    بازه‌های read_ranges را مرتب و در فایل دودویی path می‌نویسد. در بازه‌های هم‌پوشان، بازه‌ای که
+    دیرتر شروع می‌شود (یا در ابتدای یکسان، کوچک‌تر است) در محدوده خودش اولویت دارد و بازه بیرونی پس از آن
+    ادامه می‌یابد. خروجی: (تعداد بازه‌های IPv4، تعداد بازه‌های IPv6)
+    """
+    rows = {False: [], True: []}
+    for is_v6, start, end, country, asn in ranges: rows[is_v6].append((start, end, country, asn))
+
+    countries = {'': 0}
+    tables = {}
+    for is_v6, typecode in ((True, 'Q'), (False, 'I')):
+        starts, ends, asns, codes = array(typecode), array(typecode), array('I'), array('H')
+        for start, end, (country, asn) in _flatten(rows.pop(is_v6)):
+            starts.append(start)
+            ends.append(end)
+            asns.append(asn)
+            codes.append(countries.setdefault(country, len(countries)))
+        tables[is_v6] = (starts, ends, asns, codes)
+
+    # ترتیب بخش‌ها بر اساس اندازه هر عنصر نزولی است تا هر آرایه در فایل هم‌تراز باشد
+    v6, v4 = tables[True], tables[False]
+    sections = (v6[0], v6[1], v4[0], v4[1], v6[2], v4[2], v6[3], v4[3])
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(v4[0]), len(v6[0]), len(countries)))
+        for section in sections:
+            if sys.byteorder == 'big': section.byteswap()
+            section.tofile(f)
+        f.write(b''.join(country.encode('ascii').ljust(2, b'\0') for country in countries))
+    return len(v4[0]), len(v6[0])
+
+
+# --- Lookup ---
+
+class GeoDatabase:
+    """
+    [بهینه‌شده] پایگاه داده ساخته‌شده با build_database، نگاشت‌شده با mmap. آرایه‌ها memoryview های
+    نوع‌دار روی فایل هستند، پس هیچ سطری به شیء پایتون تبدیل نمی‌شود و چند پروسه صفحات یکسان فایل را
+    به اشتراک می‌گذارند. هر جستجو: inet_pton، یک bisect و دو خواندن از آرایه.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._views = []
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._load()
+        except Exception:
+            self.close()
+            raise
+
+    def _load(self):
+        mm = self._mmap
+        if len(mm) < HEADER.size or mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} یک پایگاه داده GeoIP ساخته‌شده با vpn_geo.py نیست.")
+        _, v4_count, v6_count, country_count = HEADER.unpack_from(mm)
+        self._views.append(view := memoryview(mm))
+        offset = HEADER.size
+
+        def section(typecode, count):
+            nonlocal offset
+            size = array(typecode).itemsize * count
+            if offset + size > len(mm): raise ValueError(f"فایل پایگاه داده GeoIP ناقص است: {self.path}")
+            data = view[offset:offset + size].cast(typecode)
+            offset += size
+            self._views.append(data)
+            if sys.byteorder == 'big': (data := array(typecode, data)).byteswap()
+            return data
+
+        starts6, ends6, starts4, ends4 = section('Q', v6_count), section('Q', v6_count), section('I', v4_count), section('I', v4_count)
+        asns6, asns4, codes6, codes4 = section('I', v6_count), section('I', v4_count), section('H', v6_count), section('H', v4_count)
+        names = bytes(section('B', 2 * country_count))
+        self.countries = [names[i:i + 2].rstrip(b'\0').decode('ascii') for i in range(0, len(names), 2)]
+        self._tables = {False: (starts4, ends4, codes4, asns4), True: (starts6, ends6, codes6, asns6)}
+        self.ranges = v4_count + v6_count
+
+    def lookup(self, address):
+        """(کشور، ASN) آدرس IP متنی؛ UNKNOWN اگر در هیچ بازه‌ای نباشد و None اگر address آدرس IP نباشد."""
+        if (key := ip_key(address)) is None: return None
+        starts, ends, codes, asns = self._tables[key[0]]
+        value = key[1]
+        if (i := bisect.bisect_right(starts, value) - 1) < 0 or value > ends[i]: return UNKNOWN
+        return self.countries[codes[i]], asns[i]
+
+    def close(self):
+        for view in reversed(self._views): view.release()
+        self._views = []
+        self._tables = {}
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GeoLookup:
+    """
+    کشور و ASN سرورها با کش برای هر میزبان (هر آدرس فقط یک بار جستجو می‌شود). نام‌های دامنه تا
+    resolve نشده‌اند (resolve) ناشناخته برگردانده می‌شوند، بدون اینکه کش شوند.
+    """
+    def __init__(self, database):
+        self.database = database
+        self._hosts = {}
+
+    def lookup_host(self, host):
+        if (entry := self._hosts.get(host)) is None:
+            if (entry := self.database.lookup(normalize_host(host))) is None: return UNKNOWN
+            self._hosts[host] = entry
+        return entry
+
+    def unresolved(self, hosts):
+        """نام‌های دامنه یکتا در hosts که هنوز resolve نشده‌اند (نرمال‌شده)."""
+        pending = {}
+        for host in hosts:
+            if host not in self._hosts and ip_key(key := normalize_host(host)) is None and key not in ('', 'n/a'):
+                pending.setdefault(key, []).append(host)
+        return pending
+
+    def resolve(self, hosts, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, cancel_event=None):
+        """
+        نام‌های دامنه hosts را هم‌زمان resolve و کشور آدرس آن‌ها را کش می‌کند (نام‌های resolve نشده
+        ناشناخته کش می‌شوند). خروجی: (تعداد نام‌ها، تعداد ناموفق)
+        """
+        pending = self.unresolved(hosts)
+        addresses = resolve_hosts(list(pending), concurrency, timeout, cancel_event)
+        failed = 0
+        for key, address in addresses.items():
+            entry = UNKNOWN if address is None else self.database.lookup(address) or UNKNOWN
+            failed += address is None
+            for host in pending[key]: self._hosts[host] = entry
+        return len(addresses), failed
+
+
+class Namer:
+    """نام هر لینک از NameTemplate (vpn_core) و در صورت نیاز کشور و ASN سرور (GeoLookup) ساخته می‌شود."""
+    def __init__(self, template, geo=None):
+        self.template = template
+        self.geo = geo if template.fields & GEO_FIELDS else None
+        self._flags = {}
+
+    def name(self, protocol, host, port, original_name, index):
+        country, asn = self.geo.lookup_host(host) if self.geo else UNKNOWN
+        if (emoji := self._flags.get(country)) is None: emoji = self._flags[country] = flag(country)
+        return self.template.render(
+            protocol=protocol, host=host, port=port, name=original_name, index=index,
+            country=country or UNKNOWN_COUNTRY, flag=emoji, asn=f"AS{asn}" if asn else '',
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ساخت پایگاه داده GeoIP/ASN آفلاین از یک فایل CSV یا TSV بازه‌های IP.")
+    parser.add_argument('source', help="فایل بازه‌ها (مثل dbip-country-lite.csv یا ip2asn-combined.tsv)")
+    parser.add_argument('output', help="فایل پایگاه داده خروجی")
+    args = parser.parse_args(argv)
+    try:
+        v4_count, v6_count = build_database(read_ranges(args.source), args.output)
+    except OSError as e:
+        print(f"خطا: {e}", file=sys.stderr)
+        return 1
+    print(f"{v4_count} بازه IPv4 و {v6_count} بازه IPv6 در {args.output} نوشته شد.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""
+استخراج جریانی لینک‌ها از فایل‌های JSON بزرگ.
+به جای json.loads روی کل فایل، فایل به صورت تکه‌تکه خوانده و به رویدادهای JSON
+(شروع/پایان آبجکت و آرایه، کلید، مقدار) تبدیل می‌شود. پیمایش تکراری (بدون بازگشت) است،
+پس عمق تو در تویی محدودیتی ندارد و حافظه مصرفی به اندازه فایل وابسته نیست.
+"""
+import codecs
+import json.decoder
+import re
+
+from vpn_core import TELEGRAM_PROTOCOLS, V2RAY_PROTOCOLS
+from vpn_formats import structured_to_link
+
+CHUNK_SIZE = 64 * 1024
+OUTBOUND_LIST_KEYS = ('outbounds', 'proxies', 'endpoints') # آرایه‌هایی که اعضایشان outbound ساختاری هستند
+LINK_PREFIXES = tuple(V2RAY_PROTOCOLS + TELEGRAM_PROTOCOLS)
+
+_WHITESPACE = re.compile(r'[\s,:]*') # جداکننده‌ها از روی وضعیت پشته تشخیص داده می‌شوند و نادیده گرفته می‌شوند
+_SCALAR_END = re.compile(r'[^\s,:\]\}]*')
+_NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?')
+_LITERALS = {'true': True, 'false': False, 'null': None}
+
+
+class JsonEventReader:
+    """
+    خواننده رویدادمحور JSON روی یک فایل باینری.
+    رویدادها: ('start_map'|'end_map'|'start_array'|'end_array', None)، ('key', str) و ('value', scalar).
+    اعضای آرایه‌هایی که کلیدشان در capture_keys است (و با capture_root اعضای آرایه ریشه) یک‌جا (با
+    raw_decode و سرعت C) خوانده و به صورت ('value', dict|list) تحویل داده می‌شوند.
+    bytes_read برای نمایش پیشرفت به‌روز می‌شود.
+    """
+    def __init__(self, stream, chunk_size=CHUNK_SIZE, capture_keys=(), capture_root=False):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.capture_keys = frozenset(capture_keys)
+        self.capture_root = capture_root
+        self.bytes_read = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8-sig')('replace')
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        """یک تکه دیگر به بافر اضافه می‌کند؛ بخش مصرف‌شده بافر دور ریخته می‌شود."""
+        if self._eof: return False
+        raw = self.stream.read(self.chunk_size)
+        self.bytes_read += len(raw)
+        self._buf = self._buf[self._pos:] + self._decoder.decode(raw, final=not raw)
+        self._pos = 0
+        self._eof = not raw
+        return True
+
+    def __iter__(self):
+        stack = [] # نوع کانتینرهای باز: True برای آبجکت، False برای آرایه
+        capture = [] # برای هر کانتینر باز: آیا اعضای آن یک‌جا خوانده شوند
+        expect_key = False
+        key = None
+        scanstring = json.decoder.scanstring
+        raw_decode = json.JSONDecoder(strict=False).raw_decode
+
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos >= len(self._buf):
+                if self._fill(): continue
+                return
+
+            buf, pos = self._buf, self._pos
+            char = buf[pos]
+            if char == '{' or char == '[':
+                if capture and capture[-1]:
+                    try:
+                        value, self._pos = raw_decode(buf, pos)
+                    except ValueError:
+                        # عضو آرایه هنوز کامل در بافر نیست
+                        if self._fill(): continue
+                        raise
+                    yield 'value', value
+                    continue
+                if stack: captured = char == '[' and stack[-1] and key in self.capture_keys
+                else: captured = char == '[' and self.capture_root
+                capture.append(captured)
+                stack.append(char == '{')
+                self._pos = pos + 1
+                expect_key = char == '{'
+                yield ('start_map' if char == '{' else 'start_array'), None
+                continue
+            if char == '}' or char == ']':
+                self._pos = pos + 1
+                if stack:
+                    stack.pop()
+                    capture.pop()
+                expect_key = bool(stack) and stack[-1]
+                yield ('end_map' if char == '}' else 'end_array'), None
+                continue
+
+            if char == '"':
+                try:
+                    value, end = scanstring(buf, pos + 1, False)
+                except ValueError as e:
+                    # فقط اگر رشته (یا دنباله escape آن) در مرز تکه قطع شده باشد تکه بعدی خوانده می‌شود
+                    truncated = e.msg.startswith('Unterminated') or e.pos >= len(buf) - 6
+                    if truncated and self._fill(): continue
+                    raise
+                self._pos = end
+                if expect_key:
+                    expect_key = False
+                    key = value
+                    yield 'key', value
+                    continue
+            else:
+                # عدد یا true/false/null: توکن تا اولین جداکننده ادامه دارد
+                end = _SCALAR_END.match(buf, pos).end()
+                if end == len(buf) and self._fill(): continue
+                text = buf[pos:end]
+                if text in _LITERALS: value = _LITERALS[text]
+                elif _NUMBER.fullmatch(text): value = float(text) if any(c in text for c in '.eE') else int(text)
+                else: raise ValueError(f"JSON نامعتبر در موقعیت {self.bytes_read}")
+                self._pos = end
+
+            expect_key = bool(stack) and stack[-1]
+            yield 'value', value
+
+
+def is_link(value):
+    return isinstance(value, str) and value.lstrip().lower().startswith(LINK_PREFIXES)
+
+
+def _links_in_object(obj):
+    """
+    لینک‌های رشته‌ای و outboundهای ساختاری (اعضای آرایه‌های OUTBOUND_LIST_KEYS) داخل یک آبجکت
+    خوانده‌شده، مثل یک کانفیگ کامل Xray در آرایه ریشه، را به صورت تکراری (بدون بازگشت) پیدا می‌کند.
+    """
+    pending = [(obj, False)] # (مقدار، آیا عضو یک آرایه outbound است)
+    while pending:
+        item, outbound = pending.pop()
+        if isinstance(item, dict):
+            if outbound and (link := structured_to_link(item)):
+                yield link
+                continue
+            for key, value in reversed(list(item.items())):
+                if key in OUTBOUND_LIST_KEYS and isinstance(value, list):
+                    pending.extend((member, True) for member in reversed(value))
+                else:
+                    pending.append((value, False))
+        elif isinstance(item, list): pending.extend((member, False) for member in reversed(item))
+        elif is_link(item): yield item.strip()
+
+
+def iter_links_from_events(events):
+    """
+    لینک‌ها را از رویدادهای JSON استخراج می‌کند.
+    رشته‌هایی که با پروتکل‌های شناخته‌شده شروع می‌شوند مستقیماً تحویل داده می‌شوند. اعضای آرایه‌های
+    outbounds/proxies (فرمت‌های Xray، sing-box و Clash) و آرایه ریشه (لیست outboundها یا کانفیگ‌های کامل)
+    تک‌تک خوانده و به لینک تبدیل می‌شوند؛ فقط همان یک عضو در هر لحظه در حافظه است.
+    """
+    for event, value in events:
+        if event != 'value': continue
+        if isinstance(value, str):
+            if is_link(value): yield value.strip()
+        elif isinstance(value, (dict, list)):
+            if link := structured_to_link(value): yield link
+            else: yield from _links_in_object(value)
+
+
+def open_json_events(stream):
+    """رویدادهای یک فایل JSON باینری باز (برای iter_links_from_events)؛ bytes_read پیشرفت خواندن است."""
+    return JsonEventReader(stream, capture_keys=OUTBOUND_LIST_KEYS, capture_root=True)
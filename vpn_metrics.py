@@ -0,0 +1,131 @@
+"""
+اندازه‌گیری مسیرهای داغ پردازش: زمان پارس به تفکیک پروتکل، عمق صف نتایج، مدت هر تیک
+رندر رابط گرافیکی و توان عملیاتی (لینک در ثانیه).
+اندازه‌گیری فقط وقتی فعال است که یک شیء Metrics به موتور/رابط داده شود؛ در غیر این صورت
+مسیرهای پردازش هیچ کد اضافه‌ای اجرا نمی‌کنند.
+"""
+import csv
+import json
+import time
+
+from vpn_core import process_line
+
+BUCKETS = 32 # سطل‌های لگاریتمی: سطل i زمان‌های کمتر از 2**i میکروثانیه
+
+
+class Histogram:
+    """هیستوگرام لگاریتمی (پایه ۲) زمان‌ها بر حسب میکروثانیه؛ کوچک و قابل ارسال بین پروسه‌ها."""
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0 # ثانیه
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[min(int(seconds * 1e6).bit_length(), BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max: self.max = seconds
+
+    def merge(self, other):
+        for i, n in enumerate(other.counts): self.counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q):
+        """کران بالای سطلی که صدک q در آن است (میکروثانیه)."""
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= target: return 1 << i
+        return 0
+
+    def mean_us(self):
+        return self.total / self.count * 1e6 if self.count else 0.0
+
+    def to_dict(self):
+        return {
+            'count': self.count, 'total_s': round(self.total, 6), 'mean_us': round(self.mean_us(), 2),
+            'p50_us': self.percentile(0.5), 'p90_us': self.percentile(0.9), 'p99_us': self.percentile(0.99),
+            'max_us': round(self.max * 1e6, 1), 'buckets': self.counts,
+        }
+
+
+def timed_process_chunk(lines, new_name):
+    """همان process_chunk به همراه هیستوگرام زمان پارس هر پروتکل (در پروسه‌های کارگر اجرا می‌شود)."""
+    clock = time.perf_counter
+    results, timings = [], {}
+    for line in lines:
+        start = clock()
+        record = process_line(line, new_name)
+        elapsed = clock() - start
+        results.append(record)
+        if (hist := timings.get(record.type)) is None: hist = timings[record.type] = Histogram()
+        hist.add(elapsed)
+    return results, timings
+
+
+class Metrics:
+    """مجموعه اندازه‌گیری‌های یک اجرا؛ از ترد پردازش نوشته و از ترد رابط گرافیکی خوانده می‌شود."""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.parse = {} # {type: Histogram}
+        self.ticks = Histogram() # مدت هر تیک _check_queue
+        self.results = 0
+        self.queue_depth = 0
+        self.queue_depth_max = 0
+
+    def add_parse(self, timings):
+        for kind, hist in timings.items():
+            if (total := self.parse.get(kind)) is None: self.parse[kind] = hist
+            else: total.merge(hist)
+
+    def sample_queue(self, depth):
+        self.queue_depth = depth
+        self.queue_depth_max = max(self.queue_depth_max, depth)
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def throughput(self):
+        return self.results / self.elapsed() if self.results else 0.0
+
+    def summary(self):
+        """خلاصه یک‌خطی برای پنل وضعیت."""
+        parts = [f"⚡ {self.throughput():,.0f} لینک/ث"]
+        if self.ticks.count: # فقط در رابط گرافیکی
+            parts.append(f"صف: {self.queue_depth} (حداکثر {self.queue_depth_max})")
+            parts.append(f"تیک p90: {self.ticks.percentile(0.9) / 1000:.1f}ms")
+        parts.append("پارس: " + (' '.join(f"{kind}:{hist.mean_us():.0f}µs" for kind, hist in sorted(self.parse.items())) or '-'))
+        return ' | '.join(parts)
+
+    def to_dict(self):
+        return {
+            'elapsed_s': round(self.elapsed(), 4), 'results': self.results, 'lines_per_s': round(self.throughput(), 1),
+            'queue_depth_max': self.queue_depth_max,
+            'parse': {kind: hist.to_dict() for kind, hist in sorted(self.parse.items())},
+            'ticks': self.ticks.to_dict(),
+        }
+
+    def dump(self, path):
+        """پروفایل را بر اساس پسوند فایل به صورت CSV یا JSON ذخیره می‌کند."""
+        data = self.to_dict()
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            if not path.lower().endswith('.csv'):
+                json.dump(data, f, ensure_ascii=False, indent=2)
+                return
+            writer = csv.writer(f)
+            writer.writerow(('metric', 'key', 'count', 'total_s', 'mean_us', 'p50_us', 'p90_us', 'p99_us', 'max_us'))
+            rows = [('parse', kind, hist) for kind, hist in data['parse'].items()] + [('tick', '', data['ticks'])]
+            for metric, key, hist in rows:
+                writer.writerow((metric, key, *(hist[k] for k in ('count', 'total_s', 'mean_us', 'p50_us', 'p90_us', 'p99_us', 'max_us'))))
+            for key in ('elapsed_s', 'results', 'lines_per_s', 'queue_depth_max'):
+                writer.writerow(('run', key, data[key]))
@@ -0,0 +1,116 @@
+"""
+بررسی دسترسی و تأخیر سرورها با اتصال TCP هم‌زمان (asyncio).
+به جای یک ترد برای هر اتصال، تعداد ثابتی coroutine روی یک event loop نقاط پایانی را یکی‌یکی
+برمی‌دارند، پس ده‌ها هزار سرور با حافظه و تعداد سوکت محدود بررسی می‌شوند.
+نام هر میزبان فقط یک بار resolve می‌شود و نتیجه آن (حتی ناموفق) برای بقیه پورت‌ها استفاده می‌شود.
+"""
+import asyncio
+import ipaddress
+import socket
+import time
+
+from vpn_core import normalize_host
+
+DEFAULT_CONCURRENCY = 256 # حداکثر اتصال‌های هم‌زمان
+DEFAULT_TIMEOUT = 3.0 # ثانیه، جداگانه برای resolve و اتصال هر نقطه پایانی
+
+
+def endpoint_key(host, port):
+    """(host, port) نرمال‌شده، یا None برای آدرس یا پورت نامعتبر (مثل N/A)."""
+    host = normalize_host(host).strip()
+    try: port = int(port)
+    except (TypeError, ValueError): return None
+    if not host or host == 'n/a' or not 0 < port < 65536: return None
+    return host, port
+
+
+class DnsCache:
+    """
+    کش resolve نام‌ها در طول یک اجرا. درخواست‌های هم‌زمان برای یک میزبان منتظر همان lookup می‌مانند؛
+    آدرس‌های IP بدون lookup برگردانده می‌شوند و نام‌های resolve نشده با None کش می‌شوند.
+    """
+    def __init__(self):
+        self._entries = {}
+        self.lookups = 0
+
+    async def resolve(self, host, timeout):
+        if (entry := self._entries.get(host)) is None:
+            try:
+                ipaddress.ip_address(host)
+                self._entries[host] = host
+                return host
+            except ValueError:
+                entry = self._entries[host] = asyncio.ensure_future(self._lookup(host))
+        if isinstance(entry, str): return entry
+        # shield: اگر این درخواست زودتر timeout شود، lookup برای بقیه ادامه می‌یابد
+        return await asyncio.wait_for(asyncio.shield(entry), timeout)
+
+    async def _lookup(self, host):
+        self.lookups += 1
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        except (OSError, UnicodeError):
+            return None
+        return infos[0][4][0] if infos else None
+
+
+async def probe(host, port, timeout=DEFAULT_TIMEOUT, dns=None):
+    """تأخیر برقراری اتصال TCP (میلی‌ثانیه، بدون زمان resolve) یا None اگر سرور در دسترس نباشد."""
+    try:
+        address = await dns.resolve(host, timeout) if dns else host
+        if address is None: return None
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        transport, _ = await asyncio.wait_for(loop.create_connection(asyncio.Protocol, address, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    latency = (time.perf_counter() - start) * 1000
+    transport.close()
+    return latency
+
+
+async def probe_all(endpoints, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, cancel_event=None, on_result=None):
+    """
+    [بهینه‌شده] concurrency کارگر از یک iterator مشترک نقطه پایانی برمی‌دارند؛ هیچ‌وقت بیش از
+    concurrency اتصال باز یا task در حال اجرا وجود ندارد. on_result(key, latency) پس از هر نتیجه
+    فراخوانی می‌شود. با set شدن cancel_event، نقطه پایانی جدیدی شروع نمی‌شود.
+    خروجی: {(host, port): latency یا None}
+    """
+    results = {}
+    dns = DnsCache()
+    pending = iter(endpoints)
+
+    async def worker():
+        for host, port in pending:
+            if cancel_event is not None and cancel_event.is_set(): return
+            latency = results[host, port] = await probe(host, port, timeout, dns)
+            if on_result: on_result((host, port), latency)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return results
+
+
+async def resolve_all(hosts, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, cancel_event=None):
+    """resolve هم‌زمان نام‌ها با همان استخر کارگر probe_all. خروجی: {host: آدرس یا None}"""
+    results = {}
+    dns = DnsCache()
+    pending = iter(hosts)
+
+    async def worker():
+        for host in pending:
+            if cancel_event is not None and cancel_event.is_set(): return
+            try: results[host] = await dns.resolve(host, timeout)
+            except asyncio.TimeoutError: results[host] = None
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return results
+
+
+def probe_endpoints(endpoints, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, cancel_event=None, on_result=None):
+    """نسخه همگام probe_all با event loop مخصوص خودش (برای ترد پس‌زمینه رابط گرافیکی و خط فرمان)."""
+    return asyncio.run(probe_all(endpoints, concurrency, timeout, cancel_event, on_result))
+
+
+def resolve_hosts(hosts, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, cancel_event=None):
+    """نسخه همگام resolve_all."""
+    return asyncio.run(resolve_all(hosts, concurrency, timeout, cancel_event))
@@ -0,0 +1,174 @@
+"""
+جستجو و فیلتر سریع در جداول نتایج، مستقل از tkinter.
+جستجو مستقیماً روی ستون‌های مخزن (vpn_store) انجام می‌شود و هیچ نسخه دیگری از مقادیر نگهداری
+نمی‌شود: هر عبارت جستجو فقط روی مقادیر یکتای هر ستون (رشته‌های interned، کدهای پروتکل، پورت‌ها)
+بررسی و سپس با یک پیمایش در سطح C به mask سطرها تبدیل می‌شود. کلیدهای جزئیات (مثل SNI و Net)
+فقط برای هر متن جزئیات یکتا یک بار و هنگام اولین جستجو استخراج می‌شوند.
+
+نحو جستجو: کلمات با فاصله جدا می‌شوند و همه باید برقرار باشند.
+    vless                 هر فیلدی شامل vless
+    port:44               فیلد با این مقدار شروع شود (پروتکل، پورت، Net) یا آن را شامل شود (بقیه)
+    port=443              مقدار دقیق
+    -net:grpc             نقیض
+مثال: vless port=443 sni:cdn -net:grpc
+"""
+import sys
+from itertools import compress
+
+FIELD_ALIASES = {
+    'proto': 'protocol', 'server': 'host', 'addr': 'host', 'type': 'net', 'network': 'net',
+    'original': 'original_name', 'orig': 'original_name', 'reason': 'error',
+}
+PREFIX_FIELDS = {'protocol', 'port', 'net'} # مقادیر کوتاه که با تایپ تدریجی، پیشوندشان معنادار است
+SKIPPED_COLUMNS = {'latency', 'secret', 'tag'} # ستون‌هایی که جستجو در آن‌ها معنایی ندارد
+CACHE_LIMIT = 64 # تعداد عبارت‌های جستجوی کش‌شده
+NEGATE = bytes([1, 0]) + bytes(254) # جدول translate برای معکوس کردن mask
+
+
+def parse_details(details):
+    """'SNI: x | Net: ws' -> {'sni': 'x', 'net': 'ws'}"""
+    fields = {}
+    for part in str(details).split('|'):
+        key, sep, value = part.partition(':')
+        if sep and (key := key.strip().lower()): fields[key] = value.strip()
+    return fields
+
+
+def _bits(mask):
+    return int.from_bytes(mask, 'little')
+
+
+class Contains:
+    """
+    predicate «text در مقدار»؛ ستونی که مقادیرش یکتا هستند (vpn_store.TextColumn) به جای اجرای آن برای هر
+    سطر، text را مستقیم در بایت‌های ستون جستجو می‌کند.
+    """
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+    def __call__(self, value):
+        return self.text in value
+
+
+class SearchIndex:
+    """
+    [بهینه‌شده] جستجو در ستون‌های یک جدول. هر ستون (sources، هم‌ترتیب با columns) متد match(predicate)
+    دارد که mask سطرهایی که مقدار نمایشی‌شان (با حروف کوچک) در predicate صدق می‌کند، یا None اگر هیچ
+    سطری، را با اجرای predicate فقط یک بار برای هر مقدار یکتا برمی‌گرداند؛ ستون details متد unique() هم دارد.
+    نتیجه هر کلمه (بر اساس تعداد سطرها) کش می‌شود، پس با تایپ تدریجی فقط کلمه آخر دوباره محاسبه و
+    با AND بیتی (روی int) با بقیه ترکیب می‌شود؛ اگر کلمه ادامه یک کلمه کش‌شده باشد (cd -> cdn) فقط سطرهای
+    منطبق با آن بررسی می‌شوند. ستون‌ها با آرگومان rows فقط همان سطرها را بررسی می‌کنند.
+    سطرها فقط اضافه می‌شوند؛ پس از پاک شدن ستون‌ها clear لازم است.
+    """
+    def __init__(self, columns, sources):
+        self.fields = {
+            FIELD_ALIASES.get(c, c): source
+            for c, source in zip(columns, sources) if c not in SKIPPED_COLUMNS and c != 'details'
+        }
+        self._source = dict(zip(columns, sources)).get('details')
+        self.clear()
+
+    def clear(self):
+        self._details = {} # متن جزئیات (حروف کوچک) -> فیلدهای آن
+        self._detail_values = {} # متن جزئیات -> مقادیر فیلدهایش جداشده با \n (کلمه جستجو فاصله ندارد)
+        self._detail_fields = set()
+        self._count = 0
+        self._cache = {}
+
+    def nbytes(self):
+        """حافظه کش جزئیات و نتایج جستجو (بایت)."""
+        size = sys.getsizeof(self._details) + sys.getsizeof(self._cache) + sys.getsizeof(self._detail_fields)
+        size += sys.getsizeof(self._detail_values) + sum(map(sys.getsizeof, self._detail_values.values()))
+        for fields in self._details.values():
+            size += sys.getsizeof(fields) + sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in fields.items())
+        return size + sum(sys.getsizeof(bits) for _, bits in self._cache.values())
+
+    def _parsed_details(self):
+        """متن‌های جزئیات جدید (از آخرین جستجو) را یک بار تجزیه می‌کند."""
+        if self._source is not None:
+            for text in map(str.casefold, self._source.unique()):
+                if text not in self._details:
+                    fields = self._details[text] = parse_details(text)
+                    self._detail_values[text] = '\n'.join(fields.values())
+                    self._detail_fields.update(fields)
+
+    def search(self, query, count):
+        """mask سطرهای منطبق با query (bytearray به طول count، تعداد سطرها) یا None برای query خالی."""
+        if not (tokens := query.casefold().split()): return None
+        self._count = count
+        self._parsed_details()
+        bits = None
+        for token in tokens:
+            token_bits = self._token_bits(token)
+            bits = token_bits if bits is None else bits & token_bits
+            if not bits: break
+        return bytearray(bits.to_bytes(self._count, 'little'))
+
+    def _token_bits(self, token):
+        if (cached := self._cache.get(token)) is not None and cached[0] == self._count: return cached[1]
+        negate = token.startswith('-') and len(token) > 1
+        term = token[1:] if negate else token
+        if not negate and (base := self._narrowing_bits(term)) is not None:
+            # فقط سطرهای منطبق با کلمه کوتاه‌تر بررسی و نتیجه به اندیس‌های اصلی برگردانده می‌شود
+            rows = list(compress(range(self._count), base.to_bytes(self._count, 'little')))
+            mask = bytearray(self._count)
+            for i in compress(rows, self._match(term, rows)): mask[i] = 1
+        else:
+            mask = self._match(term)
+        bits = _bits(mask.translate(NEGATE) if negate else mask)
+        if len(self._cache) >= CACHE_LIMIT: self._cache.clear()
+        self._cache[token] = (self._count, bits)
+        return bits
+
+    def _narrowing_bits(self, term):
+        """
+        کوچک‌ترین نتیجه کش‌شده (با همین تعداد سطر) که نتیجه term حتماً زیرمجموعه آن است، یا None:
+        همان فیلد و عملگر و متنی که متن قبلی را شامل شود (یا برای فیلدهای پیشوندی با آن شروع شود).
+        """
+        name, sep, text = self._parse(term)
+        if sep == '=': return None
+        best = None
+        for token, (count, bits) in self._cache.items():
+            if count != self._count or token.startswith('-') or token == term: continue
+            old_name, old_sep, old_text = self._parse(token)
+            if old_name != name or old_sep != sep: continue
+            if not (text.startswith(old_text) if name in PREFIX_FIELDS else old_text in text): continue
+            if best is None or bits.bit_count() < best.bit_count(): best = bits
+        return best
+
+    def _parse(self, term):
+        """(فیلد، جداکننده، متن)؛ برای کلمه بدون فیلد (یا با فیلد ناشناخته) (None، ''، term)."""
+        for sep in (':', '='):
+            name, found, text = term.partition(sep)
+            name = FIELD_ALIASES.get(name, name)
+            if found and (name in self.fields or name in self._detail_fields): return name, sep, text
+        return None, '', term
+
+    def _match(self, term, rows=None):
+        """mask سطرهای منطبق با term؛ با rows (اندیس سطرها) فقط برای همان سطرها و به همان ترتیب."""
+        size = self._count if rows is None else len(rows)
+        name, sep, text = self._parse(term)
+        if name is not None:
+            if sep == '=': predicate = text.__eq__
+            elif name in PREFIX_FIELDS: predicate = lambda value: value.startswith(text)
+            else: predicate = Contains(text)
+            if name in self.fields: mask = self.fields[name].match(predicate, rows)
+            else: mask = self._match_details(lambda fields: predicate(fields.get(name, '')), rows)
+            return mask or bytearray(size)
+        # کلمه بدون فیلد (یا فیلد ناشناخته، مثل بخشی از یک لینک): در همه فیلدها
+        bits = 0
+        masks = [field.match(Contains(term), rows) for field in self.fields.values()]
+        if self._source is not None:
+            values = self._detail_values
+            masks.append(self._source.match(lambda text: term in values[text], rows))
+        for mask in masks:
+            if mask is not None: bits |= _bits(mask)
+        return bytearray(bits.to_bytes(size, 'little'))
+
+    def _match_details(self, predicate, rows=None):
+        """mask سطرهایی که فیلدهای جزئیاتشان در predicate صدق می‌کند؛ None بدون ستون جزئیات."""
+        if self._source is None: return None
+        details = self._details
+        return self._source.match(lambda text: predicate(details[text]), rows)
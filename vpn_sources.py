@@ -0,0 +1,224 @@
+"""
+مرحله ورودی: منابع مختلف (متن، فایل، stdin) را به یک جریان خط تبدیل می‌کند.
+فایل‌ها هیچ‌وقت به طور کامل در حافظه خوانده نمی‌شوند؛ فایل‌های بزرگ memory-map شده و
+خط به خط به پردازشگر داده می‌شوند.
+"""
+import binascii
+import mmap
+import os
+import re
+
+from vpn_core import iter_clean_lines
+from vpn_json import iter_links_from_events, open_json_events
+
+MMAP_THRESHOLD = 32 * 1024 * 1024 # فایل‌های بزرگ‌تر از این اندازه memory-map می‌شوند
+BASE64_CHUNK_SIZE = 256 * 1024
+SNIFF_SIZE = 4096
+
+_BASE64_BLOB = re.compile(rb'[A-Za-z0-9+/=_\-\s]{16,}')
+_BASE64_LINE = re.compile(r'[A-Za-z0-9+/=_\-]{16,}')
+_BASE64_DOCUMENT_END = re.compile(rb'(?<==)(?=[^=])') # مرز اشتراک‌های پشت سر هم که هر کدام padding دارند
+_URLSAFE_TO_STANDARD = bytes.maketrans(b'-_', b'+/')
+_INLINE_WHITESPACE = b' \t\r'
+BASE64_WRAP_WIDTHS = (64, 76) # عرض خطوط Base64 شکسته‌شده (PEM و MIME)
+
+
+# --- Base64 subscriptions ---
+
+def looks_like_base64(head):
+    """آیا ابتدای یک فایل/جریان، یک اشتراک Base64 (بدون هیچ لینک صریح) است؟"""
+    return b'://' not in head and _BASE64_BLOB.fullmatch(head.strip()) is not None
+
+
+def _decode_base64_documents(data, final):
+    """
+    بخش قابل رمزگشایی data و کاراکترهای باقی‌مانده. هر اشتراکی که با padding تمام شده (و با final
+    آخرین اشتراک، پس از تکمیل padding) با یک خط جدید از اشتراک بعدی جدا می‌شود.
+    """
+    documents = _BASE64_DOCUMENT_END.split(data)
+    rest = documents.pop()
+    if final:
+        documents.append(rest + b'=' * (-len(rest) % 4))
+        rest = b''
+    else:
+        cut = len(rest) - len(rest) % 4
+        documents.append(rest[:cut])
+        rest = rest[cut:]
+    decoded = b''.join(binascii.a2b_base64(doc) + (b'\n' if doc.endswith(b'=') else b'') for doc in documents)
+    return decoded + b'\n' if final else decoded, rest
+
+
+def iter_base64_lines(stream, chunk_size=BASE64_CHUNK_SIZE):
+    """
+    [بهینه‌شده] یک اشتراک Base64 بزرگ را تکه‌تکه و مستقیماً روی bytes رمزگشایی کرده و خطوط
+    حاصل را (به صورت bytes) تحویل می‌دهد؛ کل فایل هیچ‌وقت در حافظه نیست. هر دو الفبای
+    استاندارد و URL-safe و چند اشتراک پشت سر هم پشتیبانی می‌شوند: هر خط جدید پایان یک اشتراک است،
+    مگر اینکه خط‌ها به عرض یکسان BASE64_WRAP_WIDTHS و بدون padding شکسته شده باشند. (اشتراک بدون
+    padding که طولش دقیقاً مضربی از این عرض‌هاست، از اشتراک بعدی قابل تشخیص نیست.)
+    """
+    carry = b'' # کاراکترهای Base64 که هنوز مضرب ۴ نشده‌اند
+    partial = b'' # انتهای خط ناقص از تکه قبلی
+    line_length = 0 # طول خط Base64 جاری تا این لحظه
+    width = None # عرض خطوط اشتراک جاری اگر شکسته‌شده باشد
+    while True:
+        chunk = stream.read(chunk_size)
+        *complete, rest = chunk.split(b'\n')
+        decoded = []
+        for line in complete:
+            data = line.translate(_URLSAFE_TO_STANDARD, _INLINE_WHITESPACE)
+            line_length += len(data)
+            wrapped = line_length in BASE64_WRAP_WIDTHS and width in (None, line_length) and not data.endswith(b'=')
+            part, carry = _decode_base64_documents(carry + data, final=not wrapped)
+            decoded.append(part)
+            width = line_length if wrapped else None
+            line_length = 0
+        data = rest.translate(_URLSAFE_TO_STANDARD, _INLINE_WHITESPACE)
+        line_length += len(data)
+        part, carry = _decode_base64_documents(carry + data, final=not chunk) # پایان جریان: padding تکمیل می‌شود
+        decoded.append(part)
+
+        *lines, partial = (partial + b''.join(decoded)).split(b'\n')
+        yield from lines
+        if not chunk: break
+
+    if partial: yield partial
+
+
+def decode_base64_text(text):
+    """رمزگشایی یک خط Base64 (استاندارد یا URL-safe، با یا بدون padding)؛ در صورت خطا None."""
+    data = text.encode('ascii').translate(_URLSAFE_TO_STANDARD)
+    try:
+        return binascii.a2b_base64(data + b'=' * (-len(data) % 4)).decode('utf-8')
+    except (binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def expand_subscriptions(lines):
+    """
+    خطوطی که خودشان یک اشتراک Base64 هستند (بدون ://) رمزگشایی و با لینک‌های داخلشان جایگزین می‌شوند.
+    بقیه خطوط بدون تغییر عبور می‌کنند؛ بررسی اولیه فقط یک جستجوی '://' است.
+    """
+    for line in lines:
+        if '://' not in line and _BASE64_LINE.fullmatch(line):
+            decoded = decode_base64_text(line)
+            if decoded and '://' in decoded:
+                yield from iter_clean_lines(iter_text_lines(decoded))
+                continue
+        yield line
+
+
+def iter_text_lines(text):
+    """خطوط یک رشته را بدون ساختن لیست کامل (splitlines) تحویل می‌دهد."""
+    start, length = 0, len(text)
+    while start < length:
+        end = text.find('\n', start)
+        if end < 0: end = length
+        yield text[start:end]
+        start = end + 1
+
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024: return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} GB"
+
+
+class InputReader:
+    """
+    مجموعه‌ای از منابع ورودی که به ترتیب افزوده شدن، به صورت یک جریان خط خوانده می‌شوند.
+    total_size و done_size (بر حسب بایت برای فایل‌ها و کاراکتر برای متن) برای نمایش پیشرفت
+    از ترد دیگر قابل خواندن هستند. خطای خواندن هر فایل در errors ثبت و از آن فایل صرف‌نظر می‌شود.
+    """
+    def __init__(self):
+        self.sources = [] # [(kind, value)]
+        self.total_size = 0
+        self.done_size = 0
+        self.errors = [] # [(path, message)]
+
+    def __bool__(self):
+        return bool(self.sources)
+
+    def add_text(self, text):
+        if text.strip():
+            self.sources.append(('text', text))
+            self.total_size += len(text)
+
+    def add_file(self, path):
+        """اندازه فایل همین‌جا خوانده می‌شود تا فایل ناموجود یا غیرقابل دسترس فوراً OSError بدهد."""
+        size = os.path.getsize(path)
+        self.sources.append(('file', path))
+        self.total_size += size
+
+    def merge(self, other):
+        """منابع یک InputReader دیگر را (به همان ترتیب) به انتهای این یکی اضافه می‌کند."""
+        self.sources.extend(other.sources)
+        self.total_size += other.total_size
+
+    def add_stream(self, stream):
+        """یک جریان باینری (مثل sys.stdin.buffer) با اندازه نامشخص."""
+        self.sources.append(('stream', stream))
+
+    def files(self):
+        return [value for kind, value in self.sources if kind == 'file']
+
+    def texts(self):
+        return [value for kind, value in self.sources if kind == 'text']
+
+    def summary(self):
+        """خلاصه منابع برای نمایش در رابط کاربری به جای محتوای کامل آن‌ها."""
+        parts = []
+        if files := self.files(): parts.append(f"📂 {len(files)} فایل")
+        if texts := self.texts(): parts.append(f"📋 {len(texts)} متن جای‌گذاری‌شده")
+        return f"{'، '.join(parts)} ({format_size(self.total_size)}) آماده پردازش جریانی" if parts else ""
+
+    def __iter__(self):
+        for kind, value in self.sources:
+            if kind == 'text':
+                for line in iter_text_lines(value):
+                    self.done_size += len(line) + 1
+                    yield line
+            elif kind == 'stream':
+                yield from self._iter_stream_lines(value)
+            else:
+                try:
+                    yield from self._iter_file_lines(value)
+                except (OSError, ValueError) as e:
+                    self.errors.append((value, str(e)))
+
+    def _iter_file_lines(self, path):
+        if path.lower().endswith('.json'):
+            with open(path, 'rb') as f:
+                events = open_json_events(f)
+                start = self.done_size
+                for link in iter_links_from_events(events):
+                    self.done_size = start + events.bytes_read
+                    yield link
+            return
+
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    yield from self._iter_stream_lines(mm, mm[:SNIFF_SIZE])
+            else:
+                yield from self._iter_stream_lines(f)
+
+    def _iter_stream_lines(self, stream, head=None):
+        """جریان‌هایی که کلاً یک اشتراک Base64 هستند به صورت تکه‌ای رمزگشایی می‌شوند."""
+        if head is None:
+            head = stream.peek(SNIFF_SIZE)[:SNIFF_SIZE] if hasattr(stream, 'peek') else b''
+        if not looks_like_base64(head):
+            yield from self._iter_binary_lines(stream.readline if isinstance(stream, mmap.mmap) else stream)
+            return
+
+        start = self.done_size
+        seekable = isinstance(stream, mmap.mmap) or stream.seekable() # stdin (pipe) قابل tell نیست
+        for raw in iter_base64_lines(stream):
+            if seekable: self.done_size = start + stream.tell()
+            yield raw.decode('utf-8', 'replace')
+
+    def _iter_binary_lines(self, raw_lines):
+        if callable(raw_lines): raw_lines = iter(raw_lines, b'')
+        for raw in raw_lines:
+            self.done_size += len(raw)
+            yield raw.decode('utf-8', 'replace')
@@ -0,0 +1,547 @@
+"""
+مخزن داده جداول نتایج، مستقل از tkinter.
+جدول مجازی (vpn_table.VirtualTable) فقط سطرهای قابل مشاهده را از این مخزن می‌خواند.
+
+داده‌ها به صورت ستونی ذخیره می‌شوند (به جای یک dict یا tuple برای هر لینک):
+پورت‌ها در array عددی، پروتکل‌ها به صورت کد یک‌بایتی، رشته‌های پرتکرار (آدرس، نام، جزئیات)
+به صورت interned و رشته‌های یکتا (لینک، نام اصلی) پشت سر هم در یک bytearray.
+"""
+import re
+import sys
+from array import array
+from bisect import bisect_right
+from itertools import compress, islice, repeat
+from operator import contains
+
+from vpn_core import render_template
+from vpn_search import Contains, SearchIndex
+
+LATENCY_UNKNOWN = -2 # هنوز بررسی نشده
+LATENCY_DEAD = -1 # در دسترس نیست
+LATENCY_SORT_DEAD = 1 << 40 # کلید مرتب‌سازی سرورهای قطع؛ فعال‌ها قبل و بررسی‌نشده‌ها بعد از آن
+# نویسه‌های غیر ASCII که casefold آن‌ها نویسه ASCII دارد (مثل ß -> ss)؛ بدون آن‌ها casefold و
+# کوچک کردن حروف ASCII برای یافتن یک کلمه ASCII یکسان‌اند
+FOLDS_TO_ASCII = re.compile('[\xdf\u0130\u0149\u017f\u01f0\u1e96-\u1e9a\u1e9e\u212a\ufb00-\ufb06]')
+
+
+def port_sort_key(value):
+    """پورت به صورت عددی مقایسه می‌شود؛ مقادیر نامعتبر (مثل N/A) در ابتدای لیست قرار می‌گیرند."""
+    try: return int(value)
+    except (ValueError, TypeError): return -1
+
+
+def host_sort_key(value):
+    """آدرس به شکل نرمال‌شده (حروف کوچک، بدون براکت IPv6 و نقطه انتهایی) مقایسه می‌شود."""
+    return str(value).strip('[]').rstrip('.').lower()
+
+
+def text_sort_key(value):
+    return str(value).casefold()
+
+
+# --- Columns ---
+
+class IntColumn:
+    """ستون عددی (پورت)؛ هر مقدار ۴ بایت. مقادیر نامعتبر با -1 ذخیره و N/A نمایش داده می‌شوند."""
+    def __init__(self):
+        self.clear()
+
+    def append(self, value):
+        self.data.append(port_sort_key(value))
+
+    def get(self, i):
+        value = self.data[i]
+        return 'N/A' if value < 0 else str(value)
+
+    def sort_keys(self, start=0):
+        return self.data[start:]
+
+    def match(self, predicate, rows=None):
+        """
+        mask سطرهایی که مقدار نمایشی‌شان (با حروف کوچک، casefold) در predicate صدق می‌کند، یا None اگر
+        هیچ سطری؛ predicate فقط یک بار برای هر مقدار یکتا اجرا می‌شود. با rows (اندیس سطرها) فقط همان
+        سطرها بررسی می‌شوند و mask هم‌ترتیب با rows است.
+        """
+        # مقادیر یکتا فقط برای سطرهای جدید (از آخرین جستجو) به‌روز می‌شوند
+        self._unique.update(self.data[self._unique_rows:])
+        self._unique_rows = len(self.data)
+        if not (wanted := {value for value in self._unique if predicate('n/a' if value < 0 else str(value))}): return None
+        return bytearray(map(wanted.__contains__, self.data if rows is None else map(self.data.__getitem__, rows)))
+
+    def clear(self):
+        self.data = array('i')
+        self._unique = set()
+        self._unique_rows = 0
+
+    def nbytes(self):
+        return sys.getsizeof(self.data)
+
+
+class LatencyColumn:
+    """ستون نتیجه بررسی دسترسی: تأخیر به میلی‌ثانیه (۴ بایت)، LATENCY_DEAD برای قطع و LATENCY_UNKNOWN برای بررسی‌نشده."""
+    def __init__(self):
+        self.data = array('i')
+
+    def append(self, value):
+        self.data.append(LATENCY_UNKNOWN)
+
+    def set(self, i, latency):
+        """latency: میلی‌ثانیه یا None برای سرور قطع."""
+        self.data[i] = LATENCY_DEAD if latency is None else round(latency)
+
+    def get(self, i):
+        value = self.data[i]
+        return '' if value == LATENCY_UNKNOWN else '✖ قطع' if value == LATENCY_DEAD else f"{value} ms"
+
+    def sort_keys(self, start=0):
+        return [value if value >= 0 else LATENCY_SORT_DEAD - value - 1 for value in self.data[start:]]
+
+    def clear(self):
+        self.data = array('i')
+
+    def nbytes(self):
+        return sys.getsizeof(self.data)
+
+
+class TagColumn:
+    """
+    ستون نام جدید؛ هیچ داده‌ای برای هر سطر ذخیره نمی‌شود (TableModel.set_tag). value یک نام ثابت
+    یا تابعی است که نام سطر i را از مقادیر آن (قالب نام) می‌سازد.
+    """
+    def __init__(self):
+        self.value = ''
+        self.count = 0
+
+    def append(self, value):
+        self.count += 1
+
+    def get(self, i):
+        return self.value(i) if callable(self.value) else self.value
+
+    def sort_keys(self, start=0):
+        if callable(self.value): return [text_sort_key(self.value(i)) for i in range(start, self.count)]
+        return bytearray(self.count - start)
+
+    def clear(self):
+        self.count = 0
+
+    def nbytes(self):
+        return 0
+
+
+def is_alive(key):
+    """شرط فیلتر ستون latency (روی کلید مرتب‌سازی): فقط سرورهای فعال."""
+    return key < LATENCY_SORT_DEAD
+
+
+def _matching(values, predicate):
+    """مقادیری از values که casefold آن‌ها در predicate صدق می‌کند؛ برای Contains بدون فراخوانی پایتونی برای هر مقدار."""
+    if isinstance(predicate, Contains):
+        return compress(values, map(contains, map(str.casefold, values), repeat(predicate.text)))
+    return (value for value in values if predicate(value.casefold()))
+
+
+def _is_subset(mask, previous):
+    """آیا سطرهای mask زیرمجموعه سطرهای previous هستند؟ (None یعنی همه سطرها)"""
+    if previous is None: return mask is None
+    return mask is not None and not int.from_bytes(mask, 'little') & ~int.from_bytes(previous, 'little')
+
+
+def _and_masks(masks):
+    bits = int.from_bytes(masks[0], 'little')
+    for mask in masks[1:]: bits &= int.from_bytes(mask, 'little')
+    return bytearray(bits.to_bytes(len(masks[0]), 'little'))
+
+
+class InternedColumn:
+    """
+    ستون رشته‌های پرتکرار؛ هر مقدار یکتا فقط یک بار در حافظه نگهداری و بقیه سطرها
+    فقط به همان شیء اشاره می‌کنند (۸ بایت برای هر سطر).
+    """
+    def __init__(self, sort_key=text_sort_key):
+        self.sort_key = sort_key
+        self.values = []
+        self._interned = {}
+
+    def append(self, value):
+        value = str(value)
+        self.values.append(self._interned.setdefault(value, value))
+
+    def get(self, i):
+        return self.values[i]
+
+    def sort_keys(self, start=0):
+        # کلید مرتب‌سازی فقط یک بار برای هر مقدار یکتا محاسبه می‌شود
+        values = self.values[start:]
+        keys = {value: self.sort_key(value) for value in set(values)}
+        return [keys[value] for value in values]
+
+    def unique(self):
+        return self._interned.keys()
+
+    def match(self, predicate, rows=None):
+        # سطرها به همان شیء interned اشاره می‌کنند و hash رشته‌ها کش شده است
+        if not (wanted := set(_matching(self._interned, predicate))): return None
+        return bytearray(map(wanted.__contains__, self.values if rows is None else map(self.values.__getitem__, rows)))
+
+    def clear(self):
+        self.values = []
+        self._interned = {}
+
+    def nbytes(self):
+        return sys.getsizeof(self.values) + sys.getsizeof(self._interned) + sum(sys.getsizeof(v) for v in self._interned)
+
+
+class CategoryColumn(InternedColumn):
+    """ستون با تعداد مقادیر بسیار کم (پروتکل)؛ هر سطر فقط یک کد یک‌بایتی است."""
+    def __init__(self, sort_key=text_sort_key):
+        super().__init__(sort_key)
+        self.codes = array('B')
+
+    def append(self, value):
+        value = str(value)
+        if (code := self._interned.get(value)) is None:
+            code = self._interned[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def get(self, i):
+        return self.values[self.codes[i]]
+
+    def sort_keys(self, start=0):
+        keys = [self.sort_key(value) for value in self.values]
+        return [keys[code] for code in self.codes[start:]]
+
+    def match(self, predicate, rows=None):
+        if not (wanted := set(map(self._interned.__getitem__, _matching(self.values, predicate)))): return None
+        return bytearray(map(wanted.__contains__, self.codes if rows is None else map(self.codes.__getitem__, rows)))
+
+    def clear(self):
+        super().clear()
+        self.codes = array('B')
+
+    def nbytes(self):
+        return sys.getsizeof(self.codes) + sum(sys.getsizeof(v) for v in self.values)
+
+
+class TextColumn:
+    """ستون رشته‌های یکتا؛ متن‌ها به صورت UTF-8 پشت سر هم در یک bytearray و مرز آن‌ها در array ذخیره می‌شود."""
+    def __init__(self, sort_key=text_sort_key):
+        self.sort_key = sort_key
+        self.clear()
+
+    def append(self, value):
+        self.data += str(value).encode('utf-8')
+        self.offsets.append(len(self.data))
+
+    def get(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def iter_from(self, start):
+        # برش و رمزگشایی همه در سطح C (map)، بدون حلقه پایتونی برای هر سطر
+        return map(bytearray.decode, map(self.data.__getitem__, self._slices(start)))
+
+    def _slices(self, start):
+        offsets, end = self.offsets, len(self.offsets)
+        return map(slice, islice(offsets, start, end - 1), islice(offsets, start + 1, end))
+
+    def _row_slices(self, rows):
+        offsets = self.offsets
+        return map(slice, map(offsets.__getitem__, rows), map(offsets.__getitem__, map((1).__add__, rows)))
+
+    def sort_keys(self, start=0):
+        return [self.sort_key(value) for value in self.iter_from(start)]
+
+    def match(self, predicate, rows=None):
+        # مقادیر یکتا هستند، پس predicate برای هر سطر اجرا می‌شود؛ هیچ کپی دیگری از متن‌ها نگهداری نمی‌شود
+        if isinstance(predicate, Contains) and predicate.text.isascii() and self._folds_as_ascii():
+            mask = self._find_rows(predicate.text.encode('ascii'))
+            if rows is not None: mask = bytearray(map(mask.__getitem__, rows))
+        else:
+            slices = self._slices(0) if rows is None else self._row_slices(rows)
+            if self.data.isascii():
+                # مرز بایت‌ها همان مرز کاراکترهاست: کل ستون یک بار (به جای هر سطر) رمزگشایی و کوچک می‌شود
+                values = map(self.data.decode('ascii').casefold().__getitem__, slices)
+            else:
+                values = map(str.casefold, map(bytearray.decode, map(self.data.__getitem__, slices)))
+            mask = bytearray(map(predicate, values))
+        return mask if 1 in mask else None
+
+    def _folds_as_ascii(self):
+        # فقط متن اضافه‌شده از آخرین بررسی دوباره بررسی می‌شود (مرز سطرها همیشه مرز نویسه‌هاست)
+        if self._folds_checked < len(self.data):
+            new = self.data[self._folds_checked:]
+            if not new.isascii() and FOLDS_TO_ASCII.search(new.decode('utf-8')): self._folds_ascii = False
+            self._folds_checked = len(self.data)
+        return self._folds_ascii
+
+    def _find_rows(self, term):
+        """
+        [بهینه‌شده] سطرهای شامل term (بایت‌های ASCII) با find روی کل ستون (با حروف ASCII کوچک)؛
+        حلقه پایتونی فقط روی سطرهای منطبق اجرا می‌شود، نه روی همه سطرها.
+        """
+        data, offsets = self.data.lower(), self.offsets
+        mask = bytearray(len(offsets) - 1)
+        size, row = len(term), 0
+        pos = data.find(term)
+        while pos >= 0:
+            row = bisect_right(offsets, pos, row) - 1
+            end = offsets[row + 1]
+            if pos + size <= end: # یافته‌ای که از مرز دو سطر عبور کند حساب نمی‌شود
+                mask[row] = 1
+                pos = data.find(term, end)
+            else:
+                pos = data.find(term, pos + 1)
+        return mask
+
+    def clear(self):
+        self.data = bytearray()
+        self.offsets = array('Q', [0])
+        self._folds_ascii = True # هیچ نویسه‌ای از FOLDS_TO_ASCII در ستون نیست
+        self._folds_checked = 0
+
+    def nbytes(self):
+        return sys.getsizeof(self.data) + sys.getsizeof(self.offsets)
+
+
+COLUMN_TYPES = {
+    'protocol': CategoryColumn,
+    'port': IntColumn,
+    'host': lambda: InternedColumn(host_sort_key),
+    'server': lambda: InternedColumn(host_sort_key),
+    'name': InternedColumn,
+    'details': InternedColumn,
+    'error': InternedColumn,
+    'latency': LatencyColumn,
+    'tag': TagColumn,
+}
+
+
+class TableModel:
+    """
+    سطرهای یک جدول به صورت ستونی به همراه لینک کامل هر سطر نگهداری می‌شوند.
+    ترتیب نمایش (پس از مرتب‌سازی، فیلتر و جستجو) جدا از ترتیب ذخیره‌سازی در self._order نگهداری
+    می‌شود؛ طول مدل تعداد سطرهای قابل نمایش است. self.index ایندکس جستجوی سطرهاست.
+    اگر tag تنظیم شده باشد، لینک‌های ذخیره‌شده الگو (vpn_core.render_template) هستند و هنگام خواندن
+    با همین نام کامل می‌شوند؛ بنابراین تغییر نام همه سطرها بدون پارس دوباره و در O(1) انجام می‌شود.
+    tag می‌تواند یک Namer (vpn_geo) باشد؛ در این صورت نام هر سطر هنگام خواندن از مقادیر همان سطر ساخته می‌شود.
+    هر سطر اثر انگشت خط ورودی سازنده‌اش (source) را دارد تا با حذف یا تغییر آن خط، با retire کنار گذاشته شود.
+    """
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+        self._cols = tuple(COLUMN_TYPES.get(k, TextColumn)() for k in self.columns)
+        self._links = TextColumn()
+        self._sources = array('Q') # اثر انگشت خط ورودی هر سطر (0: نامشخص)
+        self._live = None # bytearray؛ پس از اولین retire برای هر سطر ۱ اگر کنار گذاشته نشده باشد
+        self._retired = 0
+        self.index = SearchIndex(self.columns, self._cols)
+        self.tag = None
+        self._count = 0
+        self._order = None # None یعنی ترتیب درج
+        self._sort_keys = {} # {column: keys} کلیدهای مرتب‌سازی محاسبه‌شده برای سطرهای ابتدایی
+        self._sorted = {} # {column: (row_count, ascending_order)} ترتیب‌های مرتب‌شده کش‌شده
+        self._sort_state = None # (column, reverse) آخرین مرتب‌سازی
+        self._filter = None # (column, predicate)
+        self._query = '' # عبارت جستجو؛ با clear پاک نمی‌شود تا روی نتایج پردازش بعدی هم اعمال شود
+        self._mask = None # bytearray؛ برای هر سطر ذخیره‌شده ۱ اگر از فیلتر عبور کند
+        self._view = None # (row_count, sort_state) که self._order با آن ساخته شده است
+
+    def __len__(self):
+        return self._count if self._order is None else len(self._order)
+
+    @property
+    def total(self):
+        """تعداد کل سطرها (به جز سطرهای کنار گذاشته‌شده)، بدون در نظر گرفتن فیلتر و جستجو."""
+        return self._count - self._retired
+
+    def append(self, record, source=0):
+        """یک LinkRecord را اضافه می‌کند؛ مقدار هر ستون از صفت هم‌نام رکورد خوانده می‌شود."""
+        self.add_row(tuple(getattr(record, k, 'N/A') for k in self.columns), record.link, source)
+
+    def add_row(self, values, link='', source=0):
+        for col, value in zip(self._cols, values):
+            col.append(value)
+        self._links.append(link)
+        self._sources.append(source)
+        if self._live is not None:
+            self._live.append(1)
+        if self._mask is not None:
+            self._mask.append(1)
+        if self._order is not None:
+            self._order.append(self._count)
+        self._count += 1
+
+    def clear(self):
+        for col in self._cols: col.clear()
+        self._links.clear()
+        self._sources = array('Q')
+        self._live = None
+        self._retired = 0
+        self.index.clear()
+        self._count = 0
+        self._order = None
+        self._sort_keys.clear()
+        self._sorted.clear()
+        self._sort_state = None
+        self._filter = None
+        self._mask = None
+        self._view = None
+
+    def retire(self, sources):
+        """
+        سطرهایی که خط ورودی‌شان در sources (مجموعه اثر انگشت‌ها) است از نمایش و خروجی کنار گذاشته می‌شوند.
+        داده ستونی آن‌ها (مثل حذف واقعی) جابه‌جا نمی‌شود؛ فقط در mask نمایش صفر می‌شوند. خروجی: تعداد سطرها
+        """
+        # هر بایت mask صفر یا یک است، پس عملیات بیتی روی int معادل عملیات سطر به سطر است
+        hits = int.from_bytes(bytearray(map(sources.__contains__, self._sources)), 'little')
+        live = int.from_bytes(self._live if self._live is not None else b'\x01' * self._count, 'little')
+        if not (retired := (hits & live).bit_count()): return 0 # سطر کنار گذاشته‌شده دوباره شمرده نمی‌شود
+        self._live = bytearray((live & ~hits).to_bytes(self._count, 'little'))
+        self._retired += retired
+        self.refresh_view()
+        return retired
+
+    def is_retired(self, i):
+        return self._live is not None and not self._live[i]
+
+    def _record_index(self, index):
+        return index if self._order is None else self._order[index]
+
+    def row(self, index):
+        """مقادیر ستون‌های سطر شماره index (به ترتیب نمایش)."""
+        i = self._record_index(index)
+        return tuple(col.get(i) for col in self._cols)
+
+    def set_tag(self, tag):
+        """
+        نام جدید همه سطرها (ستون tag و لینک‌های الگو) را تغییر می‌دهد: یک رشته ثابت یا یک Namer.
+        با فراخوانی دوباره با همان Namer (مثلاً پس از resolve نام سرورها) نام‌های کش‌شده باطل می‌شوند.
+        """
+        self.tag = tag
+        name = self.row_name if tag is not None and not isinstance(tag, str) else tag
+        # ستون‌های ورودی قالب نام یک بار پیدا می‌شوند، نه برای هر سطر
+        self._name_getters = tuple(
+            self._cols[self.columns.index(key)].get if key in self.columns else (lambda i: '')
+            for key in ('protocol', 'host', 'port', 'original_name')
+        )
+        for col in self._cols:
+            if isinstance(col, TagColumn): col.value = name
+        self._sort_keys.pop('tag', None)
+        self._sorted.pop('tag', None)
+        self._view = None
+        if self._sort_state and self._sort_state[0] == 'tag': self.refresh_view()
+
+    def row_name(self, i):
+        """نام سطر ذخیره‌شده i؛ index قالب نام شماره سطر به ترتیب درج است."""
+        if isinstance(self.tag, str): return self.tag
+        return self.tag.name(*[get(i) for get in self._name_getters], i + 1)
+
+    def link(self, index):
+        i = self._record_index(index)
+        link = self._links.get(i)
+        return link if self.tag is None else render_template(link, self.row_name(i))
+
+    def iter_links(self):
+        """لینک‌ها را به ترتیب نمایش و بدون ساختن لیست کامل تحویل می‌دهد."""
+        links = iter(self._links) if self._order is None else map(self._links.get, self._order)
+        if self.tag is None:
+            yield from links
+        elif isinstance(self.tag, str):
+            tag = self.tag
+            for link in links: yield render_template(link, tag)
+        else:
+            rows = range(self._count) if self._order is None else self._order
+            for i, link in zip(rows, links): yield render_template(link, self.row_name(i))
+
+    def column_values(self, column):
+        """مقادیر نمایشی یک ستون به ترتیب ذخیره‌سازی (اندیس‌ها همان اندیس‌های set_values هستند)."""
+        col = self._cols[self.columns.index(column)]
+        return (col.get(i) for i in range(self._count))
+
+    def set_values(self, column, items):
+        """
+        مقادیر ستون‌های قابل تغییر (latency) را برای (اندیس ذخیره‌سازی، مقدار) ها به‌روز می‌کند.
+        ترتیب نمایش تا فراخوانی refresh_view تغییر نمی‌کند.
+        """
+        col = self._cols[self.columns.index(column)]
+        for i, value in items: col.set(i, value)
+        self._sort_keys.pop(column, None)
+        self._sorted.pop(column, None)
+        self._view = None
+
+    @property
+    def view_active(self):
+        """آیا مرتب‌سازی، فیلتر یا جستجویی فعال است؟ (سطرهای جدید تا refresh_view در انتهای نمایش می‌آیند)"""
+        return bool(self._sort_state or self._filter or self._query)
+
+    def set_filter(self, column=None, predicate=None):
+        """فقط سطرهایی که predicate(کلید مرتب‌سازی column) برایشان درست است نمایش داده می‌شوند؛ بدون predicate فیلتر برداشته می‌شود."""
+        self._filter = (column, predicate) if predicate else None
+        self.refresh_view()
+
+    def set_search(self, query):
+        """فقط سطرهای منطبق با query (نحو vpn_search) نمایش داده می‌شوند؛ رشته خالی جستجو را برمی‌دارد."""
+        self._query = query.strip()
+        self.refresh_view()
+
+    def refresh_view(self):
+        """ترتیب نمایش را با مرتب‌سازی، فیلتر و جستجوی فعلی از نو می‌سازد."""
+        masks = [self._live] if self._retired else []
+        if self._filter:
+            column, predicate = self._filter
+            masks.append(bytearray(map(predicate, self._column_keys(column))))
+        if self._query and (found := self.index.search(self._query, self._count)) is not None:
+            masks.append(found)
+        previous, self._mask = self._mask, _and_masks(masks) if masks else None
+        if self._order is not None and self._view == (self._count, self._sort_state) and _is_subset(self._mask, previous):
+            # [بهینه‌شده] نمایش جدید زیرمجموعه نمایش فعلی است (مثل ادامه تایپ عبارت جستجو):
+            # فقط سطرهای نمایش فعلی فیلتر می‌شوند، نه کل ترتیب مرتب‌شده
+            self._order = self._apply_filter(self._order)
+        elif self._sort_state: self.sort(*self._sort_state)
+        else:
+            self._order = self._apply_filter(None)
+            self._view = (self._count, None)
+
+    def _apply_filter(self, order):
+        if self._mask is None: return order
+        mask = self._mask
+        # compress و map در سطح C اجرا می‌شوند؛ بدون حلقه پایتونی روی سطرها
+        if order is None: return array('Q', compress(range(self._count), mask))
+        return array('Q', compress(order, map(mask.__getitem__, order)))
+
+    def memory_usage(self):
+        """حافظه تقریبی اشغال‌شده توسط داده‌های جدول (بایت)، بدون کش‌های مرتب‌سازی."""
+        return (sum(col.nbytes() for col in self._cols) + self._links.nbytes() + self.index.nbytes()
+                + sys.getsizeof(self._sources) + (sys.getsizeof(self._live) if self._live is not None else 0))
+
+    def sort(self, column, reverse=False):
+        """
+        [بهینه‌شده] مرتب‌سازی روی کلیدهای از پیش محاسبه‌شده و نوع‌دار هر ستون انجام می‌شود.
+        ترتیب صعودی هر ستون تا زمانی که سطر جدیدی اضافه نشود کش می‌ماند، بنابراین کلیک دوباره
+        روی همان ستون (یا معکوس کردن جهت) بدون مرتب‌سازی مجدد انجام می‌شود.
+        """
+        count = self._count
+        cached = self._sorted.get(column)
+        if cached is None or cached[0] != count:
+            cached = (count, self._sorted_order(column))
+            self._sorted[column] = cached
+        order = cached[1]
+        self._sort_state = (column, reverse)
+        self._order = self._apply_filter(order[::-1] if reverse else array('Q', order))
+        self._view = (count, self._sort_state)
+
+    def _column_keys(self, column):
+        # کلیدها فقط برای سطرهای اضافه‌شده پس از آخرین محاسبه ساخته و به کلیدهای قبلی اضافه می‌شوند
+        col = self._cols[self.columns.index(column)]
+        if (keys := self._sort_keys.get(column)) is None:
+            keys = self._sort_keys[column] = col.sort_keys()
+        elif len(keys) < self._count:
+            keys.extend(col.sort_keys(len(keys)))
+        return keys
+
+    def _sorted_order(self, column):
+        keys = self._column_keys(column)
+        return array('Q', sorted(range(len(keys)), key=keys.__getitem__))
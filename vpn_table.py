@@ -0,0 +1,158 @@
+"""
+جدول مجازی (Virtual Treeview).
+به جای ساختن یک آیتم Treeview برای هر سطر، فقط به تعداد سطرهای قابل مشاهده آیتم ساخته
+می‌شود و با اسکرول، مقادیر همان آیتم‌ها از روی مدل (vpn_store.TableModel) بازنویسی می‌شوند.
+به این ترتیب هزینه حافظه و درج مستقل از تعداد نتایج است.
+"""
+from tkinter import ttk
+
+
+class VirtualTable(ttk.Frame):
+    def __init__(self, parent, model, columns, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.model = model
+        self.first = 0 # اندیس اولین سطر قابل مشاهده در مدل
+        self.selected = None # اندیس سطر انتخاب شده در مدل
+        self._slots = [] # iid آیتم‌های واقعی Treeview، یکی برای هر سطر قابل مشاهده
+        self._slot_of = {}
+        self._shown_total = 0
+        self._refresh_pending = False
+
+        self.tree = ttk.Treeview(self, columns=list(columns.keys()), show='headings', selectmode='browse')
+        for col, width in columns.items():
+            self.tree.heading(col, text=col, anchor='center')
+            self.tree.column(col, anchor='w', width=width, minwidth=width)
+
+        self.vsb = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        hsb = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=hsb.set)
+
+        self.vsb.pack(side='left', fill='y')
+        hsb.pack(side='bottom', fill='x')
+        self.tree.pack(side='left', fill='both', expand=True)
+
+        self.tree.bind("<Configure>", lambda e: self.refresh())
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_rows(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_rows(3))
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        for key, step in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-page"), ("<Next>", "page"), ("<Home>", "home"), ("<End>", "end")):
+            self.tree.bind(key, lambda e, s=step: self._on_key(s))
+
+    # --- Public API ---
+
+    def heading(self, col, **kwargs):
+        self.tree.heading(col, **kwargs)
+
+    def index_at(self, y):
+        """اندیس سطر مدل زیر مختصات y (یا None)."""
+        iid = self.tree.identify_row(y)
+        return self.first + self._slot_of[iid] if iid in self._slot_of else None
+
+    def select(self, index):
+        self.selected = index
+        self._ensure_visible(index)
+        self.refresh()
+
+    def notify_changed(self):
+        """پس از افزودن سطر به مدل فراخوانی می‌شود؛ چند فراخوانی پشت سر هم در یک بازسازی ادغام می‌شوند."""
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            self.after_idle(self._refresh_if_needed)
+
+    def reset(self):
+        self.first = 0
+        self.selected = None
+        self.refresh()
+
+    def refresh(self):
+        """مقادیر آیتم‌های قابل مشاهده را از مدل بازنویسی می‌کند."""
+        self._refresh_pending = False
+        total = len(self.model)
+        visible = self._visible_rows()
+        self.first = max(0, min(self.first, total - visible))
+        count = min(visible, total - self.first)
+
+        while len(self._slots) < count:
+            iid = self.tree.insert("", "end")
+            self._slot_of[iid] = len(self._slots)
+            self._slots.append(iid)
+        while len(self._slots) > count:
+            del self._slot_of[self._slots[-1]]
+            self.tree.delete(self._slots.pop())
+
+        for slot, iid in enumerate(self._slots):
+            index = self.first + slot
+            self.tree.item(iid, values=self.model.row(index), tags=('evenrow' if index % 2 == 0 else 'oddrow',))
+
+        if self.selected is not None and self.first <= self.selected < self.first + count:
+            iid = self._slots[self.selected - self.first]
+            self.tree.selection_set(iid)
+            self.tree.focus(iid)
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+
+        self._shown_total = total
+        if total: self.vsb.set(self.first / total, (self.first + count) / total)
+        else: self.vsb.set(0, 1)
+
+    # --- Internals ---
+
+    def _visible_rows(self):
+        height = self.tree.winfo_height()
+        if self._slots and (bbox := self.tree.bbox(self._slots[0])):
+            header, row_height = bbox[1], bbox[3]
+        else:
+            row_height = int(ttk.Style(self).lookup("Treeview", "rowheight") or 20)
+            header = row_height
+        return max(1, (height - header) // max(1, row_height))
+
+    def _refresh_if_needed(self):
+        # اگر سطرهای جدید خارج از پنجره قابل مشاهده‌اند، فقط اسکرول‌بار به‌روز می‌شود
+        if not self._refresh_pending: return
+        total = len(self.model)
+        if total >= self._shown_total > 0 and len(self._slots) >= self._visible_rows():
+            self._refresh_pending = False
+            self._shown_total = total
+            self.vsb.set(self.first / total, (self.first + len(self._slots)) / total)
+        else:
+            self.refresh()
+
+    def _ensure_visible(self, index):
+        visible = self._visible_rows()
+        if index < self.first: self.first = index
+        elif index >= self.first + visible: self.first = index - visible + 1
+
+    def _scroll_rows(self, delta):
+        self.first += delta
+        self.refresh()
+        return "break"
+
+    def _on_mousewheel(self, event):
+        return self._scroll_rows(-3 if event.delta > 0 else 3)
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == 'moveto':
+            self.first = int(float(value) * len(self.model))
+        elif action == 'scroll':
+            step = self._visible_rows() if unit == 'pages' else 1
+            self.first += int(value) * step
+        self.refresh()
+
+    def _on_select(self, event):
+        # پاک شدن انتخاب به خاطر اسکرول نباید سطر انتخاب‌شده مدل را فراموش کند
+        if (selection := self.tree.selection()) and selection[0] in self._slot_of:
+            self.selected = self.first + self._slot_of[selection[0]]
+
+    def _on_key(self, step):
+        total = len(self.model)
+        if not total: return "break"
+        current = self.selected if self.selected is not None else self.first
+        page = self._visible_rows()
+        if step == 'home': target = 0
+        elif step == 'end': target = total - 1
+        elif step == 'page': target = current + page
+        elif step == '-page': target = current - page
+        else: target = current + step
+        self.select(max(0, min(total - 1, target)))
+        return "break"